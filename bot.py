@@ -2,11 +2,17 @@
 
 import logging
 from telegram.ext import Application
-from config import LOG_LEVEL, BOT_TOKEN
-from handlers import start, help, price, chart, alert
+from config import (
+    LOG_LEVEL, BOT_TOKEN, ALERT_SWEEP_SECONDS, SHARD_LEASE_SECONDS, CONDITION_CHECK_SECONDS,
+    ALERT_EXPIRY_CHECK_SECONDS, ARCHIVE_CHECK_SECONDS, SNAPSHOT_SECONDS,
+)
+from handlers import start, help, price, chart, alert, condition
 from services.db_service import init_db
-from utils.alert_checker import check_alerts_job
-from handlers.listalerts import list_alerts_handler, delete_alert_handler
+from utils.alert_checker import check_alerts_job, renew_shards_job, save_state_job, start_alert_feed, stop_alert_feed
+from handlers.listalerts import list_alerts_handler, delete_alert_handler, alerts_page_handler, clear_alerts_handler
+from utils.scheduler import run_aligned
+from utils.condition_checker import check_conditions_job
+from utils.alert_archiver import expire_alerts_job, archive_alerts_job
 # from handlers.backtest import register_backtest_handlers
 
 # Setup logging
@@ -21,7 +27,13 @@ def main():
     init_db()  # Create tables if not exist
     
     # Create the application
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(start_alert_feed)        # alerts are evaluated on every new quote
+        .post_shutdown(stop_alert_feed)
+        .build()
+    )
 
     # Register handlers
     application.add_handler(start.handler)
@@ -29,12 +41,26 @@ def main():
     application.add_handler(price.handler)
     application.add_handler(chart.handler)
     application.add_handler(alert.handler)
+    application.add_handler(condition.handler)
     application.add_handler(list_alerts_handler)
     application.add_handler(delete_alert_handler)
+    application.add_handler(alerts_page_handler)
+    application.add_handler(clear_alerts_handler)
     # register_backtest_handlers(application)
 
-    # Add background job every 30 seconds
-    application.job_queue.run_repeating(check_alerts_job, interval=10, first=4)
+    # Safety-net sweep every ALERT_SWEEP_SECONDS, aligned to the clock and never
+    # overlapping (the quote feed does the real-time work)
+    run_aligned(application.job_queue, check_alerts_job, ALERT_SWEEP_SECONDS, name="alerts.sweep", min_delay=4)
+    # Keep this worker's symbol shards leased (and rebalance when workers come and go)
+    run_aligned(application.job_queue, renew_shards_job, SHARD_LEASE_SECONDS / 3, name="alerts.shards")
+    # Condition alerts (/when) are evaluated in vectorized batches from cached candles;
+    # a cycle missed to an overrun is caught up right after it instead of a full interval later
+    run_aligned(application.job_queue, check_conditions_job, CONDITION_CHECK_SECONDS, name="conditions.check", catch_up=True)
+    # Expire stale alerts and archive old triggered ones (off-peak) to keep `alerts` small
+    run_aligned(application.job_queue, expire_alerts_job, ALERT_EXPIRY_CHECK_SECONDS, name="alerts.expire")
+    run_aligned(application.job_queue, archive_alerts_job, ARCHIVE_CHECK_SECONDS, name="alerts.archive")
+    # Snapshot index / quotes / candles so a restart starts warm
+    run_aligned(application.job_queue, save_state_job, SNAPSHOT_SECONDS, name="state.snapshot")
 
     # Start polling
     logger.info("Bot is starting...")
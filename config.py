@@ -16,6 +16,60 @@ if not PUBLIC_HOST:
     raise ValueError("You must set either PUBLIC_HOST or WEBHOOKS_URL")
 
 DB_PATH = os.getenv("DB_PATH", "database.db")
+# SQLite: wait this long for a lock before failing; fsync level (NORMAL is safe with WAL)
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL").upper()
+# Group commit: user/alert inserts arriving within this many ms share one transaction
+# (one commit / fsync per batch); 0 commits every write on its own
+DB_WRITE_BATCH_MS = float(os.getenv("DB_WRITE_BATCH_MS", "0"))
+DB_WRITE_BATCH_MAX = int(os.getenv("DB_WRITE_BATCH_MAX", "200"))
+
+# Alert charts are rendered ahead of time once price is within this fraction of
+# the alert's target (0.002 = 0.2%), so triggers can send them immediately.
+PRERENDER_BAND_PCT = float(os.getenv("PRERENDER_BAND_PCT", "0.002"))
+
+# Alerts are evaluated on every new quote. Each watched symbol is polled at most
+# this often (seconds), also when its volatility is unknown; the periodic DB sweep
+# only runs as a safety net. The default matches the old 10 s alert loop: lower
+# it explicitly to poll symbols close to a level faster (more upstream calls).
+QUOTE_POLL_SECONDS = float(os.getenv("QUOTE_POLL_SECONDS", "10"))
+# Symbols far from their closest alert (in ATRs) are polled less often, down to this
+QUOTE_POLL_MAX_SECONDS = float(os.getenv("QUOTE_POLL_MAX_SECONDS", "60"))
+ALERT_SWEEP_SECONDS = int(os.getenv("ALERT_SWEEP_SECONDS", "60"))
+# Newly created / deleted alerts are picked up by the quote path within this many seconds
+ALERT_INDEX_SYNC_SECONDS = float(os.getenv("ALERT_INDEX_SYNC_SECONDS", "2"))
+
+# Alerts expire this many days after creation unless triggered (0 = never)
+ALERT_TTL_DAYS = float(os.getenv("ALERT_TTL_DAYS", "30"))
+ALERT_EXPIRY_CHECK_SECONDS = int(os.getenv("ALERT_EXPIRY_CHECK_SECONDS", "300"))
+# Triggered alerts older than this are moved to alerts_archive in batches, only
+# during the off-peak UTC hours "start-end" (end exclusive, may wrap midnight)
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", "24"))
+ARCHIVE_OFFPEAK_HOURS = os.getenv("ARCHIVE_OFFPEAK_HOURS", "2-5")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_CHECK_SECONDS = int(os.getenv("ARCHIVE_CHECK_SECONDS", "900"))
+
+# Warm restart: evaluator state (alert index, quotes, candle windows) is
+# snapshotted here every SNAPSHOT_SECONDS and reloaded at startup; quotes and
+# candles older than SNAPSHOT_MAX_AGE_SECONDS are not reused
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "state")
+SNAPSHOT_SECONDS = int(os.getenv("SNAPSHOT_SECONDS", "60"))
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "1800"))
+# WSGI workers get this long at exit to write a final snapshot and release their shard leases
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+# Condition alerts (/when) are evaluated in batches this often (seconds)
+CONDITION_CHECK_SECONDS = int(os.getenv("CONDITION_CHECK_SECONDS", "30"))
+
+# Alert evaluation is split into this many symbol shards, leased by worker
+# processes through the database; a dead worker's shards move after the lease time
+ALERT_SHARDS = int(os.getenv("ALERT_SHARDS", "16"))
+SHARD_LEASE_SECONDS = float(os.getenv("SHARD_LEASE_SECONDS", "30"))
+
+# Notification pacing (Telegram allows ~30 msg/s per bot and ~1 msg/s per chat)
+NOTIFY_GLOBAL_RATE = float(os.getenv("NOTIFY_GLOBAL_RATE", "25"))
+NOTIFY_PER_CHAT_INTERVAL = float(os.getenv("NOTIFY_PER_CHAT_INTERVAL", "1.0"))
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "4"))
 
 # Final webhook URL for Telegram
 WEBHOOK_URL = f"https://{PUBLIC_HOST}/webhook/{BOT_TOKEN}"
@@ -4,10 +4,12 @@ import functools
 import logging
 from telegram.ext import CommandHandler
 from telegram import Update
-from services.user_service import get_or_create_user
-from services.alert_service import create_alert
+from services.user_service import get_or_create_user_id_async
+from services.alert_service import create_alert_async
 from services.chart_service import get_chart
+from services.telegram_file_cache import send_photo_cached
 from utils.normalize_data import normalize_timeframe, normalize_symbol
+from utils.chart_utils import parse_overlays, is_overlay_spec
 from utils.get_data import get_price  # added import to fetch current price for trigger message
 
 logger = logging.getLogger(__name__)
@@ -21,7 +23,7 @@ DEFAULT_TF = "60"
 FALLBACK_TFS = ["1", "5", "15", "60"]
 
 
-async def _try_get_chart_with_fallback(loop, symbol, tf_token, alert_price, outputsize=150):
+async def _try_get_chart_with_fallback(loop, symbol, tf_token, alert_price, outputsize=150, overlays=None):
     """
     Try to get a chart for tf_token via services.chart_service.get_chart.
     If get_chart raises an error indicating no OHLC data, try fallback timeframes.
@@ -47,7 +49,8 @@ async def _try_get_chart_with_fallback(loop, symbol, tf_token, alert_price, outp
                 alert_price=alert_price,
                 outputsize=outputsize,
                 from_date=None,
-                to_date=None
+                to_date=None,
+                overlays=overlays,
             )
             buf, interval_norm = await loop.run_in_executor(None, call_plot)
             return buf, interval_norm, tf_for_chart
@@ -70,10 +73,11 @@ async def _try_get_chart_with_fallback(loop, symbol, tf_token, alert_price, outp
 
 async def alert_command(update: Update, context):
     """
-    /alert SYMBOL PRICE [TIMEFRAMES]
+    /alert SYMBOL PRICE [TIMEFRAMES] [OVERLAYS]
     Example:
       /alert eurusd 1.1234 4h,15m
       /alert eurusd 1.1234        -> uses default timeframe (DEFAULT_TF)
+      /alert eurusd 1.1234 4h ema20,bb20  -> charts (now and on trigger) include overlays
 
     This command:
       - creates an alert in DB (decides direction vs current market price)
@@ -83,18 +87,25 @@ async def alert_command(update: Update, context):
     # require at least symbol + price
     if len(context.args) < 2:
         await update.message.reply_text(
-            "Usage: /alert SYMBOL PRICE [TIMEFRAMES]\nExample: /alert eurusd 1.2345 4h,15m (timeframes optional)"
+            "Usage: /alert SYMBOL PRICE [TIMEFRAMES] [OVERLAYS]\nExample: /alert eurusd 1.2345 4h,15m ema20,bb20 (timeframes and overlays optional)"
         )
         return
 
     symbol = context.args[0].strip()
     price_raw = context.args[1].strip()
 
-    # safe extraction of optional timeframes argument
-    if len(context.args) >= 3 and context.args[2].strip():
-        tfs_raw = context.args[2].strip()
-    else:
-        tfs_raw = DEFAULT_TF
+    # safe extraction of optional timeframes / overlays arguments (overlays may replace timeframes)
+    extra = [a.strip() for a in context.args[2:4] if a.strip()]
+    overlays = None
+    if extra and is_overlay_spec(extra[-1]):
+        overlays = extra.pop()
+    tfs_raw = extra[0] if extra else DEFAULT_TF
+    if overlays:
+        try:
+            parse_overlays(overlays)
+        except ValueError as e:
+            await update.message.reply_text(f"⚠️ {e}")
+            return
 
     # parse price
     try:
@@ -119,33 +130,30 @@ async def alert_command(update: Update, context):
 
     loop = asyncio.get_running_loop()
 
-    # 1) Ensure user exists (DB likely blocking) -> run in executor
+    # 1) Ensure user exists (identity cache first, then the async session)
     try:
-        call_user = functools.partial(
-            get_or_create_user,
+        user_id = await get_or_create_user_id_async(
             chat_id=update.effective_chat.id,
             username=(update.effective_user.username if update.effective_user else None),
             first_name=(update.effective_user.first_name if update.effective_user else None),
             last_name=(update.effective_user.last_name if update.effective_user else None),
         )
-        user = await loop.run_in_executor(None, call_user)
     except Exception as e:
         logger.exception("Failed to get/create user")
         await update.message.reply_text(f"⚠️ Failed to access user record: {e}")
         return
 
-    # 2) Create alert (blocking DB call) in executor
+    # 2) Create alert (the price lookup runs in the executor, the DB work on the async session)
     try:
         norm_symbol = normalize_symbol(symbol)
 
-        call_alert = functools.partial(
-            create_alert,
-            user_id=user.id,
+        alert = await create_alert_async(
+            user_id=user_id,
             symbol=norm_symbol,
             target_price=price,
             timeframes=normalized_tfs,
+            overlays=overlays,
         )
-        alert = await loop.run_in_executor(None, call_alert)
     except Exception as e:
         logger.exception("Failed to create alert")
         await update.message.reply_text(f"⚠️ Failed to create alert: {e}")
@@ -174,8 +182,10 @@ async def alert_command(update: Update, context):
             # new alert — send the saved confirmation
             try:
                 direction = getattr(alert.direction, "value", str(alert.direction))
+                expires = getattr(alert, "expires_at", None)
                 await update.message.reply_text(
                     f"✅ Alert saved: {alert.symbol} {direction} {alert.target_price} on {tf_display}\nAlert ID: {alert.id}"
+                    + (f"\nExpires: {expires:%Y-%m-%d %H:%M} UTC" if expires else "")
                 )
             except Exception:
                 await update.message.reply_text(f"✅ Alert saved (ID unknown).")
@@ -283,7 +293,10 @@ async def alert_command(update: Update, context):
     for tf_token in tfs_for_plot:
         try:
             # Try requested / fallback TFs
-            buf, interval_norm, used_tf = await _try_get_chart_with_fallback(loop, norm_symbol, tf_token, alert.target_price, outputsize=150)
+            buf, interval_norm, used_tf = await _try_get_chart_with_fallback(
+                loop, norm_symbol, tf_token, alert.target_price, outputsize=150,
+                overlays=getattr(alert, "overlays", None) or overlays,
+            )
 
             # ensure buffer readable from start
             try:
@@ -295,8 +308,9 @@ async def alert_command(update: Update, context):
             if used_tf != tf_token:
                 caption += f" (requested {tf_token} — plotted {used_tf})"
 
-            await update.message.reply_photo(
-                photo=buf,
+            await send_photo_cached(
+                update.message.reply_photo,
+                buf,
                 filename=f"{symbol}_{interval_norm}.png",
                 caption=caption
             )
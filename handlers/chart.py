@@ -5,7 +5,9 @@ import logging
 from telegram.ext import CommandHandler
 from telegram import Update
 from services.chart_service import get_chart
+from services.telegram_file_cache import send_photo_cached
 from utils.normalize_data import normalize_timeframe, to_unix_timestamp
+from utils.chart_utils import is_overlay_spec
 
 logger = logging.getLogger(__name__)
 INTER_CHART_DELAY = 0.05
@@ -45,21 +47,23 @@ def _merge_quoted_tokens(tokens: list[str]) -> list[str]:
 
 async def chart_command(update: Update, context):
     """
-    /chart <symbols [required]> [timeframes default=15m] [outputsize default=200] [from_date] [to_date]
+    /chart <symbols [required]> [timeframes default=15m] [outputsize default=200] [from_date] [to_date] [overlays]
 
     Rules:
       - If two quoted dates provided, date-range mode -> outputsize = DATE_FORCED_OUTPUTSIZE.
       - Otherwise a positive integer in the third position sets outputsize.
       - Timeframe tokens like 1,5,15,60,1h,4h,D,W,M are accepted.
       - Dates must be quoted if they contain spaces (e.g. "2024-08-01 14:30:00").
+      - An overlay list such as ema20,sma200,bb20,vol may appear anywhere after the symbol.
     """
     try:
         if len(context.args) < 1:
             await update.message.reply_text(
-                "Usage: /chart <symbols> [timeframe=15] [outputsize=200] [from_date] [to_date]\n"
+                "Usage: /chart <symbols> [timeframe=15] [outputsize=200] [from_date] [to_date] [overlays]\n"
                 "Examples:\n"
                 "/chart EURUSD\n"
                 "/chart EURUSD 15 300\n"
+                "/chart EURUSD 60 300 ema20,sma200,bb20,vol\n"
                 "/chart EURUSD 60 \"2024-08-01 14:30:00\" \"2025-01-01 14:30:00\""
             )
             return
@@ -75,6 +79,16 @@ async def chart_command(update: Update, context):
         # merge quoted fragments so quoted date/time stays as one token
         tokens = _merge_quoted_tokens(raw_tokens)
 
+        # pull out an optional overlay spec (e.g. "ema20,bb20,vol") before positional parsing
+        overlays = None
+        positional = []
+        for tok in tokens:
+            if overlays is None and is_overlay_spec(tok):
+                overlays = tok
+            else:
+                positional.append(tok)
+        tokens = positional
+
         # helpers
         def parse_positive_int(tok):
             try:
@@ -230,12 +244,14 @@ async def chart_command(update: Update, context):
                         alert_price=None,
                         outputsize=outputsize,
                         from_date=from_date,
-                        to_date=to_date
+                        to_date=to_date,
+                        overlays=overlays,
                     )
                     buf, time_frame = await loop.run_in_executor(None, call)
                     buf.seek(0)
-                    await update.message.reply_photo(
-                        photo=buf,
+                    await send_photo_cached(
+                        update.message.reply_photo,
+                        buf,
                         filename=f"{symbol}_{time_frame}.png",
                         caption=f"⏱ Timeframe: {time_frame}, Symbol: {symbol.upper()}"
                     )
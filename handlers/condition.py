@@ -0,0 +1,103 @@
+# handlers/condition.py
+import asyncio
+import functools
+import logging
+from telegram.ext import CommandHandler
+from telegram import Update
+from services.user_service import get_or_create_user_id_async
+from services.condition_service import create_condition_alert, get_user_conditions, delete_condition_alert
+from utils.conditions import parse_condition, describe_condition
+from utils.normalize_data import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+USAGE = (
+    "Usage: /when SYMBOL CONDITION\n"
+    "Examples:\n"
+    "  /when eurusd move 1% 1h       -> moves 1% within an hour\n"
+    "  /when eurusd cross ema50 15m  -> close crosses EMA50 on 15m (add up/down for one side)\n"
+    "  /when eurusd break high D     -> breaks yesterday's high\n"
+    "  /when list | /when delete ID"
+)
+
+
+async def _get_user_id(update: Update) -> int:
+    return await get_or_create_user_id_async(
+        chat_id=update.effective_chat.id,
+        username=(update.effective_user.username if update.effective_user else None),
+        first_name=(update.effective_user.first_name if update.effective_user else None),
+        last_name=(update.effective_user.last_name if update.effective_user else None),
+    )
+
+
+async def _list_conditions(update: Update, loop):
+    user_id = await _get_user_id(update)
+    conditions = await loop.run_in_executor(None, get_user_conditions, user_id)
+    if not conditions:
+        await update.message.reply_text("📭 You have no active condition alerts.")
+        return
+    lines = ["🧭 Your condition alerts:"]
+    for c in conditions:
+        lines.append(f"#{c.id} {c.symbol} {describe_condition(c.kind, c.timeframe, c.params)}")
+    await update.message.reply_text("\n".join(lines))
+
+
+async def _delete_condition(update: Update, loop, raw_id: str):
+    try:
+        condition_id = int(raw_id)
+    except ValueError:
+        await update.message.reply_text("⚠️ Condition ID must be a number.")
+        return
+    user_id = await _get_user_id(update)
+    deleted = await loop.run_in_executor(None, delete_condition_alert, condition_id, user_id)
+    if deleted:
+        await update.message.reply_text(f"🗑️ Condition alert {condition_id} deleted.")
+    else:
+        await update.message.reply_text(f"⚠️ Condition alert {condition_id} not found.")
+
+
+async def when_command(update: Update, context):
+    """
+    /when SYMBOL CONDITION
+    Creates a condition alert (percent move, indicator cross or range break),
+    evaluated in batches from cached candles by utils.condition_checker.
+    """
+    loop = asyncio.get_running_loop()
+    if context.args and context.args[0].lower() == "list":
+        await _list_conditions(update, loop)
+        return
+    if len(context.args) == 2 and context.args[0].lower() == "delete":
+        await _delete_condition(update, loop, context.args[1])
+        return
+    if len(context.args) < 2:
+        await update.message.reply_text(USAGE)
+        return
+
+    symbol = context.args[0].strip()
+    try:
+        kind, timeframe, params = parse_condition(context.args[1:])
+        norm_symbol = normalize_symbol(symbol)
+    except ValueError as e:
+        await update.message.reply_text(f"⚠️ {e}\n\n{USAGE}")
+        return
+
+    try:
+        user_id = await _get_user_id(update)
+        cond = await loop.run_in_executor(
+            None, functools.partial(create_condition_alert, user_id, norm_symbol, kind, timeframe, params)
+        )
+    except Exception as e:
+        logger.exception("Failed to create condition alert")
+        await update.message.reply_text(f"⚠️ Failed to create condition alert: {e}")
+        return
+
+    description = describe_condition(kind, timeframe, params)
+    if getattr(cond, "_is_duplicate", False):
+        await update.message.reply_text(
+            f"⚠️ You already have this condition alert (ID: {cond.id}): {cond.symbol} {description}"
+        )
+    else:
+        await update.message.reply_text(f"✅ Condition alert saved: {cond.symbol} {description}\nCondition ID: {cond.id}")
+
+
+handler = CommandHandler("when", when_command)
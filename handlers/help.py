@@ -20,20 +20,32 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "- `symbols` can be a single symbol or comma-separated (e.g. `EURUSD,GBPUSD`)\n"
         "- `timeframe` accepts numbers or aliases: `1`, `5`, `15`, `60`, `1h`, `4h`, `D`, `W`, `M`.\n"
         "- If you provide two dates (from & to) the bot will force the output size for that range.\n"
+        "- Add indicator overlays anywhere after the symbol: `ema20`, `sma200`, `ssma50`, `bb20`, and `vol` for a volume panel.\n"
         "_Examples:_\n"
         "`/chart EURUSD`\n"
         "`/chart EURUSD 60 300`\n"
-        "`/chart EURUSD 60 \"2024-08-01 14:30:00\" \"2025-01-01 14:30:00\"`\n\n"
+        "`/chart EURUSD 60 \"2024-08-01 14:30:00\" \"2025-01-01 14:30:00\"`\n"
+        "`/chart EURUSD 60 300 ema20,bb20,vol`\n\n"
 
         "*🚨 Alerts*\n"
-        "`/alert <symbol> <price> <timeframes>` — Create an alert and get immediate charts for the requested timeframes.\n"
+        "`/alert <symbol> <price> <timeframes> [overlays]` — Create an alert and get immediate charts for the requested timeframes.\n"
         "_Example_: `/alert eurusd 1.1234 4h,15m`\n"
         "Notes:\n"
         "- Charts with your alert price are sent immediately for each timeframe.\n"
         "- If the alert condition is already met at creation, you may receive a note that it was already triggered.\n\n"
 
+        "*🧭 Condition Alerts*\n"
+        "`/when <symbol> <condition>` — Alert on a market condition instead of a fixed price.\n"
+        "- `move 1% 1h` — price moves 1% within the window\n"
+        "- `cross ema50 15m [up|down]` — close crosses an indicator (`sma`, `ema`, `ssma`)\n"
+        "- `break high D` / `break low W` — breaks the previous day's / week's high or low\n"
+        "`/when list` — Show your condition alerts, `/when delete <id>` — remove one\n"
+        "_Example_: `/when eurusd cross ema50 15m`\n\n"
+
         "*📭 Manage Alerts*\n"
-        "`/listalerts` — Show all your active alerts. Each alert message includes a ❌ Delete button to remove it.\n\n"
+        "`/listalerts` — Show your active alerts, a page at a time (◀ Prev / Next ▶). Each alert has a ❌ Delete button; "
+        "the ✅ Triggered button (or `/listalerts triggered`) shows recently triggered ones.\n"
+        "`/listalerts clear triggered` / `/listalerts clear EURUSD` — delete all triggered alerts / all alerts for a symbol.\n\n"
 
         "*🕒 Supported time tokens (examples)*\n"
         "`1m`, `5m`, `15m`, `30m`, `60` or `1h`, `4h`, `1d`, `D`, `W`, `M` — many aliases are accepted.\n\n"
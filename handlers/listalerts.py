@@ -1,9 +1,30 @@
 # handlers/listalerts.py
+"""
+/listalerts: the user's alerts, one page at a time.
+
+Pages are keyset-paginated on alerts.id (served by ix_alerts_user_triggered,
+which ends in the rowid), so every page is an index range scan of PAGE_SIZE + 1
+rows however many alerts the user has. Only the displayed columns are selected.
+Callback data carries the filter, the direction and the anchor id:
+  alerts_page:<pending|triggered>:<next|prev>:<anchor id>
+"""
+from datetime import datetime
+from sqlalchemy import or_, select
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CommandHandler, CallbackQueryHandler, ContextTypes
-from services.db_service import SessionLocal
+from services.db_service import get_async_db
+from services.user_service import find_user_id_async
+from services.alert_service import delete_user_alerts_async
 from models.alert import Alert
-from models.user import User
+
+# alerts (and delete buttons) per message; keeps text and keyboard far below Telegram's limits
+PAGE_SIZE = 10
+
+# columns shown in the list
+_COLUMNS = (
+    Alert.id, Alert.symbol, Alert.target_price, Alert.direction, Alert.timeframes,
+    Alert.expires_at, Alert.triggered_at,
+)
 
 def _direction_display(alert):
     # Works whether alert.direction is an Enum or plain string
@@ -12,55 +33,223 @@ def _direction_display(alert):
     except Exception:
         return str(alert.direction).capitalize()
 
-def build_alerts_message_and_keyboard(alerts):
+def _status_filter(user_id, status):
     """
-    Given a list of Alert objects, return (text, InlineKeyboardMarkup).
+    pending: live alerts; triggered: fired ones not archived yet (the archiver
+    moves them out after ARCHIVE_AFTER_HOURS). Expired ones are never listed.
     """
-    if not alerts:
-        return "📭 No active alerts.", None
+    if status == "triggered":
+        return (Alert.user_id == user_id, Alert.triggered == True)
+    now = datetime.utcnow()
+    return (
+        Alert.user_id == user_id,
+        Alert.triggered == False,
+        or_(Alert.expires_at.is_(None), Alert.expires_at > now),
+    )
 
-    lines = []
-    keyboard = []
-    for alert in alerts:
-        symbol_display = alert.symbol
-        # If direction is enum or string, this handles both
-        direction_display = _direction_display(alert)
-        # show sign for clarity
-        sign = "≥" if str(alert.direction).lower().startswith("above") else "≤"
-        tf_str = ", ".join(alert.timeframes.split(","))
-        lines.append(f"{symbol_display} {sign} {alert.target_price} ({tf_str}) — {direction_display}")
+async def _fetch_page(session, user_id, status="pending", direction="next", anchor=0):
+    """
+    One page of the user's alerts with ids after (next) or before (prev) `anchor`,
+    in id order. Returns (rows, has_prev, has_next).
+    """
+    where = _status_filter(user_id, status)
+    if direction == "prev":
+        stmt = select(*_COLUMNS).where(*where, Alert.id < anchor).order_by(Alert.id.desc())
+    else:
+        stmt = select(*_COLUMNS).where(*where, Alert.id > anchor).order_by(Alert.id)
+    rows = (await session.execute(stmt.limit(PAGE_SIZE + 1))).all()
+    more = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+    if direction == "prev":
+        rows.reverse()
+    if not rows:
+        return [], False, False
+
+    # the other side: a single indexed probe
+    if direction == "prev":
+        other = select(Alert.id).where(*where, Alert.id > rows[-1].id).limit(1)
+    else:
+        other = select(Alert.id).where(*where, Alert.id < rows[0].id).limit(1)
+    other_side = (await session.execute(other)).first() is not None
+    return (rows, more, other_side) if direction == "prev" else (rows, other_side, more)
 
+def _alert_line(alert, status):
+    symbol_display = alert.symbol
+    # If direction is enum or string, this handles both
+    direction_display = _direction_display(alert)
+    # show sign for clarity
+    sign = "≥" if str(alert.direction).lower().startswith("above") else "≤"
+    tf_str = ", ".join(alert.timeframes.split(","))
+    if status == "triggered":
+        when = f" · triggered {alert.triggered_at:%Y-%m-%d %H:%M}" if getattr(alert, "triggered_at", None) else ""
+        return f"{symbol_display} {sign} {alert.target_price} ({tf_str}){when}"
+    expiry = f" · expires {alert.expires_at:%Y-%m-%d}" if getattr(alert, "expires_at", None) else ""
+    return f"{symbol_display} {sign} {alert.target_price} ({tf_str}) — {direction_display}{expiry}"
+
+def _compact(alerts, status):
+    """View rows: [alert id, list line, delete button label]."""
+    return [[a.id, _alert_line(a, status), f"❌ Delete {a.symbol} {a.target_price}"] for a in alerts]
+
+def _build_view(view):
+    """(text, InlineKeyboardMarkup) for a view state (see _remember_view)."""
+    status, rows = view["status"], view["rows"]
+    other = "triggered" if status == "pending" else "pending"
+    switch = [InlineKeyboardButton(
+        text="✅ Triggered" if other == "triggered" else "🔔 Pending",
+        callback_data=f"alerts_page:{other}:next:0",
+    )]
+    if not rows:
+        empty = "📭 No active alerts." if status == "pending" else "📭 No recently triggered alerts."
+        return empty, InlineKeyboardMarkup([switch])
+
+    lines = ["🔔 Pending alerts:" if status == "pending" else "✅ Triggered alerts:"]
+    keyboard = []
+    for alert_id, line, label in rows:
+        lines.append(line)
         # add a delete button per-alert
-        keyboard.append([
-            InlineKeyboardButton(
-                text=f"❌ Delete {symbol_display} {alert.target_price}",
-                callback_data=f"delete_alert:{alert.id}"
-            )
-        ])
+        keyboard.append([InlineKeyboardButton(text=label, callback_data=f"delete_alert:{alert_id}")])
+
+    nav = []
+    if view["has_prev"]:
+        nav.append(InlineKeyboardButton(text="◀ Prev", callback_data=f"alerts_page:{status}:prev:{rows[0][0]}"))
+    if view["has_next"]:
+        nav.append(InlineKeyboardButton(text="Next ▶", callback_data=f"alerts_page:{status}:next:{rows[-1][0]}"))
+    if nav:
+        keyboard.append(nav)
+    if status == "triggered":
+        keyboard.append([InlineKeyboardButton(text="🗑 Delete all triggered", callback_data="alerts_clear:triggered")])
+    keyboard.append(switch)
 
     text = "\n".join(lines)
-    reply_markup = InlineKeyboardMarkup(keyboard) if keyboard else None
-    return text, reply_markup
+    return text, InlineKeyboardMarkup(keyboard)
+
+def build_alerts_message_and_keyboard(alerts, status="pending", has_prev=False, has_next=False):
+    """
+    Given one page of alerts (rows or Alert objects), return (text, InlineKeyboardMarkup):
+    a delete button per alert, prev/next buttons and a switch to the other filter.
+    """
+    return _build_view({"status": status, "rows": _compact(alerts, status), "has_prev": has_prev, "has_next": has_next})
+
+async def _load_view(user_id, status="pending", direction="next", anchor=0):
+    async with get_async_db() as session:
+        rows, has_prev, has_next = await _fetch_page(session, user_id, status, direction, anchor)
+        if not rows and anchor:
+            # the page emptied (alerts deleted or fired meanwhile): fall back to the first one
+            rows, has_prev, has_next = await _fetch_page(session, user_id, status)
+    return {"status": status, "rows": _compact(rows, status), "has_prev": has_prev, "has_next": has_next}
+
+# list messages per chat whose view state is kept (older ones fall back to a page query)
+MAX_VIEWS_PER_CHAT = 5
+
+def _views(context):
+    chat_data = getattr(context, "chat_data", None)
+    if chat_data is None:
+        return {}
+    return chat_data.setdefault("alert_views", {})
+
+def _remember_view(context, message_id, view):
+    """
+    Keep the page a list message shows, keyed by message id in chat_data:
+    {"status", "rows": [[id, line, label], ...], "has_prev", "has_next", "shown"}
+    where "shown" is the (text, buttons) last sent, to skip no-op edits.
+    """
+    views = _views(context)
+    views.pop(message_id, None)
+    views[message_id] = view
+    while len(views) > MAX_VIEWS_PER_CHAT:
+        views.pop(next(iter(views)))
+
+def _rendered(text, markup):
+    return [text, [b.callback_data for row in markup.inline_keyboard for b in row]]
+
+async def _show(query, context, view):
+    """Edit the list message to `view` unless it already shows exactly that."""
+    text, markup = _build_view(view)
+    rendered = _rendered(text, markup)
+    message_id = query.message.message_id
+    previous = _views(context).get(message_id)
+    _remember_view(context, message_id, dict(view, shown=rendered))
+    if previous is not None and previous.get("shown") == rendered:
+        return
+    await query.edit_message_text(text, reply_markup=markup)
 
 async def list_alerts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    session = SessionLocal()
+    user_id = await find_user_id_async(update.effective_chat.id)
+    if user_id is None:
+        await update.message.reply_text("📭 You don't have any alerts set.")
+        return
+
+    args = [a.lower() for a in (context.args or [])]
+    if args and args[0] in ("clear", "delete"):
+        await _clear_command(update, user_id, args[1:])
+        return
+    status = "triggered" if args and args[0].startswith("trig") else "pending"
+    view = await _load_view(user_id, status)
+    text, reply_markup = _build_view(view)
+    message = await update.message.reply_text(text, reply_markup=reply_markup)
+    if getattr(message, "message_id", None) is not None:
+        _remember_view(context, message.message_id, dict(view, shown=_rendered(text, reply_markup)))
+
+async def _clear_command(update, user_id, args):
+    """/listalerts clear triggered | /listalerts clear SYMBOL: one DELETE statement each."""
+    if not args:
+        await update.message.reply_text("Usage: /listalerts clear triggered | /listalerts clear SYMBOL")
+        return
+    if args[0].startswith("trig"):
+        deleted = await delete_user_alerts_async(user_id, triggered=True)
+        await update.message.reply_text(f"🗑 Deleted {deleted} triggered alert(s).")
+        return
+    deleted = await delete_user_alerts_async(user_id, symbol=args[0])
+    await update.message.reply_text(f"🗑 Deleted {deleted} alert(s) for {args[0].upper()}.")
+
+async def alerts_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+
     try:
-        user = session.query(User).filter_by(chat_id=update.effective_chat.id).first()
-        if not user:
-            await update.message.reply_text("📭 You don't have any alerts set.")
-            return
+        _prefix, status, direction, anchor = query.data.split(":")
+        anchor = int(anchor)
+    except Exception:
+        await query.edit_message_text("⚠️ Invalid request.")
+        return
+
+    user_id = await find_user_id_async(update.effective_chat.id)
+    if user_id is None:
+        await query.edit_message_text("📭 You don't have any alerts set.")
+        return
+    await _show(query, context, await _load_view(user_id, status, direction, anchor))
 
-        alerts = session.query(Alert).filter_by(user_id=user.id).all()
-        text, reply_markup = build_alerts_message_and_keyboard(alerts)
+def _first_shown_id(message):
+    """Smallest alert id with a delete button on `message` (the page being viewed), or None."""
+    ids = []
+    markup = getattr(message, "reply_markup", None)
+    for row in getattr(markup, "inline_keyboard", None) or ():
+        for button in row:
+            data = getattr(button, "callback_data", None) or ""
+            if data.startswith("delete_alert:"):
+                ids.append(int(data.split(":")[1]))
+    return min(ids) if ids else None
 
-        if reply_markup:
-            await update.message.reply_text(text, reply_markup=reply_markup)
-        else:
-            await update.message.reply_text(text)
-    finally:
-        session.close()
+async def _fill(user_id, view):
+    """Top the view's rows back up to PAGE_SIZE with the alerts following its last row."""
+    missing = PAGE_SIZE - len(view["rows"])
+    if missing <= 0 or not view["has_next"] or not view["rows"]:
+        return view
+    where = _status_filter(user_id, view["status"])
+    async with get_async_db() as session:
+        rows = (await session.execute(
+            select(*_COLUMNS).where(*where, Alert.id > view["rows"][-1][0]).order_by(Alert.id).limit(missing + 1)
+        )).all()
+    view["has_next"] = len(rows) > missing
+    view["rows"] += _compact(rows[:missing], view["status"])
+    return view
 
 async def delete_alert_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Delete one alert and edit just that row out of the list: the kept view state
+    loses the row and is topped up with the next alert (one short indexed query),
+    instead of re-reading the user's whole list.
+    """
     query = update.callback_query
     await query.answer()  # acknowledge callback promptly
 
@@ -71,41 +260,44 @@ async def delete_alert_callback(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text("⚠️ Invalid request.")
         return
 
-    session = SessionLocal()
-    try:
-        alert = session.query(Alert).filter_by(id=alert_id).first()
-        if not alert:
-            # Re-render remaining alerts if possible
-            # (maybe the alert was already deleted elsewhere)
-            user = session.query(User).filter_by(chat_id=query.from_user.id).first()
-            if not user:
-                await query.edit_message_text("⚠️ Alert not found.")
-                return
-            remaining = session.query(Alert).filter_by(user_id=user.id).all()
-            text, keyboard = build_alerts_message_and_keyboard(remaining)
-            if keyboard:
-                await query.edit_message_text(text, reply_markup=keyboard)
-            else:
-                await query.edit_message_text("📭 No active alerts.")
-            return
-
-        # Delete the alert
-        user_id = alert.user_id
-        session.delete(alert)
-        session.commit()
-
-        # After deleting, re-query remaining alerts for the same user
-        remaining = session.query(Alert).filter_by(user_id=user_id).all()
-        text, keyboard = build_alerts_message_and_keyboard(remaining)
-
-        if keyboard:
-            # Edit the original message to show the updated list and keyboard
-            await query.edit_message_text(text, reply_markup=keyboard)
-        else:
-            await query.edit_message_text("🗑 Deleted. 📭 No active alerts.")
-    finally:
-        session.close()
+    user_id = await find_user_id_async(update.effective_chat.id)
+    if user_id is None:
+        await query.edit_message_text("⚠️ Alert not found.")
+        return
+
+    # only this chat's alerts match; an already deleted one just refreshes the view
+    await delete_user_alerts_async(user_id, alert_ids=[alert_id])
+
+    view = _views(context).get(query.message.message_id)
+    if view is None:
+        # no kept state (older message or restart): re-render the page from its first shown alert
+        first = _first_shown_id(query.message)
+        status = "triggered" if (getattr(query.message, "text", None) or "").startswith("✅") else "pending"
+        await _show(query, context, await _load_view(user_id, status, "next", first - 1 if first else 0))
+        return
+
+    view = dict(view, rows=[row for row in view["rows"] if row[0] != alert_id])
+    view = await _fill(user_id, view)
+    if not view["rows"]:
+        # last row of the page gone: show the previous page (or the first one)
+        direction = "prev" if view["has_prev"] else "next"
+        view = await _load_view(user_id, view["status"], direction, alert_id if view["has_prev"] else 0)
+    await _show(query, context, view)
+
+async def clear_alerts_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """The 🗑 Delete all triggered button: one DELETE statement."""
+    query = update.callback_query
+    await query.answer()
+    user_id = await find_user_id_async(update.effective_chat.id)
+    if user_id is None:
+        await query.edit_message_text("⚠️ Alert not found.")
+        return
+    deleted = await delete_user_alerts_async(user_id, triggered=True)
+    await query.edit_message_text(f"🗑 Deleted {deleted} triggered alert(s).")
+    _views(context).pop(query.message.message_id, None)
 
 # Handler instances (import these into your bot setup)
 list_alerts_handler = CommandHandler("listalerts", list_alerts_command)
 delete_alert_handler = CallbackQueryHandler(delete_alert_callback, pattern=r"^delete_alert:\d+$")
+alerts_page_handler = CallbackQueryHandler(alerts_page_callback, pattern=r"^alerts_page:(pending|triggered):(next|prev):\d+$")
+clear_alerts_handler = CallbackQueryHandler(clear_alerts_callback, pattern=r"^alerts_clear:triggered$")
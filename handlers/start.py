@@ -1,10 +1,10 @@
 from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
-from services.user_service import get_or_create_user
+from services.user_service import get_or_create_user_id_async
 
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user = get_or_create_user(
+    await get_or_create_user_id_async(
         chat_id=update.message.chat.id,
         username=update.message.from_user.username,
         first_name=update.message.from_user.first_name,
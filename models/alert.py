@@ -1,6 +1,6 @@
 # models/alert.py
 import enum
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Enum as SAEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Enum as SAEnum, Index, event, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from services.db_service import Base
@@ -11,15 +11,84 @@ class AlertDirection(str, enum.Enum):
 
 class Alert(Base):
     __tablename__ = "alerts"
+    __table_args__ = (
+        Index("ix_alerts_triggered_symbol", "triggered", "symbol"),      # pending scans per symbol
+        Index("ix_alerts_user_triggered", "user_id", "triggered"),       # /listalerts
+        # create_alert duplicate check: at most one pending alert per user, symbol, price and timeframes
+        Index("ux_alerts_pending_dedupe", "user_id", "symbol", "price_ticks", "timeframes",
+              unique=True, sqlite_where=text("triggered = 0")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     symbol = Column(String, nullable=False)         # store normalized symbol (e.g. "EUR/USD")
     target_price = Column(Float, nullable=False)
+    price_ticks = Column(Integer, nullable=True)    # target_price in ticks of the symbol's precision (see price_ticks())
     direction = Column(SAEnum(AlertDirection), nullable=False)  # "above" / "below"
     timeframes = Column(String, nullable=False)     # comma-separated canonical timeframes
+    overlays = Column(String, nullable=True)        # optional chart overlay spec (e.g. "ema20,bb20")
     triggered = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     triggered_at = Column(DateTime(timezone=True), nullable=True)
+    trigger_candle_at = Column(DateTime(timezone=True), nullable=True)  # start of the 1m candle that crossed the level
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)  # pending alerts stop here (NULL = never)
 
     user = relationship("User", back_populates="alerts")
+
+
+class AlertArchive(Base):
+    """
+    Triggered and expired alerts moved out of `alerts` by the archiver, so the
+    hot table only holds live alerts. `alert_id` is the id the alert had there.
+    """
+    __tablename__ = "alerts_archive"
+
+    id = Column(Integer, primary_key=True)
+    alert_id = Column(Integer, nullable=False, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    symbol = Column(String, nullable=False)
+    target_price = Column(Float, nullable=False)
+    direction = Column(String, nullable=False)
+    timeframes = Column(String, nullable=False)
+    overlays = Column(String, nullable=True)
+    status = Column(String, nullable=False)         # "triggered" / "expired"
+    created_at = Column(DateTime(timezone=True), nullable=True)
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    trigger_candle_at = Column(DateTime(timezone=True), nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=True)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class AlertChange(Base):
+    """
+    Append-only log of alert row changes, written by SQLite triggers on `alerts`
+    (insert / update / delete), so every writer is covered. Readers keep the last
+    seen `seq` as a watermark and only reload the alerts changed since.
+    """
+    __tablename__ = "alert_changes"
+    # AUTOINCREMENT: seq is never reused, even after old rows are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    alert_id = Column(Integer, nullable=False)
+    changed_at = Column(Integer, nullable=False, index=True)  # unix seconds
+
+
+_CHANGE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS alerts_log_{op.lower()} AFTER {op} ON alerts
+    BEGIN
+        INSERT INTO alert_changes (alert_id, changed_at) VALUES ({row}.id, CAST(strftime('%s', 'now') AS INTEGER));
+    END
+    """
+    for op, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_change_triggers(target, connection, **kw):
+    """(Re)create the alert change-log triggers; idempotent, runs on every create_all()."""
+    if connection.dialect.name != "sqlite":
+        return
+    for ddl in _CHANGE_TRIGGERS:
+        connection.exec_driver_sql(ddl)
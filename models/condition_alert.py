@@ -0,0 +1,32 @@
+# models/condition_alert.py
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from services.db_service import Base
+
+
+class ConditionAlert(Base):
+    """
+    Alert on a market condition rather than a fixed price, stored generically:
+      kind="move"  params={"pct": 1.0, "window": 60}            -> moves 1% within 60 minutes
+      kind="cross" params={"indicator": "ema", "length": 50, "side": "any"} -> close crosses EMA50
+      kind="break" params={"level": "high"}                      -> breaks the previous `timeframe` bar's high
+    """
+    __tablename__ = "condition_alerts"
+    __table_args__ = (
+        Index("ix_condition_alerts_triggered_symbol", "triggered", "symbol"),
+        Index("ix_condition_alerts_dedupe", "user_id", "symbol", "kind", "timeframe"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    symbol = Column(String, nullable=False)         # normalized symbol
+    kind = Column(String, nullable=False)           # "move" / "cross" / "break"
+    timeframe = Column(String, nullable=False)      # timeframe the condition refers to
+    params = Column(String, nullable=False)         # JSON object, see above
+    triggered = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    triggered_at = Column(DateTime(timezone=True), nullable=True)
+    trigger_candle_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User")
@@ -0,0 +1,20 @@
+# models/shard_lease.py
+from sqlalchemy import Column, Integer, String, Float
+from services.db_service import Base
+
+
+class ShardLease(Base):
+    """Ownership of one alert-evaluation shard (a hash bucket of symbols)."""
+    __tablename__ = "shard_leases"
+
+    shard = Column(Integer, primary_key=True)
+    owner = Column(String, nullable=True)           # worker id holding the shard
+    expires_at = Column(Float, nullable=False, default=0.0)  # unix time; free once passed
+
+
+class ShardWorker(Base):
+    """Heartbeat of a running evaluation worker, used to size each worker's share."""
+    __tablename__ = "shard_workers"
+
+    worker_id = Column(String, primary_key=True)
+    seen_at = Column(Float, nullable=False)          # unix time of the last heartbeat
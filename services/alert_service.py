@@ -1,18 +1,37 @@
 # services/alert_service.py
-from datetime import datetime
-from typing import Optional, Union, Dict, Any
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union, Dict, Any, Iterable, List
 import logging
 
-from sqlalchemy import func
+from sqlalchemy import case, column, delete, func, insert, or_, select, table, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from models.alert import Alert, AlertDirection
-from services.db_service import get_db
-from utils.normalize_data import normalize_symbol, normalize_timeframe
+from config import ALERT_TTL_DAYS
+from models.alert import Alert, AlertArchive, AlertChange, AlertDirection
+from models.user import User
+from services.db_service import get_db, get_async_db
+from services.write_batcher import run_write
+from utils.normalize_data import normalize_symbol, normalize_timeframe, price_ticks
 from utils.get_data import get_price  # use top-level function
 
 logger = logging.getLogger(__name__)
 
 # --- helpers ---
+def _live(now: Optional[datetime] = None):
+    """SQL condition: the alert has not expired (yet)."""
+    return or_(Alert.expires_at.is_(None), Alert.expires_at > (now or datetime.utcnow()))
+
+
+def default_expiry(now: Optional[datetime] = None) -> Optional[datetime]:
+    """Expiry for a new alert from ALERT_TTL_DAYS (None = never expires)."""
+    if ALERT_TTL_DAYS <= 0:
+        return None
+    return (now or datetime.utcnow()) + timedelta(days=ALERT_TTL_DAYS)
+
+
 def _extract_price(price_resp: Union[dict, float, int, None]) -> Optional[float]:
     """
     Normalize get_price output into a float price or None.
@@ -77,19 +96,8 @@ def _canonicalize_timeframes(timeframes: Union[list, str]) -> str:
     return ",".join(unique_sorted)
 
 
-def create_alert(user_id: int, symbol: str, target_price: Union[float, str], timeframes: Union[list, str]):
-    """
-    Create an alert and determine direction by comparing current market price.
-    Returns the created Alert instance (SQLAlchemy object).
-
-    Duplicate prevention:
-      - If a pending (triggered=False) alert already exists for the same
-        user_id, normalized symbol, target_price (within epsilon) and the
-        same canonicalized timeframes, the existing alert is returned instead
-        of creating a new row.
-
-    timeframes may be a list (e.g. ['1','60']) or a comma-separated string.
-    """
+def _normalize_alert_args(symbol: str, target_price, timeframes) -> tuple:
+    """(normalized symbol, float target price, canonical timeframes) for a new alert."""
     # Normalize timeframes into canonical comma-separated string (order-insensitive)
     tf_str = _canonicalize_timeframes(timeframes)
 
@@ -104,50 +112,60 @@ def create_alert(user_id: int, symbol: str, target_price: Union[float, str], tim
         normalized_symbol = normalize_symbol(symbol)
     except Exception:
         normalized_symbol = str(symbol).upper()
+    return normalized_symbol, target_price, tf_str
+
+
+def _duplicate_stmt(user_id: int, symbol: str, ticks: int, tf_str: str):
+    """
+    Pending alert with the same user, symbol, price ticks and timeframes: a single
+    lookup on the unique index ux_alerts_pending_dedupe. Expired rows match too
+    (they hold the key until archived); see _find_duplicate().
+    """
+    return (
+        select(Alert)
+        .where(
+            Alert.user_id == user_id,
+            Alert.symbol == symbol,
+            Alert.price_ticks == ticks,
+            Alert.timeframes == tf_str,
+            Alert.triggered == False,
+        )
+        .limit(1)
+    )
 
-    # Duplicate check tolerance
-    EPSILON = 1e-8
 
-    # Check for duplicate pending alert (same user, symbol, price (within EPSILON), timeframes, not yet triggered)
+def _is_live(alert: Alert, now: Optional[datetime] = None) -> bool:
+    return alert.expires_at is None or alert.expires_at > (now or datetime.utcnow())
+
+
+def _mark_duplicate(existing, user_id, symbol, target_price, tf_str):
+    logger.info(
+        "Duplicate alert detected for user_id=%s symbol=%s price=%s tfs=%s — returning existing alert id=%s",
+        user_id, symbol, target_price, tf_str, existing.id
+    )
+    # transient flag for the caller
     try:
-        with get_db() as db:
-            existing = (
-                db.query(Alert)
-                .filter(
-                    Alert.user_id == user_id,
-                    Alert.symbol == normalized_symbol,
-                    func.abs(Alert.target_price - float(target_price)) < EPSILON,
-                    Alert.timeframes == tf_str,
-                    Alert.triggered == False,
-                )
-                .first()
-            )
-            if existing:
-                logger.info(
-                    "Duplicate alert detected for user_id=%s symbol=%s price=%s tfs=%s — returning existing alert id=%s",
-                    user_id, normalized_symbol, target_price, tf_str, existing.id
-                )
-                # refresh to be safe and mark transient flag for caller
-                db.refresh(existing)
-                try:
-                    setattr(existing, "_is_duplicate", True)
-                except Exception:
-                    pass
-                return existing
+        setattr(existing, "_is_duplicate", True)
     except Exception:
-        # If DB duplicate-check fails for some reason, log and continue to create alert
-        logger.exception("Failed to check for duplicate alert; proceeding to create new one")
+        pass
+    return existing
+
 
-    # Get current market price
+def _fetch_current_price(symbol: str) -> float:
+    """Current market price of `symbol` (blocking network call)."""
     try:
-        price_info = get_price(normalized_symbol)
-        logger.debug("get_price(%s) -> %s", normalized_symbol, price_info)
+        price_info = get_price(symbol)
+        logger.debug("get_price(%s) -> %s", symbol, price_info)
         current_price = _extract_price(price_info)
         if current_price is None:
-            raise RuntimeError(f"Failed to parse current price for {normalized_symbol} (response: {price_info})")
+            raise RuntimeError(f"Failed to parse current price for {symbol} (response: {price_info})")
     except Exception as e:
-        raise RuntimeError(f"Failed to fetch price for {normalized_symbol}: {e}") from e
+        raise RuntimeError(f"Failed to fetch price for {symbol}: {e}") from e
+    return current_price
+
 
+def _new_alert(user_id, symbol, target_price, ticks, tf_str, overlays, expires_at, current_price) -> Alert:
+    """Alert row with its direction decided against the current price."""
     # Determine direction and trigger status
     if target_price > current_price:
         direction = AlertDirection.ABOVE
@@ -163,27 +181,225 @@ def create_alert(user_id: int, symbol: str, target_price: Union[float, str], tim
         triggered = True
         triggered_at = datetime.utcnow()
 
+    return Alert(
+        user_id=user_id,
+        symbol=symbol,
+        target_price=float(target_price),
+        price_ticks=ticks,
+        direction=direction,
+        timeframes=tf_str,
+        overlays=overlays or None,
+        triggered=triggered,
+        triggered_at=triggered_at,
+        expires_at=expires_at or default_expiry(),
+    )
+
+
+def create_alert(user_id: int, symbol: str, target_price: Union[float, str], timeframes: Union[list, str], overlays: Optional[str] = None,
+                 expires_at: Optional[datetime] = None):
+    """
+    Create an alert and determine direction by comparing current market price.
+    Returns the created Alert instance (SQLAlchemy object).
+
+    Duplicate prevention:
+      - If a pending (triggered=False) alert already exists for the same
+        user_id, normalized symbol, target price (in ticks of the symbol's
+        precision, see price_ticks()) and the same canonicalized timeframes,
+        the existing alert is returned instead of creating a new row.
+      - The unique index ux_alerts_pending_dedupe enforces this: an insert that
+        loses a race with an identical one fails and returns the winner.
+
+    timeframes may be a list (e.g. ['1','60']) or a comma-separated string.
+    overlays is an optional chart overlay spec (e.g. "ema20,bb20") used for the alert's charts.
+    expires_at defaults to ALERT_TTL_DAYS after creation (see default_expiry()).
+    """
+    normalized_symbol, target_price, tf_str = _normalize_alert_args(symbol, target_price, timeframes)
+    ticks = price_ticks(normalized_symbol, target_price)
+    dup = _duplicate_stmt(user_id, normalized_symbol, ticks, tf_str)
+
+    # Check for duplicate pending alert (indexed lookup)
+    try:
+        with get_db() as db:
+            existing = db.execute(dup).scalars().first()
+        if existing is not None:
+            if _is_live(existing):
+                return _mark_duplicate(existing, user_id, normalized_symbol, target_price, tf_str)
+            # expired but not archived yet: it still holds the unique key
+            _archive_batch((Alert.id == existing.id, Alert.triggered == False), 1)
+    except Exception:
+        # If DB duplicate-check fails for some reason, log and continue to create alert
+        logger.exception("Failed to check for duplicate alert; proceeding to create new one")
+
+    current_price = _fetch_current_price(normalized_symbol)
+
     # Persist
     with get_db() as db:
-        alert = Alert(
-            user_id=user_id,
-            symbol=normalized_symbol,
-            target_price=float(target_price),
-            direction=direction,
-            timeframes=tf_str,
-            triggered=triggered,
-            triggered_at=triggered_at
-        )
+        alert = _new_alert(user_id, normalized_symbol, target_price, ticks, tf_str, overlays, expires_at, current_price)
         db.add(alert)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            # an identical alert was inserted concurrently
+            db.rollback()
+            existing = db.execute(dup).scalars().first()
+            if existing is None:
+                raise
+            return _mark_duplicate(existing, user_id, normalized_symbol, target_price, tf_str)
         db.refresh(alert)
         return alert
 
 
+async def create_alert_async(user_id: int, symbol: str, target_price: Union[float, str], timeframes: Union[list, str],
+                             overlays: Optional[str] = None, expires_at: Optional[datetime] = None):
+    """
+    create_alert() on the async session. Only the price lookup (network) runs in
+    the executor; the database work never leaves the event loop's driver thread.
+    """
+    normalized_symbol, target_price, tf_str = _normalize_alert_args(symbol, target_price, timeframes)
+    ticks = price_ticks(normalized_symbol, target_price)
+    dup = _duplicate_stmt(user_id, normalized_symbol, ticks, tf_str)
+
+    try:
+        async with get_async_db() as db:
+            existing = (await db.execute(dup)).scalars().first()
+            if existing is not None:
+                if _is_live(existing):
+                    return _mark_duplicate(existing, user_id, normalized_symbol, target_price, tf_str)
+                for stmt in _archive_stmts([existing.id]):
+                    await db.execute(stmt)
+                await db.commit()
+    except Exception:
+        logger.exception("Failed to check for duplicate alert; proceeding to create new one")
+
+    loop = asyncio.get_running_loop()
+    current_price = await loop.run_in_executor(None, _fetch_current_price, normalized_symbol)
+
+    async def insert(db):
+        alert = _new_alert(user_id, normalized_symbol, target_price, ticks, tf_str, overlays, expires_at, current_price)
+        db.add(alert)
+        return alert
+
+    # committed on its own or in the next group commit (see services.write_batcher)
+    try:
+        return await run_write(insert)
+    except IntegrityError:
+        async with get_async_db() as db:
+            existing = (await db.execute(dup)).scalars().first()
+        if existing is None:
+            raise
+        return _mark_duplicate(existing, user_id, normalized_symbol, target_price, tf_str)
+
+
+def _pending_stmt():
+    # owners are loaded with the alerts: the rows are used after their session is closed
+    return select(Alert).options(joinedload(Alert.user)).where(Alert.triggered == False, _live())
+
+
 def get_pending_alerts():
-    """Return all alerts that have not yet been triggered."""
+    """Return all alerts that have not yet been triggered or expired."""
+    with get_db() as db:
+        return db.execute(_pending_stmt()).scalars().all()
+
+
+async def get_pending_alerts_async():
+    async with get_async_db() as db:
+        return (await db.execute(_pending_stmt())).scalars().all()
+
+
+def get_change_watermark() -> int:
+    """Sequence number of the latest alert change (0 when none yet), even if since pruned."""
+    with get_db() as db:
+        return db.execute(_log_reach_stmt()).one()[1]
+
+
+async def get_change_watermark_async() -> int:
+    async with get_async_db() as db:
+        return (await db.execute(_log_reach_stmt())).one()[1]
+
+
+def get_pending_alert_changes(since_seq: int):
+    """
+    Delta of the pending-alert set since watermark `since_seq`.
+
+    Returns (pending_alerts, removed_ids, new_seq): alerts changed after the
+    watermark that are still pending (user eagerly loaded), ids of changed alerts
+    that are no longer pending (triggered or deleted), and the new watermark.
+    Returns None when the change log no longer reaches back to `since_seq`
+    (pruned, possibly down to nothing) or never reached it (a watermark from
+    another database), in which case the caller should reload everything.
+    In steady state this is an indexed range query returning no rows plus a
+    lookup of the log's last allocated seq.
+    """
+    with get_db() as db:
+        changes = db.execute(_changes_stmt(since_seq)).all()
+        if not changes or changes[0].seq > since_seq + 1:
+            oldest, last = db.execute(_log_reach_stmt()).one()
+            if _log_lost(since_seq, oldest, last):
+                return None
+        if not changes:
+            return [], [], since_seq
+
+        changed_ids = list(dict.fromkeys(c.alert_id for c in changes))
+        pending = []
+        for i in range(0, len(changed_ids), _BULK_CHUNK):
+            pending += db.execute(_changed_pending_stmt(changed_ids[i:i + _BULK_CHUNK])).scalars().all()
+        pending_ids = {a.id for a in pending}
+        removed = [i for i in changed_ids if i not in pending_ids]
+        return pending, removed, changes[-1].seq
+
+
+async def get_pending_alert_changes_async(since_seq: int):
+    """get_pending_alert_changes() on the async session."""
+    async with get_async_db() as db:
+        changes = (await db.execute(_changes_stmt(since_seq))).all()
+        if not changes or changes[0].seq > since_seq + 1:
+            oldest, last = (await db.execute(_log_reach_stmt())).one()
+            if _log_lost(since_seq, oldest, last):
+                return None
+        if not changes:
+            return [], [], since_seq
+
+        changed_ids = list(dict.fromkeys(c.alert_id for c in changes))
+        pending = []
+        for i in range(0, len(changed_ids), _BULK_CHUNK):
+            pending += (await db.execute(_changed_pending_stmt(changed_ids[i:i + _BULK_CHUNK]))).scalars().all()
+        pending_ids = {a.id for a in pending}
+        removed = [i for i in changed_ids if i not in pending_ids]
+        return pending, removed, changes[-1].seq
+
+
+# AUTOINCREMENT keeps the last seq handed out here, even once the log is pruned empty
+_sqlite_sequence = table("sqlite_sequence", column("name"), column("seq"))
+
+
+def _log_reach_stmt():
+    """(oldest seq still logged, last seq ever allocated) of the change log."""
+    last = select(_sqlite_sequence.c.seq).where(_sqlite_sequence.c.name == AlertChange.__tablename__).scalar_subquery()
+    return select(func.min(AlertChange.seq), func.coalesce(last, func.max(AlertChange.seq), 0))
+
+
+def _log_lost(since_seq: int, oldest: Optional[int], last: int) -> bool:
+    """True when changes after `since_seq` are missing from the log."""
+    if last < since_seq:
+        return True
+    return last > since_seq and (oldest is None or oldest > since_seq + 1)
+
+
+def _changes_stmt(since_seq: int):
+    return select(AlertChange.seq, AlertChange.alert_id).where(AlertChange.seq > since_seq).order_by(AlertChange.seq)
+
+
+def _changed_pending_stmt(ids):
+    return select(Alert).options(joinedload(Alert.user)).where(Alert.id.in_(ids), Alert.triggered == False, _live())
+
+
+def prune_alert_changes(max_age_seconds: int = 86400) -> int:
+    """Drop change-log rows older than `max_age_seconds`. Returns the number removed."""
+    cutoff = int(time.time()) - max_age_seconds
     with get_db() as db:
-        return db.query(Alert).filter_by(triggered=False).all()
+        removed = db.execute(delete(AlertChange).where(AlertChange.changed_at < cutoff)).rowcount
+        db.commit()
+        return removed
 
 
 def mark_alert_triggered(alert_id: int) -> Optional[Dict[str, Any]]:
@@ -193,30 +409,214 @@ def mark_alert_triggered(alert_id: int) -> Optional[Dict[str, Any]]:
     Returns a plain dict with primitive values (avoids returning ORM objects across threads).
     """
     with get_db() as db:
-        alert = db.query(Alert).filter_by(id=alert_id).first()
+        alert = db.execute(select(Alert).options(joinedload(Alert.user)).where(Alert.id == alert_id)).scalars().first()
         if not alert:
             return None
 
         alert.triggered = True
         alert.triggered_at = datetime.utcnow()
         db.commit()
-        db.refresh(alert)
+        return _alert_payload(alert)
+
+
+async def mark_alert_triggered_async(alert_id: int) -> Optional[Dict[str, Any]]:
+    async with get_async_db() as db:
+        alert = (await db.execute(select(Alert).options(joinedload(Alert.user)).where(Alert.id == alert_id))).scalars().first()
+        if not alert:
+            return None
+
+        alert.triggered = True
+        alert.triggered_at = datetime.utcnow()
+        await db.commit()
+        return _alert_payload(alert)
 
-        # Try to safely resolve user.chat_id without returning ORM relationship objects
+
+def _alert_payload(alert: Alert) -> Dict[str, Any]:
+    # Try to safely resolve user.chat_id without returning ORM relationship objects
+    user_chat_id = None
+    try:
+        # the owner is eagerly loaded; guard against a missing relationship anyway
+        if getattr(alert, "user", None) is not None:
+            user_chat_id = getattr(alert.user, "chat_id", None)
+    except Exception:
         user_chat_id = None
+
+    return {
+        "id": alert.id,
+        "symbol": alert.symbol,
+        "target_price": float(alert.target_price) if alert.target_price is not None else None,
+        "timeframes": alert.timeframes,
+        "overlays": alert.overlays,
+        "direction": getattr(alert.direction, "value", str(alert.direction)),
+        "user_chat_id": user_chat_id,
+        "triggered_at": alert.triggered_at.isoformat() if alert.triggered_at is not None else None,
+    }
+
+
+# keep IN (...) lists well below SQLite's bound-parameter limit
+_BULK_CHUNK = 500
+
+
+def mark_alerts_triggered(alert_ids: Iterable[int], trigger_candles: Optional[Dict[int, datetime]] = None) -> List[Dict[str, Any]]:
+    """
+    Mark many alerts as triggered in one transaction.
+
+    The UPDATE only matches rows that are still pending, so an alert fired by two
+    concurrent evaluations is returned (and notified) only once. Returns plain
+    dicts, shaped like mark_alert_triggered(), for the alerts this call fired;
+    chat ids come from a single join instead of per-alert lazy loads. Alerts
+    that expired in the meantime are not fired.
+    trigger_candles optionally maps alert id -> start of the candle that crossed.
+    """
+    ids = list(dict.fromkeys(int(i) for i in alert_ids))
+    if not ids:
+        return []
+
+    now = datetime.utcnow()
+    fired: List[int] = []
+    rows = []
+    with get_db() as db:
+        for i in range(0, len(ids), _BULK_CHUNK):
+            fired += db.execute(_mark_stmt(ids[i:i + _BULK_CHUNK], trigger_candles, now)).scalars().all()
+        for i in range(0, len(fired), _BULK_CHUNK):
+            rows += db.execute(_fired_rows_stmt(fired[i:i + _BULK_CHUNK])).all()
+        db.commit()
+    return [_fired_payload(row) for row in rows]
+
+
+async def mark_alerts_triggered_async(alert_ids: Iterable[int],
+                                      trigger_candles: Optional[Dict[int, datetime]] = None) -> List[Dict[str, Any]]:
+    """mark_alerts_triggered() on the async session."""
+    ids = list(dict.fromkeys(int(i) for i in alert_ids))
+    if not ids:
+        return []
+
+    now = datetime.utcnow()
+    fired: List[int] = []
+    rows = []
+    async with get_async_db() as db:
+        for i in range(0, len(ids), _BULK_CHUNK):
+            fired += (await db.execute(_mark_stmt(ids[i:i + _BULK_CHUNK], trigger_candles, now))).scalars().all()
+        for i in range(0, len(fired), _BULK_CHUNK):
+            rows += (await db.execute(_fired_rows_stmt(fired[i:i + _BULK_CHUNK]))).all()
+        await db.commit()
+    return [_fired_payload(row) for row in rows]
+
+
+def _mark_stmt(chunk: List[int], trigger_candles: Optional[Dict[int, datetime]], now: datetime):
+    """UPDATE ... RETURNING id firing the still-pending, live alerts of `chunk`."""
+    values = {"triggered": True, "triggered_at": now}
+    candles = {a: trigger_candles[a] for a in chunk if trigger_candles and trigger_candles.get(a)}
+    if candles:
+        values["trigger_candle_at"] = case(candles, value=Alert.id, else_=None)
+    return (
+        update(Alert)
+        .where(Alert.id.in_(chunk), Alert.triggered == False, _live(now))
+        .values(**values)
+        .returning(Alert.id)
+    )
+
+
+def _fired_rows_stmt(chunk: List[int]):
+    return (
+        select(
+            Alert.id, Alert.symbol, Alert.target_price, Alert.timeframes, Alert.overlays,
+            Alert.direction, Alert.triggered_at, Alert.trigger_candle_at, User.chat_id,
+        )
+        .outerjoin(User, User.id == Alert.user_id)
+        .where(Alert.id.in_(chunk))
+    )
+
+
+def _fired_payload(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "symbol": row.symbol,
+        "target_price": float(row.target_price) if row.target_price is not None else None,
+        "timeframes": row.timeframes,
+        "overlays": row.overlays,
+        "direction": getattr(row.direction, "value", str(row.direction)),
+        "user_chat_id": row.chat_id,
+        "triggered_at": row.triggered_at.isoformat() if row.triggered_at is not None else None,
+        "trigger_candle_at": row.trigger_candle_at.isoformat() if row.trigger_candle_at is not None else None,
+    }
+
+
+async def delete_user_alerts_async(user_id: int, alert_ids: Optional[Iterable[int]] = None, symbol: Optional[str] = None,
+                                   triggered: Optional[bool] = None) -> int:
+    """
+    Delete the user's alerts matching every given filter (ids, symbol, triggered
+    state) in one statement. Returns the number deleted.
+    """
+    stmt = delete(Alert).where(Alert.user_id == user_id)
+    if alert_ids is not None:
+        stmt = stmt.where(Alert.id.in_([int(i) for i in alert_ids]))
+    if symbol is not None:
         try:
-            # Accessing alert.user may raise if relationship is not configured/loaded; guard it
-            if getattr(alert, "user", None) is not None:
-                user_chat_id = getattr(alert.user, "chat_id", None)
+            symbol = normalize_symbol(symbol)
         except Exception:
-            user_chat_id = None
-
-        return {
-            "id": alert.id,
-            "symbol": alert.symbol,
-            "target_price": float(alert.target_price) if alert.target_price is not None else None,
-            "timeframes": alert.timeframes,
-            "direction": getattr(alert.direction, "value", str(alert.direction)),
-            "user_chat_id": user_chat_id,
-            "triggered_at": alert.triggered_at.isoformat() if alert.triggered_at is not None else None,
-        }
+            symbol = str(symbol).upper()
+        stmt = stmt.where(Alert.symbol == symbol)
+    if triggered is not None:
+        stmt = stmt.where(Alert.triggered == bool(triggered))
+    async with get_async_db() as db:
+        deleted = (await db.execute(stmt)).rowcount
+        await db.commit()
+        return deleted
+
+
+# --- expiry / archival ---
+_ARCHIVE_COLUMNS = [
+    "alert_id", "user_id", "symbol", "target_price", "direction", "timeframes", "overlays",
+    "status", "created_at", "triggered_at", "trigger_candle_at", "expires_at",
+]
+
+
+def _archive_stmts(ids: List[int]):
+    """INSERT ... SELECT into alerts_archive and the DELETE from alerts, for `ids`."""
+    status = case((Alert.triggered == True, "triggered"), else_="expired")
+    return (
+        insert(AlertArchive).from_select(
+            _ARCHIVE_COLUMNS,
+            select(
+                Alert.id, Alert.user_id, Alert.symbol, Alert.target_price, Alert.direction, Alert.timeframes,
+                Alert.overlays, status, Alert.created_at, Alert.triggered_at, Alert.trigger_candle_at,
+                Alert.expires_at,
+            ).where(Alert.id.in_(ids)),
+        ),
+        delete(Alert).where(Alert.id.in_(ids)),
+    )
+
+
+def _archive_batch(conditions, batch_size: int) -> int:
+    """
+    Move up to `batch_size` alerts matching `conditions` into alerts_archive and
+    delete them from alerts, in one short transaction. Returns the number moved.
+    """
+    with get_db() as db:
+        ids = db.execute(select(Alert.id).where(*conditions).order_by(Alert.id).limit(batch_size)).scalars().all()
+        if not ids:
+            return 0
+        for stmt in _archive_stmts(ids):
+            db.execute(stmt)
+        db.commit()
+        return len(ids)
+
+
+def expire_alerts(now: Optional[datetime] = None, batch_size: int = _BULK_CHUNK) -> int:
+    """
+    Archive one batch of pending alerts whose expires_at has passed (status
+    "expired"). Their deletion reaches the alert index through the change log.
+    Returns the number moved; call again while it equals `batch_size`.
+    """
+    now = now or datetime.utcnow()
+    return _archive_batch((Alert.triggered == False, Alert.expires_at <= now), batch_size)
+
+
+def archive_triggered_alerts(older_than_seconds: float, now: Optional[datetime] = None, batch_size: int = _BULK_CHUNK) -> int:
+    """
+    Archive one batch of alerts triggered more than `older_than_seconds` ago.
+    Returns the number moved; call again while it equals `batch_size`.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=older_than_seconds)
+    return _archive_batch((Alert.triggered == True, or_(Alert.triggered_at.is_(None), Alert.triggered_at < cutoff)), batch_size)
@@ -5,9 +5,11 @@ from utils.compute_fromdate import compute_from_date
 from utils.normalize_data import normalize_timeframe
 import time
 
-def get_chart(symbol, timeframe, alert_price=None, outputsize: int = 200, from_date=None, to_date=None):
+def get_chart(symbol, timeframe, alert_price=None, outputsize: int = 200, from_date=None, to_date=None, overlays=None, ohlc=None):
     """
     Thin wrapper to generate chart.
+    `overlays` is an optional indicator spec such as "ema20,sma200,bb20,vol".
+    `ohlc` is optional pre-fetched candle data (see generate_chart_image).
     """
     timeframe_normalized = normalize_timeframe(timeframe)
 
@@ -22,6 +24,8 @@ def get_chart(symbol, timeframe, alert_price=None, outputsize: int = 200, from_d
         timeframe=timeframe_normalized,
         from_date=from_date,
         to_date=to_date,
-        outputsize=outputsize
+        outputsize=outputsize,
+        overlays=overlays,
+        ohlc=ohlc,
     )
     return buf, period_minutes
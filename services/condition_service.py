@@ -0,0 +1,118 @@
+# services/condition_service.py
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+from sqlalchemy import case, select, update
+
+from models.condition_alert import ConditionAlert
+from models.user import User
+from services.db_service import get_db
+from utils.conditions import KINDS, dump_params
+from utils.normalize_data import normalize_symbol
+
+logger = logging.getLogger(__name__)
+
+# keep IN (...) lists well below SQLite's bound-parameter limit
+_BULK_CHUNK = 500
+
+
+def _to_dict(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "symbol": row.symbol,
+        "kind": row.kind,
+        "timeframe": row.timeframe,
+        "params": row.params,
+        "created_at": row.created_at,
+        "user_chat_id": row.chat_id,
+    }
+
+
+def create_condition_alert(user_id: int, symbol: str, kind: str, timeframe: str, params: dict):
+    """
+    Store a condition alert (see models.condition_alert for the generic form).
+    An identical pending condition of the same user is returned instead of a duplicate.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown condition kind: {kind}")
+    try:
+        normalized_symbol = normalize_symbol(symbol)
+    except Exception:
+        normalized_symbol = str(symbol).upper()
+    params_json = dump_params(params)
+
+    with get_db() as db:
+        existing = db.query(ConditionAlert).filter_by(
+            user_id=user_id, symbol=normalized_symbol, kind=kind, timeframe=timeframe,
+            params=params_json, triggered=False,
+        ).first()
+        if existing:
+            setattr(existing, "_is_duplicate", True)
+            return existing
+
+        cond = ConditionAlert(
+            user_id=user_id, symbol=normalized_symbol, kind=kind, timeframe=timeframe, params=params_json,
+        )
+        db.add(cond)
+        db.commit()
+        db.refresh(cond)
+        return cond
+
+
+def _select_with_chat():
+    return select(
+        ConditionAlert.id, ConditionAlert.user_id, ConditionAlert.symbol, ConditionAlert.kind,
+        ConditionAlert.timeframe, ConditionAlert.params, ConditionAlert.created_at, User.chat_id,
+    ).outerjoin(User, User.id == ConditionAlert.user_id)
+
+
+def get_pending_conditions() -> List[Dict[str, Any]]:
+    """All untriggered condition alerts as plain dicts (with the owner's chat id)."""
+    with get_db() as db:
+        rows = db.execute(_select_with_chat().where(ConditionAlert.triggered == False)).all()
+        return [_to_dict(r) for r in rows]
+
+
+def get_user_conditions(user_id: int) -> list:
+    with get_db() as db:
+        return db.query(ConditionAlert).filter_by(user_id=user_id, triggered=False).order_by(ConditionAlert.id).all()
+
+
+def delete_condition_alert(condition_id: int, user_id: int) -> bool:
+    """Delete a condition alert owned by `user_id`. Returns False when not found."""
+    with get_db() as db:
+        deleted = db.query(ConditionAlert).filter_by(id=condition_id, user_id=user_id).delete()
+        db.commit()
+        return bool(deleted)
+
+
+def mark_conditions_triggered(condition_ids: Iterable[int], trigger_candles: Optional[Dict[int, datetime]] = None) -> List[Dict[str, Any]]:
+    """
+    Mark condition alerts triggered in one transaction. Only still-pending rows
+    are updated, so each condition is returned (and notified) once.
+    """
+    ids = list(dict.fromkeys(int(i) for i in condition_ids))
+    if not ids:
+        return []
+    now = datetime.utcnow()
+    fired: List[int] = []
+    rows = []
+    with get_db() as db:
+        for i in range(0, len(ids), _BULK_CHUNK):
+            chunk = ids[i:i + _BULK_CHUNK]
+            values = {"triggered": True, "triggered_at": now}
+            candles = {c: trigger_candles[c] for c in chunk if trigger_candles and trigger_candles.get(c)}
+            if candles:
+                values["trigger_candle_at"] = case(candles, value=ConditionAlert.id, else_=None)
+            fired += db.execute(
+                update(ConditionAlert)
+                .where(ConditionAlert.id.in_(chunk), ConditionAlert.triggered == False)
+                .values(**values)
+                .returning(ConditionAlert.id)
+            ).scalars().all()
+        for i in range(0, len(fired), _BULK_CHUNK):
+            rows += db.execute(_select_with_chat().where(ConditionAlert.id.in_(fired[i:i + _BULK_CHUNK]))).all()
+        db.commit()
+    return [_to_dict(r) for r in rows]
@@ -1,25 +1,60 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
-from config import DB_PATH
-from contextlib import contextmanager
+from config import DB_PATH, DB_BUSY_TIMEOUT_MS, DB_SYNCHRONOUS
+from contextlib import asynccontextmanager, contextmanager
 
 
 # SQLite connection string
 DATABASE_URL = f"sqlite:///{DB_PATH}"
+# Same database through aiosqlite, for code running on the event loop
+ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+
+# page cache per connection (negative = KiB)
+DB_CACHE_SIZE_KIB = 16384
 
 # Create engine
 engine = create_engine(DATABASE_URL, echo=False)
 
+
+def apply_pragmas(dbapi_connection, connection_record=None):
+    """
+    Per-connection SQLite settings: WAL so readers (handlers, the alert checker)
+    never wait for a writer, a busy timeout instead of immediate "database is
+    locked" errors, and NORMAL sync, which is durable enough under WAL.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KIB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+event.listen(engine, "connect", apply_pragmas)
+
 # Session maker
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine / sessions: aiosqlite runs each connection on its own thread, so
+# database work neither blocks the loop nor takes default-executor workers
+async_engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
+event.listen(async_engine.sync_engine, "connect", apply_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for models
 Base = declarative_base()
 
-def init_db():
-    """Initialize the database and create all tables."""
-    from models import user  # Import all models here
-    Base.metadata.create_all(bind=engine)
+def init_db(bind=None):
+    """Initialize the database: create missing tables, then apply pending migrations (services.migrations)."""
+    from models import user, alert, condition_alert, shard_lease  # Import all models here
+    from services.migrations import migrate
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    migrate(bind)
 
 @contextmanager
 def get_db():
@@ -27,4 +62,18 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@asynccontextmanager
+async def get_async_db():
+    db = AsyncSessionLocal()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def close_async_db():
+    """Close pooled async connections (their driver threads would keep the process alive)."""
+    await async_engine.dispose()
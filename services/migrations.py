@@ -0,0 +1,114 @@
+# services/migrations.py
+"""
+Versioned schema migrations for the SQLite database.
+
+PRAGMA user_version stores the number of the last applied migration. init_db()
+runs create_all() (new tables, with every declared index) and then each
+migration above the stored version, in order, each in its own transaction.
+Migrations must be idempotent: on a fresh database create_all() has already
+built what they add.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+
+from services.db_service import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _add_missing_columns(conn) -> None:
+    """
+    create_all() never alters existing tables, so add newly declared nullable
+    columns to tables created by an older version of the bot.
+    """
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
+
+
+def _create_declared_indexes(conn) -> None:
+    """Create every index declared on the models that an existing database lacks, then refresh planner stats."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for index in table.indexes:
+            # indexes over columns a later migration adds are created by that migration
+            if all(c.name in existing for c in index.columns):
+                index.create(conn, checkfirst=True)
+    conn.exec_driver_sql("ANALYZE")
+
+
+def _alert_price_ticks(conn) -> None:
+    """
+    Add alerts.price_ticks, fill it from target_price at each symbol's precision
+    and replace the float-range duplicate index with the unique partial one.
+    Pending duplicates that already exist keep NULL ticks (NULLs never conflict),
+    so no user alert is dropped.
+    """
+    from utils.normalize_data import price_ticks
+
+    columns = {c["name"] for c in inspect(conn).get_columns("alerts")}
+    if "price_ticks" not in columns:
+        conn.exec_driver_sql('ALTER TABLE "alerts" ADD COLUMN "price_ticks" INTEGER')
+
+    rows = conn.exec_driver_sql(
+        "SELECT id, user_id, symbol, target_price, timeframes, triggered FROM alerts "
+        "WHERE price_ticks IS NULL ORDER BY id"
+    ).all()
+    pending = {
+        tuple(r) for r in conn.exec_driver_sql(
+            "SELECT user_id, symbol, price_ticks, timeframes FROM alerts WHERE triggered = 0 AND price_ticks IS NOT NULL"
+        )
+    }
+    updates = []
+    for alert_id, user_id, symbol, target_price, timeframes, triggered in rows:
+        ticks = price_ticks(symbol, target_price)
+        if not triggered:
+            key = (user_id, symbol, ticks, timeframes)
+            if key in pending:
+                continue
+            pending.add(key)
+        updates.append({"ticks": ticks, "id": alert_id})
+    if updates:
+        conn.execute(text("UPDATE alerts SET price_ticks = :ticks WHERE id = :id"), updates)
+
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_alerts_dedupe")
+    for index in Base.metadata.tables["alerts"].indexes:
+        index.create(conn, checkfirst=True)
+    conn.exec_driver_sql("ANALYZE")
+
+
+# (version, description, fn(connection)); append only, never renumber
+MIGRATIONS = [
+    (1, "add columns missing from tables created before versioning", _add_missing_columns),
+    (2, "indexes for pending scans, per-user listings and duplicate checks", _create_declared_indexes),
+    (3, "integer price ticks with a unique index for pending-alert duplicates", _alert_price_ticks),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar() or 0
+
+
+def migrate(engine) -> int:
+    """Apply pending migrations to `engine`'s database. Returns the resulting version."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    for number, description, step in MIGRATIONS:
+        if number <= version:
+            continue
+        logger.info("[DB] Applying migration %d: %s", number, description)
+        with engine.begin() as conn:
+            step(conn)
+            # PRAGMA does not take bound parameters; number is a trusted int
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(number)}")
+        version = number
+    return version
@@ -0,0 +1,249 @@
+# services/notification_service.py
+"""
+Queued, rate-aware delivery of Telegram notifications.
+
+Callers submit an async send callable per message. Each chat has its own queue
+(lower priority values first, so trigger texts go before charts); a chat becomes
+ready again NOTIFY_PER_CHAT_INTERVAL after its last send, and worker tasks take
+the most urgent message of any ready chat, paced globally to NOTIFY_GLOBAL_RATE
+per second. Workers never sleep on a chat, so a backlog in one chat does not
+hold up the others. RetryAfter pushes the global pace back and puts the message
+back at the front of its chat's queue.
+
+Slow work a message needs (e.g. rendering a chart) goes in `prepare`: it runs
+before the message is queued for a send slot and its result is passed to send.
+"""
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+
+from config import NOTIFY_GLOBAL_RATE, NOTIFY_PER_CHAT_INTERVAL, NOTIFY_WORKERS
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_TEXT = 0
+PRIORITY_CHART = 1
+
+# attempts per message when Telegram keeps answering RetryAfter
+MAX_SEND_ATTEMPTS = 5
+
+SendFactory = Callable[..., Awaitable[object]]
+PrepareFactory = Callable[[], Awaitable[object]]
+
+
+def _retry_seconds(err: RetryAfter) -> float:
+    value = err.retry_after
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+class NotificationDispatcher:
+    def __init__(self, workers: int = None, global_rate: float = None, per_chat_interval: float = None):
+        self.workers = NOTIFY_WORKERS if workers is None else workers
+        rate = NOTIFY_GLOBAL_RATE if global_rate is None else global_rate
+        self.global_interval = 1.0 / rate if rate > 0 else 0.0
+        self.per_chat_interval = NOTIFY_PER_CHAT_INTERVAL if per_chat_interval is None else per_chat_interval
+
+        self._seq = itertools.count()
+        self._tasks: list = []
+        self._global_next = 0.0
+        # chat_id -> monotonic time of the next free send slot
+        self._chat_next: Dict[object, float] = {}
+        # chat_id -> heap of (priority, seq, send, label, queued_at, attempt)
+        self._chats: Dict[object, list] = {}
+        # chat_id -> (key, ticket) of its live schedule entry, key being the
+        # (priority, seq) of the chat's head message; heap entries with any
+        # other ticket are stale and skipped
+        self._scheduled: Dict[object, Tuple[Tuple[int, int], int]] = {}
+        self._tickets = itertools.count()
+        self._waiting: List[tuple] = []   # (ready_at, key, ticket, chat_id): chats still inside their interval
+        self._ready: List[tuple] = []     # (key, ticket, chat_id): chats allowed to send now
+        self._changed = asyncio.Event()
+        self._queued = 0
+        self._unfinished = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._preparing: set = set()
+        self._prepare_slots: Optional[asyncio.Semaphore] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self.loop = asyncio.get_running_loop()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"notify-{i}") for i in range(max(1, self.workers))
+        ]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks + list(self._preparing), []
+        self._preparing.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def join(self) -> None:
+        """Wait until every submitted message has been handled."""
+        await self._idle.wait()
+
+    def qsize(self) -> int:
+        return self._queued
+
+    def submit(self, chat_id, send: SendFactory, priority: int = PRIORITY_TEXT, label: str = "",
+               prepare: PrepareFactory = None) -> None:
+        """
+        Queue `send()` for delivery to `chat_id`; never blocks the caller. With
+        `prepare`, `send(await prepare())` is queued once prepare has finished.
+        """
+        seq = next(self._seq)
+        self._unfinished += 1
+        self._idle.clear()
+        if prepare is None:
+            self._push(chat_id, (priority, seq, send, label, time.monotonic(), 1))
+            return
+        if self._prepare_slots is None:
+            self._prepare_slots = asyncio.Semaphore(max(1, self.workers))
+        task = asyncio.create_task(self._prepare(chat_id, send, priority, seq, label, prepare))
+        self._preparing.add(task)
+        task.add_done_callback(self._preparing.discard)
+
+    async def _prepare(self, chat_id, send, priority, seq, label, prepare) -> None:
+        queued_at = time.monotonic()
+        try:
+            async with self._prepare_slots:
+                prepared = await prepare()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.incr("notify.failed")
+            logger.exception("[Notify] Failed to prepare %s for %s: %s", label or "message", chat_id, e)
+            self._task_done()
+            return
+        self._push(chat_id, (priority, seq, functools.partial(send, prepared), label, queued_at, 1))
+
+    def _push(self, chat_id, item) -> None:
+        heapq.heappush(self._chats.setdefault(chat_id, []), item)
+        self._queued += 1
+        metrics.set_gauge("notify.queue_depth", self._queued)
+        self._schedule(chat_id)
+
+    def _schedule(self, chat_id) -> None:
+        """(Re)file `chat_id` under the key of its most urgent message."""
+        head = self._chats[chat_id][0]
+        key = (head[0], head[1])
+        current = self._scheduled.get(chat_id)
+        if current is not None and current[0] == key:
+            return
+        ticket = next(self._tickets)
+        self._scheduled[chat_id] = (key, ticket)
+        heapq.heappush(self._waiting, (self._chat_next.get(chat_id, 0.0), key, ticket, chat_id))
+        self._changed.set()
+
+    def _task_done(self) -> None:
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._idle.set()
+
+    def _take(self, now: float):
+        """Most urgent message of any ready chat, booking its send slot; None if none may go yet."""
+        while self._waiting and self._waiting[0][0] <= now:
+            _ready_at, key, ticket, chat_id = heapq.heappop(self._waiting)
+            if self._scheduled.get(chat_id) == (key, ticket):
+                heapq.heappush(self._ready, (key, ticket, chat_id))
+        while self._ready and self._scheduled.get(self._ready[0][2]) != self._ready[0][:2]:
+            heapq.heappop(self._ready)
+        if not self._ready or self._global_next > now:
+            return None
+
+        _key, _ticket, chat_id = heapq.heappop(self._ready)
+        del self._scheduled[chat_id]
+        queue = self._chats[chat_id]
+        item = heapq.heappop(queue)
+        self._queued -= 1
+        metrics.set_gauge("notify.queue_depth", self._queued)
+        self._global_next = now + self.global_interval
+        self._chat_next[chat_id] = now + self.per_chat_interval
+        if queue:
+            self._schedule(chat_id)
+        else:
+            del self._chats[chat_id]
+        # forget chats that have been idle longer than their interval
+        if len(self._chat_next) > 1024:
+            self._chat_next = {c: t for c, t in self._chat_next.items() if t > now or c in self._chats}
+        return chat_id, item
+
+    def _wake_in(self, now: float) -> Optional[float]:
+        """Seconds until a queued message may be sent, or None when nothing is queued."""
+        if self._ready:
+            return max(0.0, self._global_next - now)
+        if self._waiting:
+            return max(0.0, max(self._waiting[0][0], self._global_next) - now)
+        return None
+
+    async def _next(self):
+        while True:
+            now = time.monotonic()
+            taken = self._take(now)
+            if taken is not None:
+                return taken
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), self._wake_in(now))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            chat_id, item = await self._next()
+            priority, seq, send, label, queued_at, attempt = item
+            finished = True
+            try:
+                await send()
+                metrics.incr("notify.sent")
+                metrics.observe("notify.send_latency", time.monotonic() - queued_at)
+            except asyncio.CancelledError:
+                raise
+            except RetryAfter as e:
+                delay = _retry_seconds(e)
+                metrics.incr("notify.retry_after")
+                # Telegram's limit applies to the whole bot: hold every worker back
+                self._global_next = max(self._global_next, time.monotonic() + delay)
+                if attempt < MAX_SEND_ATTEMPTS:
+                    logger.warning("[Notify] Flood limit for %s (%s), retrying in %.1fs (attempt %d)", chat_id, label, delay, attempt)
+                    self._push(chat_id, (priority, seq, send, label, queued_at, attempt + 1))
+                    finished = False
+                else:
+                    metrics.incr("notify.failed")
+                    logger.error("[Notify] Giving up on %s to %s after %d flood limits", label or "message", chat_id, attempt)
+            except Exception as e:
+                metrics.incr("notify.failed")
+                logger.exception("[Notify] Failed to deliver %s to %s: %s", label or "message", chat_id, e)
+            finally:
+                if finished:
+                    self._task_done()
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    """Shared dispatcher, started on the running event loop."""
+    global _dispatcher
+    loop = asyncio.get_running_loop()
+    if _dispatcher is None or _dispatcher.loop is not loop:
+        _dispatcher = NotificationDispatcher()
+        _dispatcher.start()
+    return _dispatcher
+
+
+async def stop_dispatcher() -> None:
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.stop()
+        _dispatcher = None
@@ -0,0 +1,115 @@
+# services/shard_service.py
+"""
+Symbol sharding for alert evaluation across worker processes.
+
+Symbols hash (crc32) into ALERT_SHARDS buckets. Each worker heartbeats into
+shard_workers and holds leases in shard_leases. A lease is claimed with a
+conditional UPDATE, so at any moment at most one worker owns a shard. Every
+renewal keeps roughly an equal share per live worker: extra shards are
+released for newcomers. Leases of a dead worker expire after
+SHARD_LEASE_SECONDS and are picked up by the survivors.
+"""
+import logging
+import math
+import os
+import socket
+import time
+import uuid
+import zlib
+from typing import Set
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from config import ALERT_SHARDS, SHARD_LEASE_SECONDS
+from models.shard_lease import ShardLease, ShardWorker
+from services.db_service import get_db
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def shard_of(symbol: str, shards: int = None) -> int:
+    """Stable shard of a symbol (same in every process, unlike hash())."""
+    shards = ALERT_SHARDS if shards is None else shards
+    return zlib.crc32(str(symbol).strip().upper().encode()) % max(1, shards)
+
+
+def renew_leases(worker_id: str = WORKER_ID, shards: int = None, ttl: float = None, now: float = None) -> Set[int]:
+    """
+    Heartbeat, renew this worker's leases and rebalance. Returns the shards this
+    worker owns until now + ttl.
+    """
+    shards = ALERT_SHARDS if shards is None else shards
+    ttl = SHARD_LEASE_SECONDS if ttl is None else ttl
+    now = time.time() if now is None else now
+    expires = now + ttl
+
+    with get_db() as db:
+        db.execute(
+            insert(ShardWorker).values(worker_id=worker_id, seen_at=now)
+            .on_conflict_do_update(index_elements=[ShardWorker.worker_id], set_={"seen_at": now})
+        )
+        db.execute(delete(ShardWorker).where(ShardWorker.seen_at < now - ttl))
+        db.execute(
+            insert(ShardLease).values([{"shard": s, "owner": None, "expires_at": 0.0} for s in range(shards)])
+            .on_conflict_do_nothing(index_elements=[ShardLease.shard])
+        )
+
+        live = db.execute(select(func.count()).select_from(ShardWorker)).scalar() or 1
+        share = math.ceil(shards / live)
+
+        owned = set(db.execute(
+            select(ShardLease.shard).where(
+                ShardLease.owner == worker_id, ShardLease.expires_at >= now, ShardLease.shard < shards,
+            )
+        ).scalars())
+
+        # more than a fair share: hand the surplus back for workers that just joined
+        surplus = sorted(owned)[share:]
+        if surplus:
+            db.execute(
+                update(ShardLease)
+                .where(ShardLease.shard.in_(surplus), ShardLease.owner == worker_id)
+                .values(owner=None, expires_at=0.0)
+            )
+            owned -= set(surplus)
+
+        if owned:
+            db.execute(
+                update(ShardLease)
+                .where(ShardLease.shard.in_(owned), ShardLease.owner == worker_id)
+                .values(expires_at=expires)
+            )
+
+        # claim free or expired shards up to the share; the WHERE makes each claim atomic
+        if len(owned) < share:
+            free = db.execute(
+                select(ShardLease.shard)
+                .where(ShardLease.shard < shards, ShardLease.expires_at < now)
+                .order_by(ShardLease.shard)
+            ).scalars().all()
+            for shard in free:
+                if len(owned) >= share:
+                    break
+                claimed = db.execute(
+                    update(ShardLease)
+                    .where(ShardLease.shard == shard, ShardLease.expires_at < now)
+                    .values(owner=worker_id, expires_at=expires)
+                ).rowcount
+                if claimed:
+                    owned.add(shard)
+        db.commit()
+
+    return owned
+
+
+def release_leases(worker_id: str = WORKER_ID) -> None:
+    """Give up every shard immediately (on shutdown) so other workers take over."""
+    with get_db() as db:
+        db.execute(
+            update(ShardLease).where(ShardLease.owner == worker_id).values(owner=None, expires_at=0.0)
+        )
+        db.execute(delete(ShardWorker).where(ShardWorker.worker_id == worker_id))
+        db.commit()
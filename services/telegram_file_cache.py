@@ -0,0 +1,88 @@
+# services/telegram_file_cache.py
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on remembered uploads; oldest entries are evicted first
+MAX_CACHED_FILE_IDS = 2048
+
+_file_ids: "OrderedDict[str, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_key(buf) -> str:
+    """Stable key for a rendered image: sha256 of its bytes."""
+    data = buf.getvalue() if hasattr(buf, "getvalue") else bytes(buf)
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_file_id(key: str) -> Optional[str]:
+    with _lock:
+        file_id = _file_ids.get(key)
+        if file_id is not None:
+            _file_ids.move_to_end(key)
+        return file_id
+
+
+def remember_file_id(key: str, file_id: str) -> None:
+    with _lock:
+        _file_ids[key] = file_id
+        _file_ids.move_to_end(key)
+        while len(_file_ids) > MAX_CACHED_FILE_IDS:
+            _file_ids.popitem(last=False)
+
+
+def forget_file_id(key: str) -> None:
+    with _lock:
+        _file_ids.pop(key, None)
+
+
+def _extract_file_id(message) -> Optional[str]:
+    """Largest PhotoSize file_id from a sent Message, or None."""
+    try:
+        photos = getattr(message, "photo", None)
+        if photos:
+            file_id = photos[-1].file_id
+            if isinstance(file_id, str) and file_id:
+                return file_id
+    except Exception:
+        pass
+    return None
+
+
+async def send_photo_cached(send, photo, filename: str = None, caption: str = None, **kwargs):
+    """
+    Send `photo` (a BytesIO) through `send`, reusing a Telegram file_id when the
+    same bytes were uploaded before.
+
+    `send` is any photo-sending coroutine function, e.g. `update.message.reply_photo`
+    or `functools.partial(context.bot.send_photo, chat_id=chat_id)`.
+    Returns whatever `send` returns (the sent Message).
+    """
+    key = content_key(photo)
+    file_id = get_file_id(key)
+
+    if file_id is not None:
+        try:
+            return await send(photo=file_id, caption=caption, **kwargs)
+        except BadRequest as e:
+            # file_id no longer valid for this bot -> drop it and upload again
+            logger.info("Cached file_id rejected (%s); re-uploading", e)
+            forget_file_id(key)
+
+    try:
+        photo.seek(0)
+    except Exception:
+        pass
+
+    message = await send(photo=photo, filename=filename, caption=caption, **kwargs)
+    sent_id = _extract_file_id(message)
+    if sent_id:
+        remember_file_id(key, sent_id)
+    return message
@@ -1,7 +1,56 @@
 # user_service.py
 
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+
 from models.user import User
-from services.db_service import get_db
+from services.db_service import get_db, get_async_db
+from services.write_batcher import run_write
+
+# chat_id -> users.id for recently seen chats, so hot handlers resolve the
+# user without a database round trip. Ids never change once created; entries
+# are dropped when the user row is deleted through the ORM (see below).
+MAX_CACHED_USERS = 10000
+
+_user_ids: "OrderedDict[int, int]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def cached_user_id(chat_id) -> Optional[int]:
+    with _lock:
+        user_id = _user_ids.get(chat_id)
+        if user_id is not None:
+            _user_ids.move_to_end(chat_id)
+        return user_id
+
+
+def remember_user(chat_id, user_id) -> None:
+    with _lock:
+        _user_ids[chat_id] = user_id
+        _user_ids.move_to_end(chat_id)
+        while len(_user_ids) > MAX_CACHED_USERS:
+            _user_ids.popitem(last=False)
+
+
+def forget_user(chat_id) -> None:
+    with _lock:
+        _user_ids.pop(chat_id, None)
+
+
+def clear_user_cache() -> None:
+    with _lock:
+        _user_ids.clear()
+
+
+@event.listens_for(User, "after_delete")
+def _forget_deleted_user(mapper, connection, target):
+    # bulk DELETE statements bypass this hook; call forget_user()/clear_user_cache() after those
+    forget_user(target.chat_id)
+
 
 def get_or_create_user(chat_id, username=None, first_name=None, last_name=None):
     with get_db() as db:
@@ -16,4 +65,55 @@ def get_or_create_user(chat_id, username=None, first_name=None, last_name=None):
             db.add(user)
             db.commit()
             db.refresh(user)
+        remember_user(chat_id, user.id)
         return user
+
+
+async def get_or_create_user_async(chat_id, username=None, first_name=None, last_name=None):
+    async with get_async_db() as db:
+        user = (await db.execute(select(User).where(User.chat_id == chat_id))).scalars().first()
+    if user is None:
+        async def insert(session):
+            # re-checked inside the write: an earlier op of the same batch may have added it
+            for pending in session.new:
+                if isinstance(pending, User) and pending.chat_id == chat_id:
+                    return pending
+            existing = (await session.execute(select(User).where(User.chat_id == chat_id))).scalars().first()
+            if existing is not None:
+                return existing
+            new_user = User(
+                chat_id=chat_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name
+            )
+            session.add(new_user)
+            return new_user
+
+        try:
+            user = await run_write(insert)
+        except IntegrityError:
+            # another process created the same chat's user first
+            async with get_async_db() as db:
+                user = (await db.execute(select(User).where(User.chat_id == chat_id))).scalars().one()
+    remember_user(chat_id, user.id)
+    return user
+
+
+async def get_or_create_user_id_async(chat_id, username=None, first_name=None, last_name=None) -> int:
+    """users.id for `chat_id`, from the identity cache when possible (creating the user if needed)."""
+    user_id = cached_user_id(chat_id)
+    if user_id is None:
+        user_id = (await get_or_create_user_async(chat_id, username, first_name, last_name)).id
+    return user_id
+
+
+async def find_user_id_async(chat_id) -> Optional[int]:
+    """users.id for `chat_id` without creating it; None for unknown chats."""
+    user_id = cached_user_id(chat_id)
+    if user_id is None:
+        async with get_async_db() as db:
+            user_id = (await db.execute(select(User.id).where(User.chat_id == chat_id))).scalar()
+        if user_id is not None:
+            remember_user(chat_id, user_id)
+    return user_id
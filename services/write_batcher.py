@@ -0,0 +1,123 @@
+# services/write_batcher.py
+"""
+Group commit for small async writes.
+
+Each write is an `async def op(session)` that adds/updates rows and returns a
+result (typically the ORM object it added: its primary key is set once the
+batch is flushed). Ops should not flush themselves.
+
+With batching on (DB_WRITE_BATCH_MS > 0), writes arriving within the window run
+in one session, are flushed together (one multi-row INSERT ... RETURNING per
+table) and share a single COMMIT, so a burst pays for one disk flush instead of
+one per row; each caller's await returns once the batch is committed.
+
+When the batch fails (e.g. one op violates a unique index) it is rolled back
+and every op is retried in its own transaction, so only the offending caller
+sees the error. Ops may therefore run twice: they must build their objects
+inside the op and have no side effects outside the session.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from config import DB_WRITE_BATCH_MS, DB_WRITE_BATCH_MAX
+from services.db_service import get_async_db
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[object], Awaitable[object]]
+
+
+async def _run_alone(op: WriteOp):
+    async with get_async_db() as session:
+        result = await op(session)
+        await session.commit()
+        return result
+
+
+class WriteBatcher:
+    def __init__(self, window_ms: float = None, max_batch: int = None):
+        self.window = (DB_WRITE_BATCH_MS if window_ms is None else window_ms) / 1000.0
+        self.max_batch = max(1, DB_WRITE_BATCH_MAX if max_batch is None else max_batch)
+        self._pending: List[Tuple[WriteOp, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def run(self, op: WriteOp):
+        """Queue `op` for the next batch; returns its result once the batch is durable."""
+        self.loop = asyncio.get_running_loop()
+        future = self.loop.create_future()
+        self._pending.append((op, future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flusher(), name="db-write-batcher")
+        return await future
+
+    async def _flusher(self) -> None:
+        while self._pending:
+            if len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.window)
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            await self._commit(batch)
+
+    async def _commit(self, batch) -> None:
+        live = [(op, fut) for op, fut in batch if not fut.done()]
+        if not live:
+            return
+        try:
+            async with get_async_db() as session:
+                results = [await op(session) for op, _fut in live]
+                await session.commit()
+        except Exception as e:
+            logger.warning("[WriteBatcher] Batch of %d failed (%s); retrying one by one", len(live), e)
+            metrics.incr("db.write_batch.split")
+            for op, fut in live:
+                try:
+                    result = await _run_alone(op)
+                except Exception as err:
+                    if not fut.done():
+                        fut.set_exception(err)
+                else:
+                    if not fut.done():
+                        fut.set_result(result)
+            return
+        metrics.incr("db.write_batch.commits")
+        metrics.incr("db.write_batch.writes", len(live))
+        for (_op, fut), result in zip(live, results):
+            if not fut.done():
+                fut.set_result(result)
+
+    async def stop(self) -> None:
+        """Commit whatever is still queued."""
+        if self._task is not None and not self._task.done():
+            await self._task
+        self._task = None
+
+
+_batcher: Optional[WriteBatcher] = None
+
+
+def get_write_batcher() -> Optional[WriteBatcher]:
+    """Shared batcher for the running event loop, or None when batching is off."""
+    global _batcher
+    if DB_WRITE_BATCH_MS <= 0:
+        return None
+    loop = asyncio.get_running_loop()
+    if _batcher is None or (_batcher.loop is not None and _batcher.loop is not loop):
+        _batcher = WriteBatcher()
+    return _batcher
+
+
+async def stop_write_batcher() -> None:
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+
+async def run_write(op: WriteOp):
+    """Run a write op in its own transaction, or in the next group commit when batching is on."""
+    batcher = get_write_batcher()
+    if batcher is None:
+        return await _run_alone(op)
+    return await batcher.run(op)
@@ -1,14 +1,12 @@
 # ma_basic_c.py
 import pandas as pd
 import numpy as np
-try:
-    import pandas_ta as pta
-except Exception:
-    pta = None
 
 from backtesting import Strategy
 from backtesting.lib import crossover
 
+from utils import indicators
+
 
 def to_series(x) -> pd.Series:
     if isinstance(x, pd.Series):
@@ -29,12 +27,9 @@ def ssma(close_data: pd.Series, ssma_length: int) -> pd.Series:
         raise ValueError("ssma_length must be > 0")
     if len(series) < ssma_length:
         return series.rolling(ssma_length).mean()
-    values = series.to_numpy(copy=True).astype(float)
-    ssma_vals = np.empty_like(values)
-    initial_mean = values[:ssma_length].mean()
-    ssma_vals[:ssma_length] = initial_mean
-    for i in range(ssma_length, len(values)):
-        ssma_vals[i] = (ssma_vals[i - 1] * (ssma_length - 1) + values[i]) / ssma_length
+    ssma_vals = indicators.ssma(series.to_numpy(), ssma_length)
+    # hold the seed over the warm-up bars, as the strategy always has
+    ssma_vals[:ssma_length - 1] = ssma_vals[ssma_length - 1]
     return pd.Series(ssma_vals, index=series.index)
 
 
@@ -42,19 +37,7 @@ def ema(close_data: pd.Series, ema_length: int) -> pd.Series:
     series = to_series(close_data)
     if ema_length <= 0:
         raise ValueError("ema_length must be > 0")
-    if pta is not None:
-        try:
-            try:
-                res = pta.ema(series, length=ema_length)
-            except TypeError:
-                res = pta.ema(close=series, length=ema_length)
-            if isinstance(res, pd.DataFrame):
-                res = res.iloc[:, 0]
-            res.index = series.index
-            return res.astype(float)
-        except Exception:
-            pass
-    return series.ewm(span=ema_length, adjust=False).mean()
+    return pd.Series(indicators.ema(series.to_numpy(), ema_length), index=series.index)
 
 
 class Ma_cross(Strategy):
@@ -0,0 +1,225 @@
+# tests/bench_db.py
+"""
+SQLite benchmark: pending-alert scans, per-user listings, duplicate checks and
+single-alert inserts at 10k / 100k rows, for the old profile (default pragmas,
+no secondary indexes) and the current one (WAL + pragmas + migrations).
+Also measures how long a reader waits while a writer commits a large batch, and
+the throughput of a burst of concurrent user inserts committed one by one versus
+through the group-commit WriteBatcher.
+
+Run from the repository root:  BOT_TOKEN=x PUBLIC_HOST=y python -m tests.bench_db
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import services.db_service as db_service
+from models.alert import Alert, AlertDirection
+from models.user import User
+from services.migrations import MIGRATIONS
+from services.write_batcher import WriteBatcher, _run_alone
+from utils.normalize_data import price_ticks
+
+NEW_INDEXES = ("ix_alerts_triggered_symbol", "ix_alerts_user_triggered", "ux_alerts_pending_dedupe")
+SYMBOLS = [f"SYM{i:02d}/USD" for i in range(50)]
+PENDING_SHARE = 0.1
+ALERTS_PER_USER = 10
+INSERTS = 500
+REPEATS = 20
+
+
+def _make_engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        event.listen(engine, "connect", db_service.apply_pragmas)
+    db_service.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if tuned:
+            for _number, _description, step in MIGRATIONS:
+                step(conn)
+        else:
+            for name in NEW_INDEXES:
+                conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    return engine
+
+
+def _seed(engine, rows: int, analyze: bool) -> None:
+    rnd = random.Random(42)
+    users = max(1, rows // ALERTS_PER_USER)
+    batch = []
+    seen = set()
+    for _ in range(rows):
+        row = {
+            "user_id": rnd.randint(1, users), "symbol": rnd.choice(SYMBOLS),
+            "target_price": round(rnd.uniform(0.5, 2.0), 5), "direction": AlertDirection.ABOVE,
+            "timeframes": "60", "triggered": rnd.random() >= PENDING_SHARE,
+        }
+        row["price_ticks"] = price_ticks(row["symbol"], row["target_price"])
+        key = (row["user_id"], row["symbol"], row["price_ticks"])
+        if not row["triggered"]:
+            if key in seen:
+                continue
+            seen.add(key)
+        batch.append(row)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"id": i + 1, "chat_id": 10_000 + i} for i in range(users)])
+        conn.execute(Alert.__table__.insert(), batch)
+        if analyze:
+            # planner statistics, as the index migration leaves them
+            conn.exec_driver_sql("ANALYZE")
+
+
+def _timed(fn, repeats: int = REPEATS) -> float:
+    """Median milliseconds of `fn()`."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+
+def _bench(path: str, rows: int, tuned: bool) -> dict:
+    engine = _make_engine(path, tuned)
+    _seed(engine, rows, analyze=tuned)
+    Session = sessionmaker(bind=engine)
+    users = max(1, rows // ALERTS_PER_USER)
+    out = {}
+
+    def pending_all():
+        with Session() as db:
+            db.query(Alert).filter(Alert.triggered == False).all()
+
+    def pending_symbol():
+        with Session() as db:
+            db.query(Alert).filter(Alert.triggered == False, Alert.symbol == SYMBOLS[7]).all()
+
+    def list_user():
+        with Session() as db:
+            db.query(Alert).filter(Alert.user_id == users // 2, Alert.triggered == False).all()
+
+    def dedupe():
+        # before: float range on target_price; after: equality on the unique tick index
+        price = Alert.price_ticks == price_ticks(SYMBOLS[3], 1.2345) if tuned else \
+            func.abs(Alert.target_price - 1.2345) < 1e-8
+        with Session() as db:
+            db.query(Alert).filter(
+                Alert.user_id == users // 2, Alert.symbol == SYMBOLS[3], Alert.timeframes == "60",
+                price, Alert.triggered == False,
+            ).first()
+
+    out["pending scan (all)"] = _timed(pending_all)
+    out["pending scan (1 symbol)"] = _timed(pending_symbol)
+    out["listalerts (1 user)"] = _timed(list_user)
+    out["duplicate check"] = _timed(dedupe)
+
+    start = time.perf_counter()
+    for i in range(INSERTS):
+        with Session() as db:
+            db.add(Alert(user_id=1 + i % users, symbol=SYMBOLS[i % len(SYMBOLS)], target_price=1.0 + i / 1e4,
+                         price_ticks=10 ** 8 + i * 10 ** 4, direction=AlertDirection.BELOW, timeframes="60"))
+            db.commit()
+    out["insert + commit (each)"] = (time.perf_counter() - start) * 1000 / INSERTS
+
+    out["reader wait during write (max)"] = _reader_wait(engine, Session)
+    engine.dispose()
+    return out
+
+
+def _reader_wait(engine, Session) -> float:
+    """Longest read latency (ms) while another connection commits a 20k-row batch; inf on 'database is locked'."""
+    done = threading.Event()
+
+    def writer():
+        with engine.begin() as conn:
+            conn.execute(Alert.__table__.insert(), [
+                {"user_id": 1, "symbol": SYMBOLS[0], "target_price": 1.5, "direction": AlertDirection.ABOVE,
+                 "timeframes": "60", "triggered": True}
+                for _ in range(20_000)
+            ])
+        done.set()
+
+    worst = 0.0
+    thread = threading.Thread(target=writer)
+    thread.start()
+    while not done.is_set():
+        start = time.perf_counter()
+        try:
+            with Session() as db:
+                db.query(Alert.id).filter(Alert.triggered == False, Alert.symbol == SYMBOLS[1]).all()
+        except Exception as e:
+            if isinstance(getattr(e, "orig", None), sqlite3.OperationalError):
+                worst = float("inf")
+                continue
+            raise
+        worst = max(worst, (time.perf_counter() - start) * 1000)
+    thread.join()
+    return worst
+
+
+BURST = 1000
+
+
+async def _burst(path: str, batched: bool, synchronous: str) -> float:
+    """Inserts per second for BURST concurrent user inserts."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+
+    def pragmas(dbapi_conn, _record):
+        db_service.apply_pragmas(dbapi_conn, _record)
+        cur = dbapi_conn.cursor()
+        cur.execute(f"PRAGMA synchronous={synchronous}")
+        cur.close()
+
+    event.listen(engine.sync_engine, "connect", pragmas)
+    async with engine.begin() as conn:
+        await conn.run_sync(db_service.Base.metadata.create_all)
+    db_service.AsyncSessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    batcher = WriteBatcher(window_ms=2)
+
+    def insert(chat_id):
+        async def op(session):
+            user = User(chat_id=chat_id)
+            session.add(user)
+            return user
+        return op
+
+    start = time.perf_counter()
+    if batched:
+        await asyncio.gather(*(batcher.run(insert(i)) for i in range(BURST)))
+    else:
+        # one commit per write; the pool serialises them on SQLite's single writer
+        await asyncio.gather(*(_run_alone(insert(i)) for i in range(BURST)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return BURST / elapsed
+
+
+def main():
+    for rows in (10_000, 100_000):
+        with tempfile.TemporaryDirectory() as tmp:
+            before = _bench(os.path.join(tmp, "before.db"), rows, tuned=False)
+            after = _bench(os.path.join(tmp, "after.db"), rows, tuned=True)
+        print(f"\n{rows:,} alerts ({PENDING_SHARE:.0%} pending)")
+        print(f"  {'operation':32} {'before ms':>10} {'after ms':>10}")
+        for name in before:
+            print(f"  {name:32} {before[name]:10.2f} {after[name]:10.2f}")
+
+    print(f"\nburst of {BURST:,} concurrent user inserts (inserts/s)")
+    print(f"  {'synchronous':12} {'per-write commit':>18} {'group commit':>14}")
+    for synchronous in ("NORMAL", "FULL"):
+        with tempfile.TemporaryDirectory() as tmp:
+            single = asyncio.run(_burst(os.path.join(tmp, "single.db"), False, synchronous))
+            grouped = asyncio.run(_burst(os.path.join(tmp, "grouped.db"), True, synchronous))
+        print(f"  {synchronous:12} {single:18.0f} {grouped:14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# tests/test_alert_archiver.py
+import pytest
+
+from utils.alert_archiver import in_off_peak
+
+
+@pytest.mark.parametrize("hour,spec,expected", [
+    (2, "2-5", True),
+    (4, "2-5", True),
+    (5, "2-5", False),
+    (23, "22-3", True),
+    (1, "22-3", True),
+    (12, "22-3", False),
+    (12, "0-0", True),
+    (12, "bogus", True),
+])
+def test_in_off_peak(hour, spec, expected):
+    assert in_off_peak(hour, spec) is expected
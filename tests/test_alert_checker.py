@@ -1,12 +1,14 @@
 # tests/test_alert_checker.py
 import pytest
+import pytest_asyncio
 from types import SimpleNamespace
 from io import BytesIO
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 import asyncio
 
 import utils.alert_checker as alert_checker
 from models.alert import AlertDirection
+from services.notification_service import NotificationDispatcher
 
 
 class DummyBot:
@@ -24,10 +26,31 @@ class DummyBot:
         self.sent_photos.append((chat_id, photo, filename, caption))
 
 
+def _aw(fn):
+    """Async stand-in for a patched *_async service function."""
+    async def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def _clear_index(monkeypatch):
+    # no change log in these tests: every cycle reloads the (patched) pending alerts
+    monkeypatch.setattr(alert_checker, "get_change_watermark_async", _aw(lambda: None))
+    monkeypatch.setattr(alert_checker, "_watermark", None)
+    alert_checker._index.clear()
+    alert_checker._scanned_until.clear()
+    alert_checker._wick_scanned_minute.clear()
+    yield
+    alert_checker._index.clear()
+    alert_checker._scanned_until.clear()
+    alert_checker._wick_scanned_minute.clear()
+
+
 @pytest.mark.asyncio
 async def test_no_pending_alerts(monkeypatch):
     """When there are no pending alerts, nothing should be sent or marked."""
-    monkeypatch.setattr(alert_checker, "get_pending_alerts", lambda: [])
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: []))
     bot = DummyBot()
     ctx = SimpleNamespace(bot=bot)
 
@@ -38,10 +61,47 @@ async def test_no_pending_alerts(monkeypatch):
     assert bot.sent_photos == []
 
 
+@pytest_asyncio.fixture
+async def dispatcher(monkeypatch):
+    """An unpaced dispatcher in place of the shared one; `await dispatcher.join()` waits for every send."""
+    d = NotificationDispatcher(workers=1, global_rate=1000, per_chat_interval=0)
+    d.start()
+    monkeypatch.setattr(alert_checker, "get_dispatcher", lambda: d)
+    yield d
+    await d.stop()
+
+
+class FakeCharts:
+    """ChartBatch stand-in: records one render per (symbol, timeframe), raising for `failing` timeframes."""
+    calls = []
+    failing = set()
+
+    def __init__(self, loop):
+        pass
+
+    async def render(self, symbol, timeframe, alert_price, outputsize, overlays=None):
+        FakeCharts.calls.append((symbol, timeframe))
+        if timeframe in FakeCharts.failing:
+            raise RuntimeError("boom")
+        return FakeCharts.buf, timeframe
+
+
+@pytest.fixture
+def charts(monkeypatch):
+    FakeCharts.calls, FakeCharts.failing, FakeCharts.buf = [], set(), BytesIO(b"PNGDATA")
+    monkeypatch.setattr(alert_checker, "ChartBatch", FakeCharts)
+    # no 1m candles: only the polled price decides
+    monkeypatch.setattr(alert_checker, "get_ohlc", lambda *a: None)
+    return FakeCharts
+
+
+def _payloads(*alerts):
+    return lambda ids, candles=None: [alert_checker._to_plain_alert(a) for a in alerts if a.id in ids]
+
+
 @pytest.mark.asyncio
-async def test_price_not_triggering(monkeypatch):
+async def test_price_not_triggering(monkeypatch, dispatcher, charts):
     """If current price doesn't meet alert condition, do not trigger or notify."""
-    # Fake alert item
     alert = SimpleNamespace(
         id=1,
         symbol="BTCUSD",
@@ -51,26 +111,26 @@ async def test_price_not_triggering(monkeypatch):
         user=SimpleNamespace(chat_id=12345),
     )
 
-    monkeypatch.setattr(alert_checker, "get_pending_alerts", lambda: [alert])
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: [alert]))
     # Return a price lower than target
-    monkeypatch.setattr(alert_checker.data_service, "get_price", lambda s: {"price": 90.0})
+    monkeypatch.setattr(alert_checker, "get_price", lambda s: {"price": 90.0})
 
-    mock_mark = MagicMock()
-    monkeypatch.setattr(alert_checker, "mark_alert_triggered", mock_mark)
+    mock_mark = AsyncMock(side_effect=_payloads(alert))
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", mock_mark)
 
     bot = DummyBot()
-    ctx = SimpleNamespace(bot=bot)
-
-    await alert_checker.check_alerts_job(ctx)
+    await alert_checker.check_alerts_job(SimpleNamespace(bot=bot))
+    await dispatcher.join()
 
     # Should not have been triggered
     mock_mark.assert_not_called()
     assert bot.sent_messages == []
     assert bot.sent_photos == []
+    assert 1 in alert_checker._index
 
 
 @pytest.mark.asyncio
-async def test_trigger_alert_and_send_charts(monkeypatch):
+async def test_trigger_alert_and_send_charts(monkeypatch, dispatcher, charts):
     """When an alert triggers, it should mark, notify and send charts for each timeframe."""
     alert = SimpleNamespace(
         id=2,
@@ -81,48 +141,39 @@ async def test_trigger_alert_and_send_charts(monkeypatch):
         user=SimpleNamespace(chat_id=77777),
     )
 
-    monkeypatch.setattr(alert_checker, "get_pending_alerts", lambda: [alert])
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: [alert]))
     # Price above target -> trigger
-    monkeypatch.setattr(alert_checker.data_service, "get_price", lambda s: {"price": 110.0})
+    monkeypatch.setattr(alert_checker, "get_price", lambda s: {"price": 110.0})
 
-    # mark_alert_triggered should be called
-    mock_mark = MagicMock()
-    monkeypatch.setattr(alert_checker, "mark_alert_triggered", mock_mark)
-
-    # Mock generate_chart_image to return a BytesIO and a period
-    fake_buf = BytesIO(b"PNGDATA")
-    mock_gen = MagicMock(return_value=(fake_buf, 60))
-    monkeypatch.setattr(alert_checker, "generate_chart_image", mock_gen)
+    mock_mark = AsyncMock(side_effect=_payloads(alert))
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", mock_mark)
 
     bot = DummyBot()
-    ctx = SimpleNamespace(bot=bot)
+    await alert_checker.check_alerts_job(SimpleNamespace(bot=bot))
+    await dispatcher.join()
 
-    await alert_checker.check_alerts_job(ctx)
+    # marked once, in one batch holding this alert id
+    mock_mark.assert_awaited_once()
+    assert mock_mark.await_args.args[0] == [alert.id]
+    assert alert.id not in alert_checker._index
 
-    # mark_alert_triggered should be called for this alert id
-    mock_mark.assert_called_once_with(alert.id)
-
-    # One notification message should be sent
-    assert len(bot.sent_messages) >= 1
+    # the trigger message goes first
+    assert len(bot.sent_messages) == 1
     chat_id, text = bot.sent_messages[0]
     assert chat_id == alert.user.chat_id
-    assert "Price Alert Triggered" in text or "Price Alert Triggered!" in text
+    assert "Price Alert Triggered!" in text
 
-    # Two photos (for 1h and 4h) should be sent
+    # one chart per timeframe (1h and 4h)
+    assert sorted(tf for _symbol, tf in charts.calls) == ["240", "60"]
     assert len(bot.sent_photos) == 2
-    # verify generate_chart_image called twice (once per timeframe)
-    assert mock_gen.call_count == 2
-    # ensure send_photo was called with the returned BytesIO
-    for sent in bot.sent_photos:
-        sent_chat, sent_photo, filename, caption = sent
+    for sent_chat, sent_photo, filename, caption in bot.sent_photos:
         assert sent_chat == alert.user.chat_id
-        # photo should be the same object (BytesIO)
-        assert sent_photo is fake_buf
+        assert sent_photo is charts.buf
         assert filename.endswith(".png")
 
 
 @pytest.mark.asyncio
-async def test_generate_chart_failure_sends_error_message(monkeypatch):
+async def test_generate_chart_failure_sends_error_message(monkeypatch, dispatcher, charts):
     """If chart generation raises, the user receives an error message for that timeframe."""
     alert = SimpleNamespace(
         id=3,
@@ -133,27 +184,122 @@ async def test_generate_chart_failure_sends_error_message(monkeypatch):
         user=SimpleNamespace(chat_id=55555),
     )
 
-    monkeypatch.setattr(alert_checker, "get_pending_alerts", lambda: [alert])
-    monkeypatch.setattr(alert_checker.data_service, "get_price", lambda s: {"price": 200.0})
-    monkeypatch.setattr(alert_checker, "mark_alert_triggered", lambda aid: None)
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: [alert]))
+    monkeypatch.setattr(alert_checker, "get_price", lambda s: {"price": 200.0})
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", _aw(_payloads(alert)))
+    # the 1h chart fails, the 4h one renders
+    charts.failing = {"60"}
 
-    # Make generate_chart_image raise for the first timeframe and succeed for the second
-    def side_effect_gen(symbol, tf, alert_price, outputsize):
-        if tf == "1h":
-            raise RuntimeError("boom")
-        return (BytesIO(b"PNG2"), 60)
+    bot = DummyBot()
+    await alert_checker.check_alerts_job(SimpleNamespace(bot=bot))
+    await dispatcher.join()
 
-    monkeypatch.setattr(alert_checker, "generate_chart_image", MagicMock(side_effect=side_effect_gen))
+    error_messages = [t for (_cid, t) in bot.sent_messages if "Could not generate chart" in t]
+    assert len(error_messages) == 1 and "timeframe 60" in error_messages[0]
+    assert len(bot.sent_photos) == 1
 
-    bot = DummyBot()
-    ctx = SimpleNamespace(bot=bot)
 
-    await alert_checker.check_alerts_job(ctx)
+@pytest.mark.asyncio
+async def test_wick_between_polls_triggers_on_its_candle(monkeypatch):
+    """A 1m candle whose high crossed the level fires the alert even though the polled price is back below."""
+    import pandas as pd
+
+    now = pd.Timestamp.now(tz="UTC").floor("min")
+    created = (now - pd.Timedelta(minutes=5)).to_pydatetime().replace(tzinfo=None)
+    df = pd.DataFrame({
+        "datetime": [now - pd.Timedelta(minutes=m) for m in (7, 3, 2, 1)],
+        "open": [1.0, 1.0, 1.0, 1.0],
+        "high": [1.2, 1.01, 1.06, 1.02],   # the 7-minute-old spike predates the alert
+        "low": [0.99, 0.99, 0.99, 0.99],
+        "close": [1.0, 1.0, 1.0, 1.0],
+    })
+    alert = SimpleNamespace(
+        id=11, symbol="EURUSD", target_price=1.05, direction=AlertDirection.ABOVE,
+        timeframes="60", overlays=None, user=SimpleNamespace(chat_id=9), user_id=1,
+        triggered_at=None, created_at=created,
+    )
+    marked = {}
+    notified = []
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: [alert]))
+    monkeypatch.setattr(alert_checker, "get_price", lambda s: {"price": 1.0})
+    monkeypatch.setattr(alert_checker, "get_ohlc", lambda *a: df)
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", _aw(lambda ids, candles=None: marked.update(candles) or [
+        dict(alert_checker._to_plain_alert(alert), trigger_candle_at=candles[11].isoformat())
+    ]))
+    monkeypatch.setattr(alert_checker, "_notify_triggered", lambda bot, loop, a, price, resp, charts=None: notified.append(a))
+
+    await alert_checker.check_alerts_job(SimpleNamespace(bot=DummyBot()))
+
+    expected = (now - pd.Timedelta(minutes=2)).to_pydatetime()
+    assert marked == {11: expected}
+    assert notified[0]["trigger_candle_at"] == expected.isoformat()
+    assert alert_checker._scanned_until["EURUSD"] == int((now - pd.Timedelta(minutes=1)).timestamp())
+
+
+@pytest.mark.asyncio
+async def test_wick_scan_runs_once_per_closed_candle(monkeypatch):
+    import pandas as pd
 
-    # Should send at least one error message for the failed timeframe
-    # and at least one photo for the successful timeframe
-    error_messages = [t for (_cid, t) in bot.sent_messages if "Could not generate chart" in t or "Could not generate" in t or "Could not generate chart" in t]
-    assert len(error_messages) >= 1
+    clock = {"now": 1_700_000_000 - 1_700_000_000 % 60 + 5}
+    fetches = []
+    df = pd.DataFrame({"datetime": [pd.Timestamp(clock["now"] - 5, unit="s", tz="UTC")],
+                       "open": [1.0], "high": [1.0], "low": [1.0], "close": [1.0]})
+    monkeypatch.setattr(alert_checker, "time", SimpleNamespace(time=lambda: clock["now"], monotonic=lambda: 0.0))
+    monkeypatch.setattr(alert_checker, "get_ohlc", lambda *a: fetches.append(a) or df)
+    loop = asyncio.get_running_loop()
 
-    # Should have at least one photo sent (for the timeframe that succeeded)
-    assert len(bot.sent_photos) >= 1
+    for _quote in range(3):
+        await alert_checker._collect_wick_fired(loop, "EURUSD", {"price": 1.0})
+        clock["now"] += 10
+    assert len(fetches) == 1
+
+    clock["now"] += 30  # the candle forming at the first scan has closed
+    await alert_checker._collect_wick_fired(loop, "EURUSD", {"price": 1.0})
+    assert len(fetches) == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_mark_puts_alerts_back_without_notifying(monkeypatch):
+    """When the triggered UPDATE fails nothing is sent; the alert fires on a later evaluation instead."""
+    alert = {"id": 21, "symbol": "EURUSD", "target_price": 1.05, "direction": "above", "user_chat_id": 9}
+    alert_checker._index.add(alert)
+    notified = []
+
+    async def broken(ids, candles=None):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", broken)
+    monkeypatch.setattr(alert_checker, "_notify_triggered", lambda bot, loop, a, price, resp, charts=None: notified.append(a))
+    loop = asyncio.get_running_loop()
+
+    fired = alert_checker._collect_fired(loop, "EURUSD", {"price": 1.06})
+    assert await alert_checker._fire(DummyBot(), loop, fired) == 0
+    assert notified == [] and 21 in alert_checker._index
+
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", _aw(lambda ids, candles=None: [dict(alert)]))
+    fired = alert_checker._collect_fired(loop, "EURUSD", {"price": 1.06})
+    assert await alert_checker._fire(DummyBot(), loop, fired) == 1
+    assert [a["id"] for a in notified] == [21]
+
+
+@pytest.mark.asyncio
+async def test_sweep_prices_fed_symbols_from_the_bus(monkeypatch, dispatcher, charts):
+    """Symbols with a recent feed quote are not fetched again; the others still are."""
+    alerts = [
+        SimpleNamespace(id=31, symbol="EURUSD", target_price=1.1, direction=AlertDirection.ABOVE,
+                        timeframes="60", user=SimpleNamespace(chat_id=5)),
+        SimpleNamespace(id=32, symbol="GBPUSD", target_price=1.5, direction=AlertDirection.ABOVE,
+                        timeframes="60", user=SimpleNamespace(chat_id=5)),
+    ]
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: alerts))
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", AsyncMock(side_effect=_payloads(*alerts)))
+    fetched = []
+    monkeypatch.setattr(alert_checker, "get_price", lambda s: fetched.append(s) or {"price": 1.0})
+    bus = SimpleNamespace(fresh=lambda s: {"price": 1.2} if s == "EURUSD" else None)
+    monkeypatch.setattr(alert_checker, "_bus", bus)
+
+    await alert_checker.check_alerts_job(SimpleNamespace(bot=DummyBot()))
+    await dispatcher.join()
+
+    assert fetched == ["GBPUSD"]
+    assert 31 not in alert_checker._index and 32 in alert_checker._index
@@ -0,0 +1,95 @@
+# tests/test_alert_index.py
+from types import SimpleNamespace
+
+from models.alert import AlertDirection
+from utils.alert_index import AlertIndex, normalize_direction
+
+
+def _alert(alert_id, price, direction, symbol="EURUSD"):
+    return {"id": alert_id, "symbol": symbol, "target_price": price, "direction": direction}
+
+
+def test_normalize_direction():
+    assert normalize_direction(AlertDirection.ABOVE) == "above"
+    assert normalize_direction("BELOW") == "below"
+    assert normalize_direction("AlertDirection.ABOVE") == "above"
+    assert normalize_direction("sideways") is None
+
+
+def test_crossed_returns_exactly_the_reached_levels():
+    index = AlertIndex()
+    index.add(_alert(1, 1.10, "above"))
+    index.add(_alert(2, 1.20, "above"))
+    index.add(_alert(3, 1.05, "below"))
+    index.add(_alert(4, 1.00, "below"))
+    index.add(_alert(5, 1.00, "above", symbol="GBPUSD"))
+
+    assert [a["id"] for a in index.crossed("eurusd", 1.08)] == []
+    assert {a["id"] for a in index.crossed("EURUSD", 1.10)} == {1}
+    assert {a["id"] for a in index.crossed("EURUSD", 1.25)} == {1, 2}
+    assert {a["id"] for a in index.crossed("EURUSD", 1.00)} == {3, 4}
+
+
+def test_near_and_remove():
+    index = AlertIndex()
+    index.add(_alert(1, 1.10, "above"))
+    index.add(_alert(2, 1.095, "below"))
+    index.add(_alert(3, 1.30, "above"))
+
+    assert {a["id"] for a in index.near("EURUSD", 1.09, 1.11)} == {1, 2}
+
+    index.remove(1)
+    assert 1 not in index
+    assert index.crossed("EURUSD", 1.2) == []
+    assert len(index) == 2
+
+
+def test_add_rejects_incomplete_alerts():
+    index = AlertIndex()
+    assert not index.add({"id": 1, "symbol": "EURUSD", "target_price": None, "direction": "above"})
+    assert not index.add({"id": 2, "symbol": "", "target_price": 1.0, "direction": "above"})
+    assert len(index) == 0
+
+
+def test_sync_adds_drops_and_refreshes_edited_alerts():
+    index = AlertIndex()
+    converted = []
+
+    def to_plain(obj):
+        converted.append(obj.id)
+        return {"id": obj.id, "symbol": obj.symbol, "target_price": obj.target_price, "direction": obj.direction}
+
+    a = SimpleNamespace(id=1, symbol="EURUSD", target_price=1.1, direction=AlertDirection.ABOVE)
+    b = SimpleNamespace(id=2, symbol="EURUSD", target_price=1.0, direction=AlertDirection.BELOW)
+    index.sync([a, b], to_plain=to_plain)
+    assert index.ids() == {1, 2}
+
+    # unchanged alerts are not converted again; edited ones are re-indexed
+    a.target_price = 1.2
+    index.sync([a], to_plain=to_plain)
+    assert converted == [1, 2, 1]
+    assert index.ids() == {1}
+    assert index.crossed("EURUSD", 1.15) == []
+    assert [x["id"] for x in index.crossed("EURUSD", 1.2)] == [1]
+
+
+def test_crossed_range_covers_both_wicks():
+    index = AlertIndex()
+    index.add(_alert(1, 1.10, "above"))
+    index.add(_alert(2, 1.00, "below"))
+    index.add(_alert(3, 1.20, "above"))
+
+    assert {a["id"] for a in index.crossed_range("EURUSD", 0.99, 1.11)} == {1, 2}
+    assert {a["id"] for a in index.crossed_range("EURUSD", 1.01, 1.09)} == set()
+
+
+def test_apply_changes_updates_and_drops():
+    index = AlertIndex()
+    index.add(_alert(1, 1.10, "above"))
+    index.add(_alert(2, 1.00, "below"))
+
+    index.apply_changes([_alert(1, 1.30, "above"), _alert(3, 0.90, "below")], [2])
+
+    assert index.ids() == {1, 3}
+    assert index.crossed("EURUSD", 1.2) == []
+    assert index.get(1)["target_price"] == 1.30
@@ -0,0 +1,262 @@
+# tests/test_alert_service.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool, StaticPool
+
+import services.db_service as db_service
+import services.alert_service as alert_service
+import services.user_service as user_service
+from models.alert import Alert, AlertArchive, AlertDirection
+from models.user import User
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db_service.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(db_service, "SessionLocal", factory)
+    return factory
+
+
+@pytest.fixture
+def async_factory(monkeypatch, tmp_path):
+    """Sync and async sessions on the same SQLite file; returns the sync factory for seeding."""
+    path = tmp_path / "alerts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    db_service.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autoflush=False, bind=engine)
+    # no pooled aiosqlite connections: their threads would outlive the test's event loop
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    monkeypatch.setattr(db_service, "SessionLocal", factory)
+    monkeypatch.setattr(db_service, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    yield factory
+    engine.dispose()
+
+
+def _seed(factory, n):
+    with factory() as db:
+        user = User(chat_id=4242)
+        db.add(user)
+        db.flush()
+        for i in range(n):
+            db.add(Alert(user_id=user.id, symbol="EUR/USD", target_price=1.1 + i / 1000,
+                         direction=AlertDirection.ABOVE, timeframes="60"))
+        db.commit()
+        return [a.id for a in db.query(Alert).order_by(Alert.id)]
+
+
+def test_mark_alerts_triggered_returns_payloads_with_chat_ids(session_factory):
+    ids = _seed(session_factory, 3)
+
+    payloads = alert_service.mark_alerts_triggered(ids[:2])
+
+    assert sorted(p["id"] for p in payloads) == ids[:2]
+    assert all(p["user_chat_id"] == 4242 for p in payloads)
+    assert all(p["direction"] == "above" and p["triggered_at"] for p in payloads)
+    with session_factory() as db:
+        assert [a.id for a in db.query(Alert).filter_by(triggered=False)] == ids[2:]
+
+
+def test_mark_alerts_triggered_never_fires_twice(session_factory):
+    ids = _seed(session_factory, 2)
+
+    assert len(alert_service.mark_alerts_triggered(ids)) == 2
+    assert alert_service.mark_alerts_triggered(ids) == []
+    assert alert_service.mark_alerts_triggered([]) == []
+
+
+def test_mark_alerts_triggered_records_trigger_candle(session_factory):
+    from datetime import datetime
+    ids = _seed(session_factory, 2)
+    candle = datetime(2025, 1, 2, 3, 4)
+
+    payloads = {p["id"]: p for p in alert_service.mark_alerts_triggered(ids, {ids[0]: candle})}
+
+    assert payloads[ids[0]]["trigger_candle_at"] == candle.isoformat()
+    assert payloads[ids[1]]["trigger_candle_at"] is None
+
+
+def test_pending_alert_changes_returns_only_the_delta(session_factory):
+    ids = _seed(session_factory, 3)
+    mark = alert_service.get_change_watermark()
+    assert alert_service.get_pending_alert_changes(mark) == ([], [], mark)
+
+    alert_service.mark_alerts_triggered([ids[0]])
+    with session_factory() as db:
+        db.query(Alert).filter_by(id=ids[1]).update({"target_price": 1.5})
+        db.delete(db.get(Alert, ids[2]))
+        db.commit()
+
+    pending, removed, new_mark = alert_service.get_pending_alert_changes(mark)
+    assert [(a.id, a.target_price, a.user.chat_id) for a in pending] == [(ids[1], 1.5, 4242)]
+    assert sorted(removed) == [ids[0], ids[2]]
+    assert new_mark > mark
+    assert alert_service.get_pending_alert_changes(new_mark) == ([], [], new_mark)
+
+
+def test_pending_alert_changes_detects_pruned_log(session_factory, monkeypatch):
+    ids = _seed(session_factory, 2)
+    monkeypatch.setattr(alert_service.time, "time", lambda: 4_000_000_000)
+    assert alert_service.prune_alert_changes(60) == 2
+    alert_service.mark_alerts_triggered([ids[1]])
+
+    assert alert_service.get_pending_alert_changes(1) is None
+
+
+def test_pending_alert_changes_detects_log_pruned_past_the_watermark(session_factory, monkeypatch):
+    ids = _seed(session_factory, 2)
+    mark = alert_service.get_change_watermark()
+    alert_service.mark_alerts_triggered([ids[0]])
+    monkeypatch.setattr(alert_service.time, "time", lambda: 4_000_000_000)
+    assert alert_service.prune_alert_changes(60) == 3
+
+    # nothing after the watermark is left, but something did change
+    assert alert_service.get_pending_alert_changes(mark) is None
+    # a full reload picks up the last allocated seq, after which deltas are quiet again
+    new_mark = alert_service.get_change_watermark()
+    assert new_mark == mark + 1
+    assert alert_service.get_pending_alert_changes(new_mark) == ([], [], new_mark)
+    # a watermark the log never reached (e.g. a snapshot of another database)
+    assert alert_service.get_pending_alert_changes(new_mark + 10) is None
+
+
+def _expire(factory, alert_id, days_ago=1):
+    from datetime import datetime, timedelta
+    with factory() as db:
+        db.query(Alert).filter_by(id=alert_id).update({"expires_at": datetime.utcnow() - timedelta(days=days_ago)})
+        db.commit()
+
+
+def test_expired_alerts_are_not_pending_nor_fired(session_factory):
+    ids = _seed(session_factory, 2)
+    _expire(session_factory, ids[0])
+
+    assert [a.id for a in alert_service.get_pending_alerts()] == [ids[1]]
+    assert [p["id"] for p in alert_service.mark_alerts_triggered(ids)] == [ids[1]]
+
+
+def test_expire_and_archive_move_rows_in_batches(session_factory):
+    from datetime import datetime, timedelta
+    ids = _seed(session_factory, 4)
+    _expire(session_factory, ids[0])
+    alert_service.mark_alerts_triggered(ids[1:3])
+
+    assert alert_service.expire_alerts(batch_size=10) == 1
+    # triggered just now: kept until they are older than the cutoff
+    assert alert_service.archive_triggered_alerts(3600) == 0
+    later = datetime.utcnow() + timedelta(hours=2)
+    assert alert_service.archive_triggered_alerts(3600, now=later, batch_size=1) == 1
+    assert alert_service.archive_triggered_alerts(3600, now=later, batch_size=1) == 1
+    assert alert_service.archive_triggered_alerts(3600, now=later, batch_size=1) == 0
+
+    with session_factory() as db:
+        assert [a.id for a in db.query(Alert)] == [ids[3]]
+        archived = {a.alert_id: a for a in db.query(AlertArchive)}
+    assert sorted(archived) == ids[:3]
+    assert archived[ids[0]].status == "expired" and archived[ids[0]].user_id
+    assert archived[ids[1]].status == "triggered" and archived[ids[1]].triggered_at is not None
+
+
+@pytest.mark.asyncio
+async def test_async_user_and_alert_creation(async_factory, monkeypatch):
+    monkeypatch.setattr(alert_service, "get_price", lambda symbol: {"price": 1.1})
+
+    user = await user_service.get_or_create_user_async(chat_id=555, username="u")
+    assert (await user_service.get_or_create_user_async(chat_id=555)).id == user.id
+
+    alert = await alert_service.create_alert_async(user.id, "eurusd", "1.2", ["1h"])
+    assert alert.direction == AlertDirection.ABOVE and alert.timeframes == "60"
+    duplicate = await alert_service.create_alert_async(user.id, "EUR/USD", 1.2, "60")
+    assert duplicate.id == alert.id and getattr(duplicate, "_is_duplicate", False)
+
+    pending = await alert_service.get_pending_alerts_async()
+    assert [(a.id, a.user.chat_id) for a in pending] == [(alert.id, 555)]
+
+
+@pytest.mark.asyncio
+async def test_async_mark_matches_sync_payloads(async_factory):
+    ids = _seed(async_factory, 3)
+
+    single = await alert_service.mark_alert_triggered_async(ids[0])
+    payloads = await alert_service.mark_alerts_triggered_async(ids)
+
+    assert single["user_chat_id"] == 4242 and single["triggered_at"]
+    assert sorted(p["id"] for p in payloads) == ids[1:]
+    assert all(p["user_chat_id"] == 4242 and p["direction"] == "above" for p in payloads)
+    assert await alert_service.mark_alerts_triggered_async(ids) == []
+    assert await alert_service.mark_alert_triggered_async(10_000) is None
+
+
+@pytest.mark.asyncio
+async def test_async_change_log_delta(async_factory):
+    ids = _seed(async_factory, 2)
+    seq = await alert_service.get_change_watermark_async()
+
+    await alert_service.mark_alerts_triggered_async([ids[0]])
+    alerts, removed, new_seq = await alert_service.get_pending_alert_changes_async(seq)
+
+    assert alerts == [] and removed == [ids[0]] and new_seq > seq
+
+    alert_service.prune_alert_changes(-60)
+    assert await alert_service.get_pending_alert_changes_async(seq) is None
+    assert await alert_service.get_change_watermark_async() == new_seq
+
+
+def test_create_alert_dedupes_on_price_ticks(session_factory, monkeypatch):
+    monkeypatch.setattr(alert_service, "get_price", lambda symbol: {"price": 1.0})
+    with session_factory() as db:
+        db.add(User(id=1, chat_id=1))
+        db.commit()
+
+    first = alert_service.create_alert(1, "EUR/USD", 1.23456, "1h")
+    same_tick = alert_service.create_alert(1, "eurusd", "1.234561", ["60"])
+    other_tick = alert_service.create_alert(1, "EURUSD", 1.23457, "60")
+
+    assert first.price_ticks == 123456
+    assert same_tick.id == first.id and same_tick._is_duplicate
+    assert other_tick.id != first.id
+
+
+def test_create_alert_losing_an_insert_race_returns_the_winner(session_factory, monkeypatch):
+    with session_factory() as db:
+        db.add(User(id=1, chat_id=1))
+        db.commit()
+
+    def concurrent_insert(symbol):
+        # another request inserts the identical alert between our lookup and our insert
+        with session_factory() as db:
+            db.add(Alert(user_id=1, symbol="EURUSD", target_price=1.5, price_ticks=150000,
+                         direction=AlertDirection.ABOVE, timeframes="60"))
+            db.commit()
+        return {"price": 1.0}
+
+    monkeypatch.setattr(alert_service, "get_price", concurrent_insert)
+
+    alert = alert_service.create_alert(1, "EURUSD", 1.5, "60")
+
+    assert alert._is_duplicate
+    with session_factory() as db:
+        assert db.query(Alert).count() == 1
+
+
+def test_expired_alert_does_not_block_a_new_one(session_factory, monkeypatch):
+    monkeypatch.setattr(alert_service, "get_price", lambda symbol: {"price": 1.0})
+    with session_factory() as db:
+        db.add(User(id=1, chat_id=1))
+        db.commit()
+    old_id = alert_service.create_alert(1, "EURUSD", 1.5, "60").id
+    _expire(session_factory, old_id)
+
+    new = alert_service.create_alert(1, "EURUSD", 1.5, "60")
+
+    assert not getattr(new, "_is_duplicate", False) and _is_live_row(session_factory, new.id)
+    with session_factory() as db:
+        assert [(a.alert_id, a.status) for a in db.query(AlertArchive)] == [(old_id, "expired")]
+
+
+def _is_live_row(factory, alert_id):
+    with factory() as db:
+        return alert_service._is_live(db.get(Alert, alert_id))
@@ -0,0 +1,60 @@
+# tests/test_candle_cache.py
+import time
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.candle_cache as candle_cache
+
+
+def _provider(calls, bar_seconds=60):
+    """Fake get_ohlc: candles every bar_seconds between from/to, recording each call."""
+    def fake_get_ohlc(symbol, timeframe, from_date=None, to_date=None):
+        calls.append((int(from_date), int(to_date)))
+        start = int(from_date) - int(from_date) % bar_seconds
+        ts = np.arange(start, int(to_date) + 1, bar_seconds)
+        return pd.DataFrame({
+            "datetime": pd.to_datetime(ts, unit="s", utc=True),
+            "open": 1.0, "high": 1.1, "low": 0.9, "close": 1.05,
+        })
+    return fake_get_ohlc
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    candle_cache.clear()
+    yield
+    candle_cache.clear()
+
+
+def test_live_requests_fetch_only_the_tail(monkeypatch):
+    calls = []
+    monkeypatch.setattr(candle_cache, "fetch_ohlc", _provider(calls))
+    now = int(time.time())
+
+    first = candle_cache.get_ohlc("eurusd", "1", now - 3600, None)
+    assert len(calls) == 1
+    assert len(first) >= 60
+
+    # within the refresh window: served from memory
+    candle_cache.get_ohlc("EURUSD", "1", now - 1800, None)
+    assert len(calls) == 1
+
+    # after the refresh window only the tail since the last cached bar is requested
+    monkeypatch.setattr(candle_cache, "CANDLE_REFRESH_SECONDS", 0)
+    candle_cache.get_ohlc("EURUSD", "1", now - 1800, None)
+    assert len(calls) == 2
+    tail_from, _ = calls[1]
+    assert tail_from >= now - 120
+
+
+def test_historical_range_inside_cache_is_served_from_memory(monkeypatch):
+    calls = []
+    monkeypatch.setattr(candle_cache, "fetch_ohlc", _provider(calls))
+    now = int(time.time())
+
+    candle_cache.get_ohlc("EURUSD", "1", now - 7200, None)
+    part = candle_cache.get_ohlc("EURUSD", "1", now - 6000, now - 3000)
+    assert len(calls) == 1
+    ts = (part["datetime"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    assert ts.min() >= now - 6000 and ts.max() <= now - 3000
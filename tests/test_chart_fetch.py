@@ -16,22 +16,25 @@ async def test_alert_generates_charts_for_each_timeframe(monkeypatch):
     fake_alert.id = 456
     fake_alert.symbol = "eurusd"
     fake_alert.target_price = 1.2345
-    fake_alert.timeframes = ["60", "240"]
+    fake_alert.timeframes = "60,240"  # stored as a comma-separated string
     fake_alert.direction = MagicMock(value="above")
     fake_alert.triggered = False
+    fake_alert._is_duplicate = False
+    fake_alert.overlays = None
+    fake_alert.expires_at = None
 
-    monkeypatch.setattr(alert_handler, "get_or_create_user", lambda **kwargs: fake_user)
-    monkeypatch.setattr(alert_handler, "create_alert", lambda **kwargs: fake_alert)
+    monkeypatch.setattr(alert_handler, "get_or_create_user_id_async", AsyncMock(return_value=fake_user.id))
+    monkeypatch.setattr(alert_handler, "create_alert_async", AsyncMock(return_value=fake_alert))
 
     # --- Capture chart calls ---
     chart_calls = []
 
-    def fake_chart(symbol, alert_price=None, timeframe=None, **kwargs):
+    def fake_chart(symbol=None, timeframe=None, alert_price=None, **kwargs):
         chart_calls.append((symbol, timeframe))
         buf = io.BytesIO(b"fakepng")
         return buf, timeframe  # timeframe already normalized here
 
-    monkeypatch.setattr(alert_handler, "generate_chart_image", fake_chart)
+    monkeypatch.setattr(alert_handler, "get_chart", fake_chart)
 
     # --- Fake Telegram update/context ---
     update = MagicMock()
@@ -51,8 +54,9 @@ async def test_alert_generates_charts_for_each_timeframe(monkeypatch):
     # --- Assertions ---
     assert len(chart_calls) == 2, "Should call chart generator once per timeframe"
     for symbol, tf in chart_calls:
-        assert symbol == "eurusd"
+        assert symbol == "EURUSD"
         assert tf in VALID_CODES, f"Invalid LiteFinance timeframe code: {tf}"
+    assert alert_handler.create_alert_async.await_args.kwargs["timeframes"] == ["60", "240"]
 
     assert update.message.reply_photo.await_count == 2
     assert update.message.reply_text.await_count >= 1
@@ -66,17 +70,20 @@ async def test_alert_handles_no_ohlc_data(monkeypatch):
     fake_alert.id = 456
     fake_alert.symbol = "eurusd"
     fake_alert.target_price = 1.2345
-    fake_alert.timeframes = ["5"]
+    fake_alert.timeframes = "5"
     fake_alert.direction = MagicMock(value="below")
     fake_alert.triggered = False
+    fake_alert._is_duplicate = False
+    fake_alert.overlays = None
+    fake_alert.expires_at = None
 
-    monkeypatch.setattr(alert_handler, "get_or_create_user", lambda **kwargs: fake_user)
-    monkeypatch.setattr(alert_handler, "create_alert", lambda **kwargs: fake_alert)
+    monkeypatch.setattr(alert_handler, "get_or_create_user_id_async", AsyncMock(return_value=fake_user.id))
+    monkeypatch.setattr(alert_handler, "create_alert_async", AsyncMock(return_value=fake_alert))
 
-    def fake_chart_raises(symbol, alert_price=None, timeframe=None, **kwargs):
+    def fake_chart_raises(symbol=None, timeframe=None, alert_price=None, **kwargs):
         raise ValueError("No OHLC data returned")
 
-    monkeypatch.setattr(alert_handler, "generate_chart_image", fake_chart_raises)
+    monkeypatch.setattr(alert_handler, "get_chart", fake_chart_raises)
 
     update = MagicMock()
     update.effective_chat.id = 999
@@ -0,0 +1,89 @@
+# tests/test_chart_prerender.py
+import asyncio
+import pytest
+from io import BytesIO
+
+import utils.chart_prerender as prerender
+
+
+@pytest.fixture(autouse=True)
+def _clear_state():
+    prerender._prerendered.clear()
+    prerender._inflight.clear()
+    yield
+    prerender._prerendered.clear()
+    prerender._inflight.clear()
+
+
+def test_within_band():
+    assert prerender.within_band(1.0995, 1.1000, band_pct=0.001)
+    assert not prerender.within_band(1.0900, 1.1000, band_pct=0.001)
+    assert not prerender.within_band(None, 1.1000, band_pct=0.001)
+
+
+@pytest.mark.asyncio
+async def test_trigger_uses_prerendered_image(monkeypatch):
+    calls = []
+
+    def fake_chart(symbol, timeframe, alert_price=None, outputsize=150, from_date=None, to_date=None, overlays=None):
+        calls.append((symbol, timeframe))
+        return BytesIO(b"PNG-" + timeframe.encode()), timeframe
+
+    monkeypatch.setattr(prerender, "get_chart", fake_chart)
+    loop = asyncio.get_running_loop()
+
+    prerender.schedule_prerender(loop, "EURUSD", "60", 1.1, 150)
+    # a second schedule for the same candle is a no-op
+    prerender.schedule_prerender(loop, "EURUSD", "60", 1.1, 150)
+    await asyncio.sleep(0.05)
+
+    buf, period = await prerender.get_chart_prerendered(loop, "EURUSD", "60", 1.1, 150)
+    assert buf.getvalue() == b"PNG-60"
+    assert period == "60"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_candle_is_rerendered(monkeypatch):
+    calls = []
+
+    def fake_chart(symbol, timeframe, alert_price=None, outputsize=150, from_date=None, to_date=None, overlays=None):
+        calls.append(timeframe)
+        return BytesIO(b"PNG"), timeframe
+
+    monkeypatch.setattr(prerender, "get_chart", fake_chart)
+    loop = asyncio.get_running_loop()
+
+    key = prerender._key("EURUSD", "15", 1.1, 150)
+    prerender._prerendered[key] = {"png": b"OLD", "period": "15", "candle_start": 0}
+
+    buf, _ = await prerender.get_chart_prerendered(loop, "EURUSD", "15", 1.1, 150)
+    assert buf.getvalue() == b"PNG"
+    assert calls == ["15"]
+
+
+@pytest.mark.asyncio
+async def test_chart_batch_shares_fetch_and_equal_renders(monkeypatch):
+    fetches, renders = [], []
+
+    def fake_fetch(symbol, timeframe, from_date, to_date):
+        fetches.append((symbol, timeframe))
+        return "OHLC"
+
+    def fake_chart(symbol, timeframe, alert_price=None, outputsize=150, from_date=None, to_date=None, overlays=None, ohlc=None):
+        assert ohlc == "OHLC"
+        renders.append(alert_price)
+        return BytesIO(b"PNG-%s" % str(alert_price).encode()), timeframe
+
+    monkeypatch.setattr(prerender, "get_chart", fake_chart)
+    batch = prerender.ChartBatch(asyncio.get_running_loop(), fetch=fake_fetch)
+
+    results = await asyncio.gather(
+        *[batch.render("EURUSD", "60", 1.1, 150) for _ in range(10)],
+        batch.render("EURUSD", "60", 1.2, 150),
+    )
+
+    assert fetches == [("EURUSD", "60")]
+    assert sorted(renders) == [1.1, 1.2]
+    assert [buf.getvalue() for buf, _ in results[:10]] == [b"PNG-1.1"] * 10
+    assert results[10][0].getvalue() == b"PNG-1.2"
@@ -124,3 +124,75 @@ def test_generate_chart_image_with_alert_price(monkeypatch):
     assert isinstance(buf, io.BytesIO)
     assert buf.getbuffer().nbytes > 0
     assert str(period) == "15"
+
+
+def test_downsample_ohlc_keeps_true_ohlc_per_bucket():
+    """Merged buckets must keep first open, max high, min low and last close."""
+    import utils.chart_utils as cu
+    df = _make_ohlc_df(n=2000, freq="1min")
+    out, factor = cu.downsample_ohlc(df, max_candles=500)
+
+    assert factor == 4
+    assert len(out) == 500
+    # last bucket is anchored on the newest candle
+    tail = df.iloc[-4:]
+    last = out.iloc[-1]
+    assert last["open"] == tail["open"].iloc[0]
+    assert last["high"] == tail["high"].max()
+    assert last["low"] == tail["low"].min()
+    assert last["close"] == tail["close"].iloc[-1]
+    assert last["volume"] == tail["volume"].sum()
+    assert out.index[-1] == tail.index[0]
+
+
+def test_downsample_ohlc_noop_when_under_budget():
+    import utils.chart_utils as cu
+    df = _make_ohlc_df(n=100, freq="15T")
+    out, factor = cu.downsample_ohlc(df, max_candles=500)
+    assert factor == 1
+    assert out is df
+
+
+def test_generate_chart_image_reports_effective_timeframe(monkeypatch):
+    """Large ranges are plotted as merged candles and the returned timeframe says so."""
+    df = _make_ohlc_df(n=3000, freq="15T")
+    import utils.chart_utils as cu
+    monkeypatch.setattr(cu, "get_ohlc", lambda *args, **kwargs: df)
+    monkeypatch.setattr(cu, "MAX_CHART_CANDLES", 500)
+
+    buf, period = generate_chart_image("EURUSD", alert_price=None, timeframe="15", from_date=None, to_date=None, outputsize=9999)
+    assert buf.getbuffer().nbytes > 0
+    assert period == "90"
+
+
+def test_parse_overlays():
+    import utils.chart_utils as cu
+    assert cu.parse_overlays("ema20,SMA200,bb20,vol") == ([("ema", 20), ("sma", 200), ("bb", 20)], True)
+    assert cu.parse_overlays(None) == ([], False)
+    with pytest.raises(ValueError):
+        cu.parse_overlays("ema20,macd")
+    assert cu.is_overlay_spec("ema20,bb20")
+    assert not cu.is_overlay_spec("15")
+    assert not cu.is_overlay_spec("2024-08-01")
+
+
+def test_generate_chart_image_with_overlays_records_timings(monkeypatch):
+    """Overlays and a volume panel render, and overlay cost shows up in chart metrics."""
+    df = _make_ohlc_df(n=120, freq="15T")
+    import utils.chart_utils as cu
+    from utils import metrics
+    metrics.reset()
+    monkeypatch.setattr(cu, "get_ohlc", lambda *args, **kwargs: df)
+
+    buf, period = generate_chart_image("OVLTEST", alert_price=1.1, timeframe="15", from_date=None, to_date=None,
+                                       outputsize=120, overlays="ema20,sma50,bb20,sma500,vol")
+    assert buf.getbuffer().nbytes > 0
+    timings = metrics.snapshot()["timings"]
+    for name in ("chart.fetch", "chart.overlays", "chart.render", "chart.total"):
+        assert timings[name]["count"] == 1
+
+    # a second request for the same window reuses the cached overlay values
+    from utils.indicators import get_engine
+    cached = get_engine("OVLTEST", "15").get("ema", length=20)
+    generate_chart_image("OVLTEST", timeframe="15", from_date=None, to_date=None, outputsize=120, overlays="ema20")
+    assert get_engine("OVLTEST", "15").get("ema", length=20) is cached
@@ -0,0 +1,139 @@
+# tests/test_conditions.py
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import services.db_service as db_service
+import services.condition_service as condition_service
+from models.user import User
+from utils.conditions import (
+    parse_condition,
+    move_signal,
+    cross_signal,
+    break_levels,
+    break_signal,
+    first_signal_at,
+    first_move_at,
+    describe_condition,
+)
+from utils.condition_checker import evaluate_conditions
+
+
+def test_parse_move_cross_break():
+    assert parse_condition(["move", "1%", "1h"]) == ("move", "1", {"pct": 1.0, "window": 60})
+    assert parse_condition(["cross", "EMA50", "15m", "up"]) == (
+        "cross", "15", {"indicator": "ema", "length": 50, "side": "up"}
+    )
+    assert parse_condition(["break", "high"]) == ("break", "D", {"level": "high"})
+
+
+@pytest.mark.parametrize("tokens", [[], ["jump", "1%"], ["move", "x%", "1h"], ["cross", "foo9", "1h"], ["break", "mid"]])
+def test_parse_rejects_invalid(tokens):
+    with pytest.raises(ValueError):
+        parse_condition(tokens)
+
+
+def test_describe_condition():
+    assert describe_condition("move", "1", {"pct": 1.0, "window": 60}) == "moves 1% within 60m"
+    assert describe_condition("break", "D", '{"level": "low"}') == "breaks yesterday's low"
+
+
+def test_move_and_cross_signals():
+    close = np.array([100.0, 100.5, 101.2, 101.0])
+    assert move_signal(close, 2, 1.0).tolist() == [False, False, True, False]
+    line = np.array([100.2, 100.2, 100.2, 101.1])
+    assert cross_signal(close, line).tolist() == [False, True, False, True]
+    assert cross_signal(close, line, "down").tolist() == [False, False, False, True]
+
+
+def test_break_levels_use_previous_period():
+    days = pd.DataFrame({
+        "datetime": pd.to_datetime(["2024-01-01", "2024-01-02"], utc=True),
+        "high": [1.2, 1.3],
+        "low": [1.0, 1.1],
+    })
+    day2 = int(pd.Timestamp("2024-01-02", tz="UTC").timestamp())
+    levels = break_levels(days, np.array([day2 - 60, day2, day2 + 60]), "high")
+    assert np.isnan(levels[0]) and levels[1:].tolist() == [1.2, 1.2]
+    assert break_signal([1.25, 1.19, 1.21], [1.0] * 3, levels, "high").tolist() == [False, False, True]
+
+
+def test_first_signal_at_per_creation_time():
+    starts = np.array([0, 60, 120, 180])
+    signal = np.array([True, False, True, False])
+    out = first_signal_at(starts, signal, np.array([0, 1, 121, 500]))
+    assert out[0] == 0 and out[1] == 120
+    assert np.isnan(out[2]) and np.isnan(out[3])
+
+
+def test_first_move_at_ignores_moves_before_creation():
+    starts = np.arange(8) * 60
+    close = np.array([100.0, 100.0, 101.5, 101.6, 101.6, 101.6, 103.0, 103.0])
+    # created inside bar 2, after most of the move: measured from bar 2's close on
+    out = first_move_at(starts, close, 3, 1.0, np.array([150, 0, 500]))
+    assert out[0] == 360
+    assert out[1] == 120
+    assert np.isnan(out[2])
+    # a move inside the first `bars` bars after creation is checked against the fixed baseline
+    assert first_move_at(starts, close, 5, 1.0, np.array([30]))[0] == 120
+
+
+def _frame(start, closes, step=60):
+    dt = pd.to_datetime([start + i * step for i in range(len(closes))], unit="s", utc=True)
+    closes = np.asarray(closes, dtype=float)
+    return pd.DataFrame({"datetime": dt, "open": closes, "high": closes, "low": closes, "close": closes})
+
+
+def test_evaluate_conditions_groups_and_respects_creation_time():
+    base = 1_700_000_040
+    closes = [100.0] * 5 + [102.0] * 5
+    calls = []
+
+    def fetch(symbol, tf, start, end):
+        calls.append((symbol, tf))
+        return _frame(base, closes)
+
+    created_early = pd.Timestamp(base + 60, unit="s")
+    created_late = pd.Timestamp(base + 9 * 60 + 30, unit="s")
+    conds = [
+        {"id": 1, "symbol": "EUR/USD", "kind": "move", "timeframe": "1", "params": '{"pct": 1.0, "window": 1}', "created_at": created_early},
+        {"id": 2, "symbol": "EUR/USD", "kind": "move", "timeframe": "1", "params": '{"pct": 1.0, "window": 1}', "created_at": created_late},
+    ]
+
+    fired = evaluate_conditions(conds, now=base + 10 * 60, fetch=fetch)
+
+    assert calls == [("EUR/USD", "1")]
+    assert fired == [(conds[0], base + 5 * 60)]
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db_service.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(db_service, "SessionLocal", factory)
+    return factory
+
+
+def test_condition_service_roundtrip(session_factory):
+    with session_factory() as db:
+        user = User(chat_id=777)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    kind, tf, params = parse_condition(["move", "1%", "1h"])
+    cond = condition_service.create_condition_alert(user_id, "eurusd", kind, tf, params)
+    dup = condition_service.create_condition_alert(user_id, "eurusd", kind, tf, dict(reversed(list(params.items()))))
+    assert dup.id == cond.id and getattr(dup, "_is_duplicate", False)
+
+    pending = condition_service.get_pending_conditions()
+    assert [(c["id"], c["user_chat_id"]) for c in pending] == [(cond.id, 777)]
+
+    fired = condition_service.mark_conditions_triggered([cond.id, cond.id])
+    assert [c["id"] for c in fired] == [cond.id]
+    assert condition_service.mark_conditions_triggered([cond.id]) == []
+    assert condition_service.get_pending_conditions() == []
@@ -0,0 +1,91 @@
+# tests/test_indicators.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import indicators
+
+
+def _make_candles(n=300, start="2025-01-01", freq="15min", seed=1):
+    idx = pd.date_range(start=start, periods=n, freq=freq, tz="UTC")
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(scale=0.001, size=n))
+    open_ = close + rng.normal(scale=0.0003, size=n)
+    high = np.maximum(open_, close) + np.abs(rng.normal(scale=0.0005, size=n))
+    low = np.minimum(open_, close) - np.abs(rng.normal(scale=0.0005, size=n))
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close}, index=idx)
+
+
+def _loop_rma(values, length):
+    """Reference implementation: the per-element loop the strategy used before."""
+    out = np.full(len(values), np.nan)
+    out[length - 1] = values[:length].mean()
+    for i in range(length, len(values)):
+        out[i] = (out[i - 1] * (length - 1) + values[i]) / length
+    return out
+
+
+def test_sma_matches_pandas_rolling():
+    close = _make_candles()["close"]
+    np.testing.assert_allclose(indicators.sma(close, 20), close.rolling(20).mean().to_numpy(), equal_nan=True)
+
+
+def test_rma_matches_reference_loop():
+    close = _make_candles()["close"].to_numpy()
+    np.testing.assert_allclose(indicators.rma(close, 14), _loop_rma(close, 14), equal_nan=True)
+
+
+def test_ema_is_sma_seeded():
+    close = _make_candles()["close"].to_numpy()
+    out = indicators.ema(close, 10)
+    assert np.isnan(out[:9]).all()
+    assert out[9] == pytest.approx(close[:10].mean())
+    alpha = 2 / 11
+    assert out[10] == pytest.approx(out[9] + alpha * (close[10] - out[9]))
+
+
+def test_bollinger_and_rsi_bounds():
+    close = _make_candles()["close"]
+    mid, upper, lower = indicators.bollinger(close, 20, 2.0)
+    np.testing.assert_allclose(upper - mid, 2 * close.rolling(20).std(ddof=0).to_numpy(), equal_nan=True)
+    r = indicators.rsi(close, 14)
+    valid = r[~np.isnan(r)]
+    assert ((valid >= 0) & (valid <= 100)).all()
+
+
+@pytest.mark.parametrize("name,params", [
+    ("sma", {"length": 20}),
+    ("ema", {"length": 20}),
+    ("ssma", {"length": 14}),
+    ("rsi", {"length": 14}),
+    ("atr", {"length": 14}),
+    ("bb", {"length": 20, "mult": 2.0}),
+])
+def test_engine_incremental_update_matches_full_compute(name, params):
+    candles = _make_candles(n=300)
+    engine = indicators.IndicatorEngine("EURUSD", "15")
+    engine.update(candles.iloc[:200])
+    engine.get(name, **params)
+
+    # second batch revises the last (still forming) bar of the first one
+    candles.iloc[199, candles.columns.get_loc("close")] += 0.0005
+    candles.iloc[199, candles.columns.get_loc("high")] += 0.0005
+    assert engine.update(candles.iloc[199:]) == 101
+
+    full = indicators.IndicatorEngine("EURUSD", "15")
+    full.update(candles)
+    pd.testing.assert_frame_equal(engine.get(name, **params), full.get(name, **params), check_freq=False)
+
+
+def test_get_engine_is_shared_per_symbol_timeframe():
+    assert indicators.get_engine("eurusd", "15") is indicators.get_engine("EURUSD", "15")
+    assert indicators.get_engine("EURUSD", "15") is not indicators.get_engine("EURUSD", "60")
+
+
+def test_engine_update_with_known_candles_is_noop():
+    candles = _make_candles(n=100)
+    engine = indicators.IndicatorEngine("EURUSD", "15")
+    engine.update(candles)
+    before = engine.get("ema", length=20)
+    assert engine.update(candles.iloc[50:]) == 0
+    assert engine.get("ema", length=20) is before
@@ -0,0 +1,177 @@
+# tests/test_listalerts.py
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import handlers.listalerts as listalerts
+import services.db_service as db_service
+from models.alert import Alert, AlertDirection
+from models.user import User
+
+
+@pytest.fixture
+def factory(monkeypatch, tmp_path):
+    path = tmp_path / "alerts.db"
+    engine = create_engine(f"sqlite:///{path}")
+    db_service.Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    monkeypatch.setattr(db_service, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    monkeypatch.setattr(listalerts, "find_user_id_async", AsyncMock(side_effect={100: 1, 200: 2}.get))
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        db.add_all([User(id=1, chat_id=100), User(id=2, chat_id=200)])
+        db.commit()
+    yield factory
+    engine.dispose()
+
+
+def _seed(factory, n, user_id=1, triggered=False, **extra):
+    with factory() as db:
+        for i in range(n):
+            db.add(Alert(user_id=user_id, symbol="EURUSD", target_price=1.0 + i / 100, direction=AlertDirection.ABOVE,
+                         timeframes="60", triggered=triggered, **extra))
+        db.commit()
+        return [a.id for a in db.query(Alert).filter_by(user_id=user_id, triggered=triggered).order_by(Alert.id)]
+
+
+async def _page(*args):
+    return listalerts._build_view(await listalerts._load_view(*args))
+
+
+def _buttons(markup):
+    return [b.callback_data for row in markup.inline_keyboard for b in row]
+
+
+def _deletes(markup):
+    return [int(d.split(":")[1]) for d in _buttons(markup) if d.startswith("delete_alert:")]
+
+
+@pytest.mark.asyncio
+async def test_pages_forward_and_back(factory):
+    ids = _seed(factory, 25)
+    _seed(factory, 3, user_id=2)
+
+    text, markup = await _page(1)
+    assert _deletes(markup) == ids[:10]
+    assert f"alerts_page:pending:next:{ids[9]}" in _buttons(markup)
+    assert not any(":prev:" in d for d in _buttons(markup))
+
+    _text, markup = await _page(1, "pending", "next", ids[19])
+    assert _deletes(markup) == ids[20:]
+    assert f"alerts_page:pending:prev:{ids[20]}" in _buttons(markup)
+    assert not any(":next:" in d and d.endswith(str(ids[-1])) for d in _buttons(markup))
+
+    _text, markup = await _page(1, "pending", "prev", ids[20])
+    assert _deletes(markup) == ids[10:20]
+    buttons = _buttons(markup)
+    assert f"alerts_page:pending:prev:{ids[10]}" in buttons and f"alerts_page:pending:next:{ids[19]}" in buttons
+
+
+@pytest.mark.asyncio
+async def test_filters_split_pending_and_triggered(factory):
+    pending = _seed(factory, 2)
+    fired = _seed(factory, 1, triggered=True, triggered_at=datetime(2025, 1, 2, 3, 4))
+    _seed(factory, 1, expires_at=datetime.utcnow() - timedelta(days=1))
+
+    text, markup = await _page(1, "pending")
+    assert _deletes(markup) == pending[:2] and "alerts_page:triggered:next:0" in _buttons(markup)
+
+    text, markup = await _page(1, "triggered")
+    assert _deletes(markup) == fired and "triggered 2025-01-02 03:04" in text
+
+
+def _query(data, message_id=7, markup=None, text="", from_user=100):
+    return SimpleNamespace(
+        data=data, from_user=SimpleNamespace(id=from_user), answer=AsyncMock(), edit_message_text=AsyncMock(),
+        message=SimpleNamespace(message_id=message_id, reply_markup=markup, text=text),
+    )
+
+
+def _pressed(query, chat_id=100):
+    return SimpleNamespace(callback_query=query, effective_chat=SimpleNamespace(id=chat_id))
+
+
+@pytest.mark.asyncio
+async def test_delete_without_view_state_rerenders_the_page_being_viewed(factory):
+    ids = _seed(factory, 15)
+    _text, markup = await _page(1, "pending", "next", ids[9])
+    query = _query(f"delete_alert:{ids[12]}", markup=markup)
+
+    await listalerts.delete_alert_callback(_pressed(query), SimpleNamespace(chat_data={}))
+
+    _text, kwargs = query.edit_message_text.await_args
+    assert _deletes(kwargs["reply_markup"]) == ids[10:12] + ids[13:]
+    with factory() as db:
+        assert db.get(Alert, ids[12]) is None
+
+
+@pytest.mark.asyncio
+async def test_delete_edits_one_row_and_tops_up_the_page(factory, monkeypatch):
+    ids = _seed(factory, 12)
+    context = SimpleNamespace(chat_data={}, args=[])
+    message = SimpleNamespace(message_id=7)
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=100),
+                             message=SimpleNamespace(reply_text=AsyncMock(return_value=message)))
+    await listalerts.list_alerts_command(update, context)
+
+    # from here on only the top-up query may run: no page reloads
+    monkeypatch.setattr(listalerts, "_fetch_page", AsyncMock(side_effect=AssertionError("page reloaded")))
+    query = _query(f"delete_alert:{ids[3]}")
+    await listalerts.delete_alert_callback(_pressed(query), context)
+
+    _text, kwargs = query.edit_message_text.await_args
+    assert _deletes(kwargs["reply_markup"]) == ids[:3] + ids[4:11]
+    assert any(":next:" in d for d in _buttons(kwargs["reply_markup"]))
+
+    # pressing the same (already deleted) button again changes nothing: no edit
+    again = _query(f"delete_alert:{ids[3]}")
+    await listalerts.delete_alert_callback(_pressed(again), context)
+    again.edit_message_text.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_bulk_deletes_are_scoped_to_the_user(factory):
+    _seed(factory, 2, triggered=True)
+    _seed(factory, 2)
+    with factory() as db:
+        db.add(Alert(user_id=1, symbol="GBPUSD", target_price=1.3, direction=AlertDirection.ABOVE, timeframes="60"))
+        db.commit()
+    _seed(factory, 2, user_id=2, triggered=True)
+
+    query = _query("alerts_clear:triggered")
+    await listalerts.clear_alerts_callback(_pressed(query), SimpleNamespace(chat_data={}))
+    assert query.edit_message_text.await_args.args[0] == "🗑 Deleted 2 triggered alert(s)."
+
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=100), message=SimpleNamespace(reply_text=AsyncMock()))
+    await listalerts.list_alerts_command(update, SimpleNamespace(chat_data={}, args=["clear", "eur/usd"]))
+    assert update.message.reply_text.await_args.args[0] == "🗑 Deleted 2 alert(s) for EUR/USD."
+
+    with factory() as db:
+        assert sorted((a.user_id, a.symbol) for a in db.query(Alert)) == [(1, "GBPUSD"), (2, "EURUSD"), (2, "EURUSD")]
+
+
+@pytest.mark.asyncio
+async def test_buttons_in_a_group_chat_act_on_the_chats_alerts(factory):
+    # chat 100's list, pressed by a member whose private chat (200) owns alerts of its own
+    ids = _seed(factory, 3)
+    _seed(factory, 2, triggered=True)
+    private = _seed(factory, 2, user_id=2, triggered=True)
+    context = SimpleNamespace(chat_data={})
+
+    query = _query(f"delete_alert:{ids[0]}", from_user=200)
+    await listalerts.delete_alert_callback(_pressed(query), context)
+    _text, kwargs = query.edit_message_text.await_args
+    assert _deletes(kwargs["reply_markup"]) == ids[1:]
+
+    query = _query("alerts_clear:triggered", from_user=200)
+    await listalerts.clear_alerts_callback(_pressed(query), context)
+    assert query.edit_message_text.await_args.args[0] == "🗑 Deleted 2 triggered alert(s)."
+
+    with factory() as db:
+        assert sorted(a.id for a in db.query(Alert)) == sorted(ids[1:] + private)
@@ -0,0 +1,73 @@
+# tests/test_migrations.py
+from sqlalchemy import create_engine, event, inspect
+
+import services.db_service as db_service
+from services.migrations import LATEST_VERSION, current_version, migrate
+
+
+def _old_schema(engine):
+    """Tables as an early version of the bot created them: no expiry column, no indexes."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE users (id INTEGER PRIMARY KEY, chat_id INTEGER NOT NULL UNIQUE, "
+                             "username VARCHAR, first_name VARCHAR, last_name VARCHAR, created_at DATETIME)")
+        conn.exec_driver_sql("CREATE TABLE alerts (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, symbol VARCHAR NOT NULL, "
+                             "target_price FLOAT NOT NULL, direction VARCHAR(5) NOT NULL, timeframes VARCHAR NOT NULL, "
+                             "triggered BOOLEAN NOT NULL, created_at DATETIME, triggered_at DATETIME)")
+        conn.exec_driver_sql("INSERT INTO users (id, chat_id) VALUES (1, 99)")
+        conn.exec_driver_sql("INSERT INTO alerts (user_id, symbol, target_price, direction, timeframes, triggered) "
+                             "VALUES (1, 'EUR/USD', 1.1, 'ABOVE', '60', 0), (1, 'EUR/USD', 1.1000000001, 'ABOVE', '60', 0), "
+                             "(1, 'USDJPY', 150.1234, 'ABOVE', '60', 1)")
+
+
+def test_migrations_upgrade_an_old_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    _old_schema(engine)
+
+    db_service.init_db(bind=engine)
+
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("alerts")}
+    assert {"overlays", "trigger_candle_at", "expires_at", "price_ticks"} <= columns
+    indexes = {i["name"] for i in inspector.get_indexes("alerts")}
+    assert {"ix_alerts_triggered_symbol", "ix_alerts_user_triggered", "ux_alerts_pending_dedupe"} <= indexes
+    assert "ix_alerts_dedupe" not in indexes
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        # the pre-existing pending duplicate is kept, without ticks
+        assert conn.exec_driver_sql("SELECT price_ticks FROM alerts ORDER BY id").scalars().all() == [110000, None, 150123]
+        plan = " ".join(r[-1] for r in conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM alerts WHERE triggered = 0 AND symbol = 'EUR/USD'"))
+    assert "ix_alerts_triggered_symbol" in plan
+
+    # already current: nothing runs again
+    assert migrate(engine) == LATEST_VERSION
+
+
+def test_pragmas_enable_wal(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}")
+    event.listen(engine, "connect", db_service.apply_pragmas)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == db_service.DB_BUSY_TIMEOUT_MS
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+
+
+def test_price_ticks_migration_on_a_versioned_database(tmp_path):
+    """A database already at version 2 gets the column, the backfill and the unique index from migration 3."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'v2.db'}")
+    _old_schema(engine)
+    with engine.begin() as conn:
+        for column in ("overlays VARCHAR", "trigger_candle_at DATETIME", "expires_at DATETIME"):
+            conn.exec_driver_sql(f"ALTER TABLE alerts ADD COLUMN {column}")
+        conn.exec_driver_sql("CREATE INDEX ix_alerts_dedupe ON alerts (user_id, symbol, timeframes, target_price)")
+        conn.exec_driver_sql("PRAGMA user_version = 2")
+
+    db_service.init_db(bind=engine)
+
+    with engine.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM alerts WHERE price_ticks IS NOT NULL").scalar() == 2
+        plan = " ".join(r[-1] for r in conn.exec_driver_sql(
+            "EXPLAIN QUERY PLAN SELECT id FROM alerts WHERE user_id = 1 AND symbol = 'EUR/USD' "
+            "AND price_ticks = 110000 AND timeframes = '60' AND triggered = 0"))
+    assert "ux_alerts_pending_dedupe" in plan
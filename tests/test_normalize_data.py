@@ -2,7 +2,7 @@
 
 import pytest
 import pandas as pd
-from utils.normalize_data import normalize_symbol, normalize_ohlc
+from utils.normalize_data import normalize_symbol, normalize_ohlc, price_decimals, price_ticks
 
 
 def test_normalize_symbol_basic():
@@ -12,6 +12,13 @@ def test_normalize_symbol_basic():
     assert normalize_symbol(None) == ""
 
 
+def test_price_ticks_use_the_symbol_precision():
+    assert price_decimals("EUR/USD") == 5 and price_decimals("usdjpy") == 3
+    assert price_decimals("XAUUSD") == 2 and price_decimals("BTCUSD") == 8
+    assert price_ticks("EURUSD", 1.23456) == price_ticks("EURUSD", "1.234561") == 123456
+    assert price_ticks("USDJPY", 150.1234) == 150123
+
+
 def test_normalize_ohlc_valid():
     # Example LiteFinance OHLC data (timestamp_ms, open, high, low, close)
     content = [
@@ -0,0 +1,105 @@
+# tests/test_notification_service.py
+import asyncio
+import time
+
+import pytest
+from telegram.error import RetryAfter
+
+from services.notification_service import NotificationDispatcher, PRIORITY_CHART, PRIORITY_TEXT
+
+
+def _recorder(log, name):
+    async def send():
+        log.append((name, time.monotonic()))
+    return send
+
+
+@pytest.mark.asyncio
+async def test_texts_go_before_charts_and_chats_are_paced():
+    log = []
+    d = NotificationDispatcher(workers=1, global_rate=1000, per_chat_interval=0.05)
+    d.submit(1, _recorder(log, "chart-1"), PRIORITY_CHART)
+    d.submit(1, _recorder(log, "text-1"), PRIORITY_TEXT)
+    d.submit(2, _recorder(log, "text-2"), PRIORITY_TEXT)
+    d.start()
+    await d.join()
+    await d.stop()
+
+    assert [name for name, _t in log] == ["text-1", "text-2", "chart-1"]
+    times = dict(log)
+    # chat 2 is not held back by chat 1; chat 1's second message waits its interval
+    assert times["text-2"] - times["text-1"] < 0.04
+    assert times["chart-1"] - times["text-1"] >= 0.045
+
+
+@pytest.mark.asyncio
+async def test_global_rate_spaces_sends_across_chats():
+    log = []
+    d = NotificationDispatcher(workers=4, global_rate=50, per_chat_interval=0)
+    for chat in range(4):
+        d.submit(chat, _recorder(log, chat))
+    d.start()
+    await d.join()
+    await d.stop()
+
+    times = sorted(t for _name, t in log)
+    assert times[-1] - times[0] >= 3 * 0.02 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_retried():
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise RetryAfter(0.05)
+
+    d = NotificationDispatcher(workers=1, global_rate=1000, per_chat_interval=0)
+    d.submit(1, flaky)
+    d.start()
+    await d.join()
+    await d.stop()
+
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.045
+
+
+@pytest.mark.asyncio
+async def test_backlog_in_one_chat_does_not_hold_up_others():
+    log = []
+    d = NotificationDispatcher(workers=2, global_rate=1000, per_chat_interval=0.1)
+    for i in range(4):
+        d.submit(1, _recorder(log, f"busy-{i}"))
+    d.submit(2, _recorder(log, "other"))
+    started = time.monotonic()
+    d.start()
+    await d.join()
+    await d.stop()
+
+    times = dict(log)
+    assert times["other"] - started < 0.05
+    assert times["busy-3"] - times["busy-0"] >= 3 * 0.1 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_prepare_runs_before_the_send_slot_is_booked():
+    log = []
+
+    async def render():
+        await asyncio.sleep(0.1)
+        return "png"
+
+    async def send_chart(prepared):
+        log.append((prepared, time.monotonic()))
+
+    d = NotificationDispatcher(workers=1, global_rate=1000, per_chat_interval=0.1)
+    d.submit(1, send_chart, PRIORITY_CHART, prepare=render)
+    d.submit(1, _recorder(log, "text"), PRIORITY_TEXT)
+    d.start()
+    await d.join()
+    await d.stop()
+
+    times = dict(log)
+    # the render overlaps the chat's interval after the text instead of following it
+    assert 0.09 <= times["png"] - times["text"] < 0.17
@@ -0,0 +1,53 @@
+# tests/test_poll_cadence.py
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.poll_cadence as cadence
+from utils.alert_index import AlertIndex
+
+
+@pytest.fixture(autouse=True)
+def _bounds(monkeypatch):
+    monkeypatch.setattr(cadence, "QUOTE_POLL_SECONDS", 1.0)
+    monkeypatch.setattr(cadence, "QUOTE_POLL_MAX_SECONDS", 60.0)
+    cadence._atr_cache.clear()
+    yield
+    cadence._atr_cache.clear()
+
+
+def test_poll_interval_scales_with_distance_in_atrs():
+    # 0.5 ATR away -> 15 s, 0.01 ATR -> floor, 10 ATR -> ceiling
+    assert cadence.poll_interval(0.0005, 0.001) == pytest.approx(15.0)
+    assert cadence.poll_interval(0.00001, 0.001) == 1.0
+    assert cadence.poll_interval(0.01, 0.001) == 60.0
+    # unknown volatility -> fastest; no levels -> slowest
+    assert cadence.poll_interval(0.01, None) == 1.0
+    assert cadence.poll_interval(None, 0.001) == 60.0
+
+
+def test_nearest_distance_uses_closest_level_on_either_side():
+    index = AlertIndex()
+    index.add({"id": 1, "symbol": "EURUSD", "target_price": 1.12, "direction": "above"})
+    index.add({"id": 2, "symbol": "EURUSD", "target_price": 1.15, "direction": "above"})
+    index.add({"id": 3, "symbol": "EURUSD", "target_price": 1.09, "direction": "below"})
+
+    assert index.nearest_levels("EURUSD", 1.10) == (1.12, 1.09)
+    assert cadence.nearest_distance(index, "EURUSD", 1.10) == pytest.approx(0.01)
+    assert cadence.nearest_distance(index, "GBPUSD", 1.10) is None
+
+
+def test_measure_atr_is_cached(monkeypatch):
+    calls = []
+    n = 60
+    df = pd.DataFrame({
+        "datetime": pd.date_range(end="2025-01-01", periods=n, freq="min", tz="UTC"),
+        "open": np.full(n, 1.1), "high": np.full(n, 1.101), "low": np.full(n, 1.099), "close": np.full(n, 1.1),
+    })
+    monkeypatch.setattr(cadence, "get_ohlc", lambda *a: calls.append(a) or df)
+
+    assert cadence.atr_is_stale("EURUSD")
+    assert cadence.measure_atr("EURUSD") == pytest.approx(0.002)
+    assert not cadence.atr_is_stale("EURUSD")
+    assert cadence.cached_atr("EURUSD") == pytest.approx(0.002)
+    assert len(calls) == 1
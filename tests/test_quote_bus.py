@@ -0,0 +1,107 @@
+# tests/test_quote_bus.py
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import utils.alert_checker as alert_checker
+from models.alert import AlertDirection
+from utils.quote_bus import QuoteBus
+
+
+def _aw(fn):
+    async def wrapper(*args, **kwargs):
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+@pytest.mark.asyncio
+async def test_feed_publishes_only_changed_quotes():
+    prices = iter([1.0, 1.0, 1.1, 1.1, 1.2])
+
+    def fetch(symbol):
+        return {"price": next(prices, 1.2)}
+
+    bus = QuoteBus(fetch=fetch, interval=0.001)
+    received = []
+
+    async def on_quote(symbol, quote):
+        received.append((symbol, quote["price"]))
+
+    bus.subscribe(on_quote)
+    bus.watch(["eurusd"])
+    await asyncio.sleep(0.1)
+    await bus.stop()
+
+    assert received == [("EURUSD", 1.0), ("EURUSD", 1.1), ("EURUSD", 1.2)]
+    assert bus.last("EURUSD")[0] == {"price": 1.2}
+
+
+@pytest.mark.asyncio
+async def test_watch_stops_feeds_for_dropped_symbols():
+    bus = QuoteBus(fetch=lambda s: None, interval=0.01)
+    bus.watch(["EURUSD", "GBPUSD"])
+    assert bus.watched() == {"EURUSD", "GBPUSD"}
+    bus.watch(["GBPUSD"])
+    assert bus.watched() == {"GBPUSD"}
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_shorter_interval_wakes_a_sleeping_feed():
+    polls = []
+    bus = QuoteBus(fetch=lambda s: polls.append(s) or None, interval=60)
+    bus.watch(["EURUSD"])
+    await asyncio.sleep(0.02)
+    assert len(polls) == 1
+
+    bus.set_interval("EURUSD", 0.01)
+    await asyncio.sleep(0.05)
+    assert len(polls) > 2
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_fresh_returns_only_recent_quotes_of_watched_symbols():
+    bus = QuoteBus(fetch=lambda s: None, interval=10)
+    bus.seed("EURUSD", {"price": 1.1}, time.time())
+    assert bus.fresh("EURUSD") is None  # not watched
+    bus.watch(["EURUSD", "GBPUSD"])
+    assert bus.fresh("eurusd") == {"price": 1.1}
+    assert bus.fresh("GBPUSD") is None
+    bus.seed("GBPUSD", {"price": 1.3}, time.time() - 25)
+    assert bus.fresh("GBPUSD") is None  # older than two poll intervals
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_alert_fires_on_crossing_quote(monkeypatch):
+    sent = []
+    alert = SimpleNamespace(
+        id=7, symbol="EURUSD", target_price=1.1, direction=AlertDirection.ABOVE,
+        timeframes="60", overlays=None, user=SimpleNamespace(chat_id=42), user_id=1, triggered_at=None,
+    )
+    marked = []
+    monkeypatch.setattr(alert_checker, "get_pending_alerts_async", _aw(lambda: [] if marked else [alert]))
+    monkeypatch.setattr(alert_checker, "mark_alerts_triggered_async", _aw(lambda ids, candles=None: marked.extend(ids) or [alert_checker._to_plain_alert(alert)]))
+    monkeypatch.setattr(alert_checker, "_notify_triggered", lambda bot, loop, a, price, resp, charts=None: sent.append((a["user_chat_id"], str(price))))
+    monkeypatch.setattr(alert_checker, "_feed_bot", object())
+    monkeypatch.setattr(alert_checker, "_bus", QuoteBus(fetch=lambda s: None))
+    monkeypatch.setattr(alert_checker, "atr_is_stale", lambda symbol: False)
+    monkeypatch.setattr(alert_checker, "get_ohlc", lambda *a: None)
+    monkeypatch.setattr(alert_checker, "get_change_watermark_async", _aw(lambda: None))
+    monkeypatch.setattr(alert_checker, "_watermark", None)
+    alert_checker._index.clear()
+    alert_checker._last_sync = 0.0
+
+    await alert_checker.on_quote("EURUSD", {"price": 1.09})
+    assert sent == [] and 7 in alert_checker._index
+
+    # the crossing quote fires once; a second one finds nothing left to fire
+    await alert_checker.on_quote("EURUSD", {"price": 1.11})
+    await alert_checker.on_quote("EURUSD", {"price": 1.12})
+    assert marked == [7]
+    assert sent == [(42, "1.11")]
+    await alert_checker._bus.stop()
+    alert_checker._index.clear()
@@ -0,0 +1,86 @@
+# tests/test_scheduler.py
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils import metrics
+from utils.scheduler import next_boundary, non_overlapping, run_aligned
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_next_boundary():
+    assert next_boundary(60, now=125.0) == 180
+    assert next_boundary(60, now=120.0) == 120
+    assert next_boundary(60, now=118.0, min_delay=4) == 180
+
+
+@pytest.mark.asyncio
+async def test_overlapping_ticks_are_skipped_and_counted():
+    release = asyncio.Event()
+    runs = []
+
+    async def job(context):
+        runs.append(context)
+        await release.wait()
+
+    wrapped = non_overlapping(job, "test.job", interval=0.01)
+    first = asyncio.create_task(wrapped("a"))
+    await asyncio.sleep(0.02)
+    await wrapped("b")  # previous cycle still running
+    release.set()
+    await first
+
+    snap = metrics.snapshot()
+    assert runs == ["a"]
+    assert snap["counters"]["test.job.skipped"] == 1
+    assert "test.job.merged" not in snap["counters"]
+    assert snap["timings"]["test.job.duration"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_catch_up_queues_one_follow_up_and_merges_the_rest():
+    release = asyncio.Event()
+    runs = []
+
+    async def job(context):
+        runs.append(context)
+        await release.wait()
+
+    wrapped = non_overlapping(job, "test.job", interval=0.01, catch_up=True)
+    first = asyncio.create_task(wrapped("a"))
+    await asyncio.sleep(0)
+    follow_up = asyncio.create_task(wrapped("b"))
+    await asyncio.sleep(0)
+    await wrapped("c")  # a follow-up is already queued
+    release.set()
+    await asyncio.gather(first, follow_up)
+
+    snap = metrics.snapshot()
+    assert runs == ["a", "b"]
+    assert snap["counters"]["test.job.merged"] == 1
+    assert "test.job.skipped" not in snap["counters"]
+    assert snap["timings"]["test.job.duration"]["count"] == 2
+
+
+def test_run_aligned_starts_on_a_boundary():
+    calls = {}
+
+    class JobQueue:
+        def run_repeating(self, callback, interval, first, name):
+            calls.update(interval=interval, first=first, name=name)
+
+    async def job(context):
+        pass
+
+    run_aligned(JobQueue(), job, 30, name="alerts.sweep")
+    assert calls["interval"] == timedelta(seconds=30)
+    assert calls["name"] == "alerts.sweep"
+    assert isinstance(calls["first"], datetime)
+    assert calls["first"].timestamp() % 30 == 0
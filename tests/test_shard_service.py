@@ -0,0 +1,53 @@
+# tests/test_shard_service.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import services.db_service as db_service
+import services.shard_service as shards
+from models import shard_lease  # noqa: F401  (registers the tables)
+
+
+@pytest.fixture(autouse=True)
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db_service.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(db_service, "SessionLocal", factory)
+    return factory
+
+
+def test_shard_of_is_stable_and_case_insensitive():
+    assert shards.shard_of("EUR/USD", 16) == shards.shard_of(" eur/usd ", 16)
+    assert 0 <= shards.shard_of("XAUUSD", 16) < 16
+
+
+def test_workers_split_shards_without_overlap():
+    a = shards.renew_leases("a", shards=8, ttl=30, now=1000)
+    assert a == set(range(8))
+
+    # b joins: a hands back its surplus on the next renewal, b picks it up
+    assert shards.renew_leases("b", shards=8, ttl=30, now=1001) == set()
+    a = shards.renew_leases("a", shards=8, ttl=30, now=1002)
+    b = shards.renew_leases("b", shards=8, ttl=30, now=1003)
+    assert len(a) == 4 and len(b) == 4
+    assert a.isdisjoint(b) and a | b == set(range(8))
+
+
+def test_dead_worker_shards_move_after_lease_expiry():
+    shards.renew_leases("a", shards=4, ttl=30, now=1000)
+    shards.renew_leases("b", shards=4, ttl=30, now=1000)
+    a = shards.renew_leases("a", shards=4, ttl=30, now=1001)
+    b = shards.renew_leases("b", shards=4, ttl=30, now=1001)
+    assert len(a) == 2 and len(b) == 2
+
+    # b stops renewing; while its leases are valid a cannot take them
+    assert shards.renew_leases("a", shards=4, ttl=30, now=1020) == a
+    assert shards.renew_leases("a", shards=4, ttl=30, now=1040) == set(range(4))
+
+
+def test_release_leases_frees_shards_immediately():
+    shards.renew_leases("a", shards=4, ttl=30, now=1000)
+    shards.release_leases("a")
+    assert shards.renew_leases("b", shards=4, ttl=30, now=1001) == set(range(4))
@@ -0,0 +1,143 @@
+# tests/test_snapshot.py
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils.alert_checker as alert_checker
+import utils.candle_cache as candle_cache
+from utils.quote_bus import QuoteBus
+from utils.snapshot import (
+    write_snapshot,
+    read_snapshot,
+    pack_alerts,
+    unpack_alerts,
+    pack_symbols,
+    unpack_symbols,
+    pack_candles,
+    unpack_candles,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_state(monkeypatch, tmp_path):
+    monkeypatch.setattr(alert_checker, "SNAPSHOT_DIR", str(tmp_path / "state"))
+    monkeypatch.setattr(alert_checker, "_watermark", None)
+    monkeypatch.setattr(alert_checker, "_owned_shards", None)
+    monkeypatch.setattr(alert_checker, "_bus", None)
+    alert_checker._index.clear()
+    alert_checker._scanned_until.clear()
+    candle_cache.clear()
+    yield
+    alert_checker._index.clear()
+    alert_checker._scanned_until.clear()
+    candle_cache.clear()
+
+
+def _alert(alert_id, price=1.1, direction="above"):
+    return {"id": alert_id, "symbol": "EUR/USD", "target_price": price, "direction": direction,
+            "timeframes": "60", "overlays": None, "user_chat_id": 42, "user_id": 7, "created_ts": 1_700_000_000.0}
+
+
+def _candles(start, n):
+    return pd.DataFrame({
+        "datetime": pd.to_datetime(np.arange(start, start + 60 * n, 60), unit="s", utc=True),
+        "open": 1.0, "high": 1.1, "low": 0.9, "close": 1.05,
+    })
+
+
+def test_snapshot_files_are_memory_mapped(tmp_path):
+    write_snapshot(str(tmp_path), {"alerts": pack_alerts([_alert(1)])}, {"watermark": 5})
+    write_snapshot(str(tmp_path), {"alerts": pack_alerts([_alert(1), _alert(2)])}, {"watermark": 6})
+
+    manifest, arrays = read_snapshot(str(tmp_path))
+
+    assert manifest["watermark"] == 6
+    assert isinstance(arrays["alerts"], np.memmap)
+    assert [a["id"] for a in unpack_alerts(arrays["alerts"])] == [1, 2]
+    assert read_snapshot(str(tmp_path / "missing")) is None
+
+
+def test_pack_roundtrips():
+    alerts = [_alert(1), dict(_alert(2, 1.2, "below"), user_chat_id=None, created_ts=None)]
+    assert unpack_alerts(pack_alerts(alerts)) == alerts
+
+    quotes = {"EUR/USD": ({"price": 1.1, "bid": "1.0999", "ask": None}, 100.0)}
+    restored_quotes, atrs, scanned = unpack_symbols(pack_symbols(quotes, {"GBP/USD": (0.0004, 90.0)}, {"EUR/USD": 600}))
+    assert restored_quotes["EUR/USD"][0]["price"] == 1.1 and restored_quotes["EUR/USD"][0]["bid"] == 1.0999
+    assert restored_quotes["EUR/USD"][1] == 100.0 and "GBP/USD" not in restored_quotes
+    assert atrs == {"GBP/USD": (0.0004, 90.0)}
+    assert scanned == {"EUR/USD": 600}
+
+    entries = {("EUR/USD", "1"): {"df": _candles(1_700_000_000, 5), "from_ts": 1_700_000_000, "fetched_at": 5.0}}
+    array, segments = pack_candles(entries)
+    back = unpack_candles(array, segments)[("EUR/USD", "1")]
+    pd.testing.assert_frame_equal(back["df"], entries[("EUR/USD", "1")]["df"], check_dtype=False)
+    assert back["from_ts"] == 1_700_000_000 and back["fetched_at"] == 5.0
+
+
+def test_restored_candle_window_only_fetches_the_tail(monkeypatch):
+    now = int(time.time())
+    start = now - now % 60 - 3600
+    calls = []
+
+    def fake_fetch(symbol, timeframe, from_date=None, to_date=None):
+        calls.append(int(from_date))
+        return _candles(int(from_date) - int(from_date) % 60, 2)
+
+    monkeypatch.setattr(candle_cache, "fetch_ohlc", fake_fetch)
+    candle_cache.restore_entries({("EURUSD", "1"): {"df": _candles(start, 60), "from_ts": start, "fetched_at": now - 300}})
+
+    candle_cache.get_ohlc("EUR/USD", "1", start, None)
+
+    assert calls == [start + 59 * 60]
+
+
+def test_state_survives_a_restart():
+    alert_checker._index.add(_alert(1))
+    alert_checker._index.add(_alert(2, 1.0, "below"))
+    alert_checker._watermark = 12
+    alert_checker._scanned_until["EUR/USD"] = int(time.time()) - 120
+    candle_cache.restore_entries({("EUR/USD", "1"): {"df": _candles(1_700_000_000, 3), "from_ts": 1_700_000_000, "fetched_at": 1.0}})
+    alert_checker._write_state(alert_checker._capture_state())
+
+    # "restart"
+    alert_checker._index.clear()
+    alert_checker._watermark = None
+    alert_checker._scanned_until.clear()
+    candle_cache.clear()
+
+    state = alert_checker._read_state()
+    assert state["candles"] == 1
+    assert alert_checker._restore_state(state) is True
+    assert sorted(alert_checker._index.ids()) == [1, 2]
+    assert alert_checker._index.get(1)["user_chat_id"] == 42
+    assert alert_checker._watermark == 12
+    assert "EUR/USD" in alert_checker._scanned_until
+
+
+def test_index_from_other_shards_is_not_reused():
+    alert_checker._owned_shards = {1, 2}
+    alert_checker._index.add(_alert(1))
+    alert_checker._watermark = 3
+    alert_checker._write_state(alert_checker._capture_state())
+
+    alert_checker._owned_shards = {2, 3}
+    alert_checker._index.clear()
+    assert alert_checker._restore_state(alert_checker._read_state()) is False
+    assert len(alert_checker._index) == 0
+
+
+@pytest.mark.asyncio
+async def test_seeded_quote_defers_the_first_poll():
+    polls = []
+    bus = QuoteBus(fetch=lambda symbol: polls.append(symbol) or {"price": 1.0}, interval=30)
+    bus.seed("EURUSD", {"price": 1.0}, time.time())
+    bus.watch(["EURUSD", "GBPUSD"])
+    await asyncio.sleep(0.05)
+    await bus.stop()
+
+    assert polls == ["GBPUSD"]
+    assert bus.last("EURUSD")[0] == {"price": 1.0}
@@ -0,0 +1,58 @@
+# tests/test_telegram_file_cache.py
+import pytest
+from io import BytesIO
+from types import SimpleNamespace
+
+import services.telegram_file_cache as file_cache
+from telegram.error import BadRequest
+
+
+class RecordingSender:
+    """Mimics reply_photo/send_photo: records the photo argument and returns a Message-like object."""
+    def __init__(self, fail_on_file_id=False):
+        self.calls = []
+        self.fail_on_file_id = fail_on_file_id
+
+    async def __call__(self, photo=None, filename=None, caption=None, **kwargs):
+        self.calls.append(photo)
+        if isinstance(photo, str) and self.fail_on_file_id:
+            raise BadRequest("wrong file identifier")
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id=f"fid-{len(self.calls)}")])
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    file_cache._file_ids.clear()
+    yield
+    file_cache._file_ids.clear()
+
+
+@pytest.mark.asyncio
+async def test_second_send_of_same_bytes_reuses_file_id():
+    send = RecordingSender()
+    await file_cache.send_photo_cached(send, BytesIO(b"PNGDATA"), filename="a.png", caption="c")
+    await file_cache.send_photo_cached(send, BytesIO(b"PNGDATA"), filename="a.png", caption="c")
+
+    assert isinstance(send.calls[0], BytesIO)
+    assert send.calls[1] == "fid-1"
+
+
+@pytest.mark.asyncio
+async def test_different_bytes_are_uploaded():
+    send = RecordingSender()
+    await file_cache.send_photo_cached(send, BytesIO(b"ONE"))
+    await file_cache.send_photo_cached(send, BytesIO(b"TWO"))
+
+    assert all(isinstance(p, BytesIO) for p in send.calls)
+
+
+@pytest.mark.asyncio
+async def test_rejected_file_id_falls_back_to_upload():
+    send = RecordingSender(fail_on_file_id=True)
+    file_cache.remember_file_id(file_cache.content_key(BytesIO(b"PNG")), "stale")
+
+    await file_cache.send_photo_cached(send, BytesIO(b"PNG"))
+
+    assert send.calls[0] == "stale"
+    assert isinstance(send.calls[1], BytesIO)
+    assert file_cache.get_file_id(file_cache.content_key(BytesIO(b"PNG"))) == "fid-2"
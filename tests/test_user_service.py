@@ -0,0 +1,57 @@
+# tests/test_user_service.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import services.db_service as db_service
+import services.user_service as user_service
+from models.user import User
+
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    db_service.Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(db_service, "SessionLocal", factory)
+    user_service.clear_user_cache()
+    yield factory
+    user_service.clear_user_cache()
+
+
+def _no_async_db():
+    raise AssertionError("database queried despite a cached user id")
+
+
+@pytest.mark.asyncio
+async def test_created_users_are_resolved_from_the_cache(session_factory, monkeypatch):
+    user = user_service.get_or_create_user(chat_id=31337, username="u")
+    monkeypatch.setattr(user_service, "get_async_db", _no_async_db)
+
+    assert await user_service.get_or_create_user_id_async(31337) == user.id
+    assert await user_service.find_user_id_async(31337) == user.id
+
+
+def test_deleting_a_user_invalidates_its_entry(session_factory):
+    user = user_service.get_or_create_user(chat_id=1)
+    assert user_service.cached_user_id(1) == user.id
+
+    with session_factory() as db:
+        db.delete(db.get(User, user.id))
+        db.commit()
+
+    assert user_service.cached_user_id(1) is None
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(user_service, "MAX_CACHED_USERS", 2)
+    user_service.clear_user_cache()
+    user_service.remember_user(1, 10)
+    user_service.remember_user(2, 20)
+    user_service.cached_user_id(1)  # most recently used now
+    user_service.remember_user(3, 30)
+
+    assert user_service.cached_user_id(2) is None
+    assert user_service.cached_user_id(1) == 10 and user_service.cached_user_id(3) == 30
+    user_service.clear_user_cache()
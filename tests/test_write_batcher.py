@@ -0,0 +1,81 @@
+# tests/test_write_batcher.py
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import services.db_service as db_service
+import services.user_service as user_service
+import services.write_batcher as write_batcher
+from models import alert  # noqa: F401  (registers the Alert mapper)
+from models.user import User
+from services.write_batcher import WriteBatcher
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    """Sync session factory for checks; counts COMMITs issued through the async engine."""
+    path = tmp_path / "batch.db"
+    engine = create_engine(f"sqlite:///{path}")
+    db_service.Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    commits = []
+    event.listen(async_engine.sync_engine, "commit", lambda conn: commits.append(1))
+    monkeypatch.setattr(db_service, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+    user_service.clear_user_cache()
+    factory = sessionmaker(bind=engine)
+    factory.commits = commits
+    yield factory
+    user_service.clear_user_cache()
+    engine.dispose()
+
+
+def _insert_user(chat_id):
+    async def op(session):
+        user = User(chat_id=chat_id)
+        session.add(user)
+        return user
+    return op
+
+
+@pytest.mark.asyncio
+async def test_a_burst_shares_one_commit(db):
+    batcher = WriteBatcher(window_ms=20)
+
+    users = await asyncio.gather(*(batcher.run(_insert_user(1000 + i)) for i in range(50)))
+
+    assert len({u.id for u in users}) == 50 and all(u.created_at is not None for u in users)
+    assert len(db.commits) == 1
+    with db() as session:
+        assert session.query(User).count() == 50
+
+
+@pytest.mark.asyncio
+async def test_a_failing_write_only_fails_its_caller(db):
+    batcher = WriteBatcher(window_ms=20)
+
+    results = await asyncio.gather(
+        batcher.run(_insert_user(1)), batcher.run(_insert_user(1)), batcher.run(_insert_user(2)),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[1], IntegrityError)
+    assert not isinstance(results[0], Exception) and not isinstance(results[2], Exception)
+    with db() as session:
+        assert sorted(u.chat_id for u in session.query(User)) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_user_goes_through_the_batcher(db, monkeypatch):
+    monkeypatch.setattr(write_batcher, "DB_WRITE_BATCH_MS", 20)
+    monkeypatch.setattr(write_batcher, "_batcher", None)
+
+    users = await asyncio.gather(*(user_service.get_or_create_user_async(chat_id=c) for c in (5, 6, 5, 7)))
+
+    assert users[0].id == users[2].id
+    assert len(db.commits) == 1
+    await write_batcher.stop_write_batcher()
@@ -0,0 +1,74 @@
+# utils/alert_archiver.py
+"""
+Alert lifecycle jobs: expiry and archival.
+
+Expired pending alerts are moved to alerts_archive every few minutes (the
+query only touches the expires_at index). Triggered alerts, the bulk of the
+table over time, are archived in small batches during the off-peak hours so the
+hot `alerts` table stays limited to live alerts.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from config import ARCHIVE_AFTER_HOURS, ARCHIVE_BATCH_SIZE, ARCHIVE_OFFPEAK_HOURS
+from services.alert_service import archive_triggered_alerts, expire_alerts
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# upper bound on batches per run, so one run never holds the database for long
+MAX_BATCHES_PER_RUN = 200
+# pause between batches, letting other writers (alert creation, triggers) in
+BATCH_PAUSE_SECONDS = 0.05
+
+
+def in_off_peak(hour: int, spec: str = None) -> bool:
+    """True when UTC `hour` lies in the "start-end" window (end exclusive, may wrap midnight)."""
+    spec = ARCHIVE_OFFPEAK_HOURS if spec is None else spec
+    try:
+        start, end = (int(part) % 24 for part in spec.split("-"))
+    except (AttributeError, ValueError):
+        logger.warning("[Archiver] Invalid off-peak window %r; archiving at any hour", spec)
+        return True
+    if start == end:
+        return True
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+async def _drain(batch, name: str) -> int:
+    """Run `batch()` (one archive batch) in the executor until a batch comes back short."""
+    loop = asyncio.get_running_loop()
+    total = 0
+    for _ in range(MAX_BATCHES_PER_RUN):
+        moved = await loop.run_in_executor(None, batch)
+        total += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            break
+        await asyncio.sleep(BATCH_PAUSE_SECONDS)
+    if total:
+        metrics.incr(f"alerts.{name}", total)
+        logger.info("[Archiver] %s %d alert(s)", name, total)
+    return total
+
+
+async def expire_alerts_job(context) -> None:
+    """Move pending alerts past their expires_at to the archive."""
+    try:
+        await _drain(lambda: expire_alerts(batch_size=ARCHIVE_BATCH_SIZE), "expired")
+    except Exception as e:
+        logger.exception("[Archiver] Expiry run failed: %s", e)
+
+
+async def archive_alerts_job(context) -> None:
+    """Off-peak only: move alerts triggered more than ARCHIVE_AFTER_HOURS ago to the archive."""
+    if not in_off_peak(datetime.now(timezone.utc).hour):
+        return
+    try:
+        await _drain(
+            lambda: archive_triggered_alerts(ARCHIVE_AFTER_HOURS * 3600, batch_size=ARCHIVE_BATCH_SIZE), "archived"
+        )
+    except Exception as e:
+        logger.exception("[Archiver] Archive run failed: %s", e)
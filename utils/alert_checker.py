@@ -2,12 +2,36 @@
 import asyncio
 import functools
 import logging
-from collections import defaultdict
+import time
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 
+from telegram.error import RetryAfter
+
 from utils.get_data import get_price
-from services.alert_service import get_pending_alerts, mark_alert_triggered
-from services.chart_service import get_chart
+from services.alert_service import (
+    get_pending_alerts_async,
+    get_pending_alert_changes_async,
+    get_change_watermark_async,
+    prune_alert_changes,
+    mark_alerts_triggered_async,
+)
+from services.db_service import close_async_db
+from services.write_batcher import stop_write_batcher
+from services.telegram_file_cache import send_photo_cached
+from services.notification_service import get_dispatcher, stop_dispatcher, PRIORITY_TEXT, PRIORITY_CHART
+from utils.chart_prerender import schedule_prerender, get_chart_prerendered, ChartBatch
+from utils.alert_index import AlertIndex
+from utils.quote_bus import QuoteBus
+from utils.candle_cache import get_ohlc, unix_seconds, export_entries, restore_entries
+from services.shard_service import WORKER_ID, shard_of, renew_leases, release_leases
+from utils.poll_cadence import (
+    atr_is_stale, measure_atr, cached_atr, poll_interval, nearest_distance, export_atrs, restore_atrs,
+)
+from utils.snapshot import (
+    write_snapshot, read_snapshot, pack_alerts, unpack_alerts, pack_symbols, unpack_symbols, pack_candles, unpack_candles,
+)
+from config import PRERENDER_BAND_PCT, ALERT_INDEX_SYNC_SECONDS, SNAPSHOT_DIR, SNAPSHOT_MAX_AGE_SECONDS
 from models.alert import AlertDirection
 from utils.normalize_data import normalize_timeframe
 
@@ -17,6 +41,11 @@ logger = logging.getLogger(__name__)
 DEFAULT_TF = "60"
 # default outputsize used when requesting charts from chart_service
 DEFAULT_OUTPUTSIZE = 150
+# candles scanned for wicks crossing a level between two evaluations
+SPIKE_TIMEFRAME = "1"
+SPIKE_BAR_SECONDS = 60
+# how far back the first scan of a symbol looks (e.g. after a restart)
+SPIKE_LOOKBACK_SECONDS = 3600
 
 
 def _extract_price(price_resp) -> Optional[float]:
@@ -43,6 +72,13 @@ def _extract_price(price_resp) -> Optional[float]:
         return None
 
 
+def _format_candle(value) -> str:
+    try:
+        return datetime.fromisoformat(str(value)).strftime("%Y-%m-%d %H:%M UTC")
+    except ValueError:
+        return str(value)
+
+
 def _format_price_val(val) -> str:
     if val is None:
         return "N/A"
@@ -52,6 +88,30 @@ def _format_price_val(val) -> str:
         return str(val)
 
 
+def _alert_timeframes(raw) -> list:
+    """Split stored comma-separated timeframes into normalized tokens (default when empty)."""
+    tfs = [s.strip() for s in str(raw or DEFAULT_TF).split(",") if s.strip()] or [DEFAULT_TF]
+    normalized = []
+    for tf in tfs:
+        try:
+            normalized.append(normalize_timeframe(tf))
+        except Exception:
+            normalized.append(tf)
+    return normalized
+
+
+def _utc_ts(value) -> Optional[float]:
+    """Unix time of a datetime; naive values (SQLite CURRENT_TIMESTAMP) are UTC."""
+    if value is None:
+        return None
+    try:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    except Exception:
+        return None
+
+
 def _to_plain_alert(alert_obj_or_dict: Any) -> Dict[str, Any]:
     if isinstance(alert_obj_or_dict, dict):
         d = dict(alert_obj_or_dict)
@@ -69,6 +129,7 @@ def _to_plain_alert(alert_obj_or_dict: Any) -> Dict[str, Any]:
         tp = getattr(alert_obj_or_dict, "target_price", None)
         d["target_price"] = float(tp) if tp is not None else None
         d["timeframes"] = getattr(alert_obj_or_dict, "timeframes", None)
+        d["overlays"] = getattr(alert_obj_or_dict, "overlays", None)
         dir_attr = getattr(alert_obj_or_dict, "direction", None)
         try:
             d["direction"] = getattr(dir_attr, "value", str(dir_attr))
@@ -85,196 +146,578 @@ def _to_plain_alert(alert_obj_or_dict: Any) -> Dict[str, Any]:
         d["user_id"] = getattr(alert_obj_or_dict, "user_id", None)
         ta = getattr(alert_obj_or_dict, "triggered_at", None)
         d["triggered_at"] = ta.isoformat() if ta is not None else None
+        d["created_ts"] = _utc_ts(getattr(alert_obj_or_dict, "created_at", None))
     except Exception:
         return {"id": getattr(alert_obj_or_dict, "id", None)}
     return d
 
 
-async def check_alerts_job(context):
+# Pending alerts indexed by symbol and threshold; synced with the DB
+_index = AlertIndex()
+_last_sync = 0.0
+# ids removed from the index whose DB update is still running; never re-indexed meanwhile
+_firing: set = set()
+
+# Quote feed driving event-based evaluation (started by start_alert_feed)
+_bus: Optional[QuoteBus] = None
+_feed_bot = None
+
+
+# Shards (symbol hash buckets) this process evaluates; None = every symbol
+_owned_shards: Optional[set] = None
+
+
+def owns_symbol(symbol) -> bool:
+    return _owned_shards is None or shard_of(symbol or "") in _owned_shards
+
+
+def _sync_index(alerts) -> None:
+    global _last_sync
+    _index.sync(
+        (a for a in alerts if getattr(a, "id", None) not in _firing and owns_symbol(getattr(a, "symbol", None))),
+        to_plain=_to_plain_alert,
+    )
+    _last_sync = time.monotonic()
+
+
+# alert_changes.seq the index is current up to; None = reload everything next time
+_watermark: Optional[int] = None
+_last_prune = 0.0
+# how often the sweep trims the alert change log, and how much of it is kept
+PRUNE_INTERVAL_SECONDS = 3600
+CHANGE_LOG_RETENTION_SECONDS = 86400
+
+
+async def _load_pending(since: Optional[int]):
+    """
+    DB read (async session) for an index refresh: only the alerts changed since
+    the watermark when possible, otherwise the full pending set.
+    Returns (full, alerts, removed_ids, new_watermark).
+    """
+    if since is not None:
+        delta = await get_pending_alert_changes_async(since)
+        if delta is not None:
+            alerts, removed, seq = delta
+            return False, alerts, removed, seq
+    # read the watermark first: changes racing with the full read are replayed next time
     try:
-        alerts = get_pending_alerts()
+        seq = await get_change_watermark_async()
     except Exception as e:
-        logger.exception("Failed to load pending alerts: %s", e)
+        logger.warning("[AlertChecker] Alert change log unavailable; reloading in full: %s", e)
+        seq = None
+    return True, await get_pending_alerts_async(), [], seq
+
+
+def _apply_pending(loaded) -> None:
+    global _watermark, _last_sync
+    full, alerts, removed, seq = loaded
+    if full:
+        _sync_index(alerts)
+    else:
+        keep, drop = [], list(removed)
+        for alert in alerts:
+            if alert.id in _firing:
+                continue
+            if owns_symbol(alert.symbol):
+                keep.append(alert)
+            else:
+                drop.append(alert.id)
+        _index.apply_changes(keep, drop, to_plain=_to_plain_alert)
+        _last_sync = time.monotonic()
+    _watermark = seq
+
+
+async def _refresh_index(loop, full: bool = False) -> None:
+    """Bring the index up to date: a delta from the change log, or a full reload."""
+    _apply_pending(await _load_pending(None if full else _watermark))
+
+
+def _notify_triggered(bot, loop, alert_dict: Dict[str, Any], current_price, price_resp, charts: ChartBatch = None) -> None:
+    """
+    Queue the trigger message and the alert's charts for the alert owner. Delivery
+    (pacing, flood-limit retries, text before charts) is up to the dispatcher.
+    `charts` shares candle fetches and renders between alerts fired together.
+    """
+    # resolve chat id
+    chat_id = alert_dict.get("user_chat_id") or alert_dict.get("user_id")
+    if not chat_id:
+        logger.warning("[AlertChecker] No chat_id for alert %s - cannot notify user", alert_dict.get("id", "?"))
         return
 
-    if not alerts:
-        return
+    bid_val = None
+    ask_val = None
+    last_val = None
+    if isinstance(price_resp, dict):
+        last_val = price_resp.get("price") or price_resp.get("last") or price_resp.get("close") or price_resp.get("last_price")
+        bid_val = price_resp.get("bid")
+        ask_val = price_resp.get("ask")
+
+    # build message
+    dir_val = str(alert_dict.get("direction") or "").upper()
+    if dir_val == getattr(AlertDirection.ABOVE, "value", "ABOVE") or dir_val == "ABOVE":
+        dir_text = "above"
+        cmp_symbol = "≥"
+    elif dir_val == getattr(AlertDirection.BELOW, "value", "BELOW") or dir_val == "BELOW":
+        dir_text = "below"
+        cmp_symbol = "≤"
+    else:
+        dir_text = dir_val.lower() if dir_val else ""
+        cmp_symbol = ""
+
+    current_price_str = _format_price_val(current_price if current_price is not None else last_val)
+    bid_str = _format_price_val(bid_val)
+    ask_str = _format_price_val(ask_val)
+    target_price_str = _format_price_val(alert_dict.get("target_price"))
+
+    msg_text = (
+        f"📢 *Price Alert Triggered!*\n"
+        f"Symbol: `{alert_dict.get('symbol')}`\n"
+        f"Alert: {dir_text} {target_price_str} ({cmp_symbol} {target_price_str})\n"
+        f"Current Price: `{current_price_str}`\n"
+        f"BID: `{bid_str}`  |  ASK: `{ask_str}`\n"
+        + (f"Crossed on 1m candle: `{_format_candle(alert_dict['trigger_candle_at'])}`\n" if alert_dict.get("trigger_candle_at") else "")
+        + f"Alert ID: `{alert_dict.get('id','?')}`"
+    )
+
+    dispatcher = get_dispatcher()
+    dispatcher.submit(
+        chat_id,
+        functools.partial(bot.send_message, chat_id=chat_id, text=msg_text, parse_mode="Markdown"),
+        PRIORITY_TEXT,
+        label=f"alert {alert_dict.get('id', '?')} message",
+    )
+
+    # use stored timeframes or default
+    for tf in _alert_timeframes(alert_dict.get("timeframes")):
+        dispatcher.submit(
+            chat_id,
+            functools.partial(_send_alert_chart, bot, chat_id, alert_dict, tf),
+            PRIORITY_CHART,
+            label=f"alert {alert_dict.get('id', '?')} chart {tf}",
+            prepare=functools.partial(_render_alert_chart, loop, alert_dict, tf, charts),
+        )
+
+
+async def _render_alert_chart(loop, alert_dict: Dict[str, Any], tf: str, charts: ChartBatch = None):
+    """
+    Render (or reuse the pre-rendered or batch-shared) chart for one timeframe:
+    (buf, interval_minutes), or the exception that stopped it.
+    """
+    try:
+        # IMPORTANT: use an integer outputsize (not None). None caused compute_from_date to return None
+        render = charts.render if charts is not None else functools.partial(get_chart_prerendered, loop)
+        return await render(
+            alert_dict.get("symbol"),
+            tf,
+            alert_dict.get("target_price"),
+            DEFAULT_OUTPUTSIZE,
+            alert_dict.get("overlays"),
+        )
+    except Exception as e:
+        return e
+
+
+async def _send_alert_chart(bot, chat_id, alert_dict: Dict[str, Any], tf: str, rendered) -> None:
+    """Send a chart from _render_alert_chart, or tell the user why there is none."""
+    try:
+        if isinstance(rendered, Exception):
+            raise rendered
+        buf, interval_minutes = rendered
 
-    # Group alerts by normalized symbol to fetch price once per symbol
-    alerts_by_symbol = defaultdict(list)
-    for alert in alerts:
         try:
-            sym = (alert.symbol or "").strip().upper()
+            buf.seek(0)
         except Exception:
-            sym = str(getattr(alert, "symbol", "")).strip().upper()
-        alerts_by_symbol[sym].append(alert)
+            pass
 
-    loop = asyncio.get_running_loop()
+        await send_photo_cached(
+            functools.partial(bot.send_photo, chat_id=chat_id),
+            buf,
+            filename=f"{alert_dict.get('symbol')}_{interval_minutes}.png",
+            caption=f"⏱ Timeframe: {interval_minutes}, Symbol: {alert_dict.get('symbol')}"
+        )
+    except RetryAfter:
+        # flood limit: the dispatcher waits and retries this chart
+        raise
+    except Exception as e:
+        # handle chart errors gracefully and inform user
+        logger.exception("[AlertChecker] Failed to generate/send chart for alert %s tf=%s: %s", alert_dict.get("id", "?"), tf, e)
+
+        # Friendly message to user; if it's a TypeError caused by None * int, provide a hint
+        err_msg = str(e)
+        if "NoneType" in err_msg and "*" in err_msg:
+            user_msg = f"⚠️ Could not generate chart for {alert_dict.get('symbol')} timeframe {tf}: chart service returned no data (internal computation failed)."
+            logger.debug("Likely cause: outputsize or compute_from_date returned None. Consider checking chart provider / supported timeframes.")
+        else:
+            user_msg = f"⚠️ Could not generate chart for {alert_dict.get('symbol')} timeframe {tf}: {e}"
+
+        get_dispatcher().submit(
+            chat_id,
+            functools.partial(bot.send_message, chat_id=chat_id, text=user_msg),
+            PRIORITY_CHART,
+            label=f"alert {alert_dict.get('id', '?')} chart {tf} error",
+        )
+
+
+def _collect_fired(loop, symbol: str, price_resp) -> list:
+    """
+    Take every indexed alert for `symbol` crossed by `price_resp` out of the index
+    and return them as (alert, current_price, price_resp, candle_at) tuples. Also
+    pre-renders charts for alerts whose level is close.
+    """
+    current_price = _extract_price(price_resp)
+    if current_price is None:
+        logger.warning("[AlertChecker] Could not parse price for %s; skipping", symbol)
+        return []
+
+    # bisect over the sorted thresholds: exactly the crossed alerts, O(log n + k).
+    # Removing them before the first await means a concurrent quote cannot fire them twice.
+    fired = _index.crossed(symbol, current_price)
+    for alert in fired:
+        _index.remove(alert["id"])
+        _firing.add(alert["id"])
+
+    # close to the level -> render charts now so a trigger can send them instantly
+    band = abs(current_price) * PRERENDER_BAND_PCT
+    for alert in _index.near(symbol, current_price - band, current_price + band):
+        for tf in _alert_timeframes(alert.get("timeframes")):
+            schedule_prerender(loop, symbol, tf, alert["target_price"], DEFAULT_OUTPUTSIZE, alert.get("overlays"))
+
+    # the crossing happened in the 1m candle that is forming now
+    now = time.time()
+    candle_at = datetime.fromtimestamp(now - now % SPIKE_BAR_SECONDS, tz=timezone.utc)
+    return [(alert, current_price, price_resp, candle_at) for alert in fired]
+
+
+# symbol -> start (unix) of the newest 1m candle already scanned; it is re-scanned
+# next time because a forming candle's high/low can still grow
+_scanned_until: Dict[str, int] = {}
+# symbol -> start of the minute it was last scanned in; the next scan waits until
+# that minute's candle has closed (the quote check covers the forming candle)
+_wick_scanned_minute: Dict[str, int] = {}
+
+
+async def _collect_wick_fired(loop, symbol: str, price_resp) -> list:
+    """
+    Scan the 1m candles since the previous evaluation of `symbol` (incrementally,
+    from the candle cache) and fire alerts whose level a candle's high/low touched,
+    even if the price came back before it was polled. Only candles that opened
+    after the alert was created count. At most one scan per symbol and closed
+    candle, however often quotes arrive.
+    """
+    now = int(time.time())
+    minute = now - now % SPIKE_BAR_SECONDS
+    if _wick_scanned_minute.get(symbol, -1) >= minute:
+        return []
+    _wick_scanned_minute[symbol] = minute
+    since = _scanned_until.get(symbol, now - SPIKE_LOOKBACK_SECONDS)
+    try:
+        df = await loop.run_in_executor(None, functools.partial(get_ohlc, symbol, SPIKE_TIMEFRAME, since, None))
+    except Exception as e:
+        logger.info("[AlertChecker] 1m candles unavailable for %s: %s", symbol, e)
+        return []
+    if df is None or len(df) == 0:
+        return []
 
-    for symbol, symbol_alerts in alerts_by_symbol.items():
-        if not symbol:
-            logger.warning("[AlertChecker] Encountered alert with empty symbol; skipping %d alerts", len(symbol_alerts))
-            continue
+    current_price = _extract_price(price_resp)
+    starts = unix_seconds(df["datetime"]).to_numpy()
 
-        # fetch current price once for this symbol
+    fired = []
+    for start, low, high in zip(starts, df["low"].to_numpy(float), df["high"].to_numpy(float)):
+        if start < since:
+            continue
+        for alert in _index.crossed_range(symbol, low, high):
+            created = alert.get("created_ts")
+            # unknown creation time: a wick cannot be attributed safely, leave it to the quote check
+            if created is None or start < created:
+                continue
+            _index.remove(alert["id"])
+            _firing.add(alert["id"])
+            fired.append((alert, current_price, price_resp, datetime.fromtimestamp(int(start), tz=timezone.utc)))
+    _scanned_until[symbol] = int(starts[-1])
+    return fired
+
+
+async def _fire(bot, loop, fired: list) -> int:
+    """Mark all `fired` alerts triggered in one transaction, then notify. Returns the number notified."""
+    if not fired:
+        return 0
+    ids = [alert["id"] for alert, _price, _resp, _candle in fired]
+    candles = {alert["id"]: candle_at for alert, _price, _resp, candle_at in fired}
+    try:
+        payloads = await mark_alerts_triggered_async(ids, candles)
+        updated = {p["id"]: p for p in payloads}
+    except Exception as e:
+        logger.exception("[AlertChecker] Failed to mark alerts %s as triggered: %s", ids, e)
+        # still pending in the DB: notifying now would notify again once they are
+        # re-read, so put them back and let the next evaluation fire them
+        for alert, _price, _resp, candle_at in fired:
+            _index.add(alert)
+            if candle_at is not None:
+                symbol, start = alert["symbol"], int(candle_at.timestamp())
+                _scanned_until[symbol] = min(_scanned_until.get(symbol, start), start)
+                _wick_scanned_minute.pop(symbol, None)
+        return 0
+    finally:
+        _firing.difference_update(ids)
+
+    # one candle fetch per (symbol, timeframe, outputsize) and one render per distinct chart
+    charts = ChartBatch(loop)
+    for alert, current_price, price_resp, _candle in fired:
+        alert_dict = updated.get(alert["id"])
+        if alert_dict is None:
+            # already triggered by another evaluation; it has been notified there
+            continue
         try:
-            price_resp = await loop.run_in_executor(None, functools.partial(get_price, symbol))
+            _notify_triggered(bot, loop, _to_plain_alert(alert_dict), current_price, price_resp, charts=charts)
         except Exception as e:
-            logger.warning("[AlertChecker] Price fetch failed for %s (skipping %d alerts): %s", symbol, len(symbol_alerts), e)
-            continue
+            logger.exception("[AlertChecker] Unexpected error when processing alert %s: %s", alert.get("id", "?"), e)
+    return len(updated)
 
-        current_price = _extract_price(price_resp)
-        if current_price is None:
-            logger.warning("[AlertChecker] Could not parse price for %s; skipping %d alerts", symbol, len(symbol_alerts))
-            continue
 
-        bid_val = None
-        ask_val = None
-        last_val = None
-        if isinstance(price_resp, dict):
-            last_val = price_resp.get("price") or price_resp.get("last") or price_resp.get("close") or price_resp.get("last_price")
-            bid_val = price_resp.get("bid")
-            ask_val = price_resp.get("ask")
+async def _evaluate_symbol(bot, loop, symbol: str, price_resp) -> int:
+    """
+    Fire every indexed alert for `symbol` crossed by `price_resp` or touched by a
+    1m candle wick since the last evaluation. Returns the number fired.
+    """
+    fired = _collect_fired(loop, symbol, price_resp)
+    fired += await _collect_wick_fired(loop, symbol, price_resp)
+    return await _fire(bot, loop, fired)
 
-        for alert in symbol_alerts:
-            try:
-                # read target price robustly
-                try:
-                    target_price = float(getattr(alert, "target_price", None))
-                except Exception:
-                    try:
-                        target_price = float(alert.get("target_price"))
-                    except Exception:
-                        target_price = None
-
-                # direction detection
-                dir_attr = getattr(alert, "direction", None)
-                try:
-                    dstr = getattr(dir_attr, "value", str(dir_attr)).upper()
-                except Exception:
-                    dstr = str(dir_attr).upper() if dir_attr is not None else ""
 
-                is_above = (dstr == getattr(AlertDirection.ABOVE, "value", "ABOVE") or dstr == "ABOVE")
-                is_below = (dstr == getattr(AlertDirection.BELOW, "value", "BELOW") or dstr == "BELOW")
+def _apply_cadence(symbol: str, price: Optional[float]) -> None:
+    """Poll `symbol` as often as its distance to the closest level (in ATRs) requires."""
+    if _bus is None or price is None:
+        return
+    _bus.set_interval(symbol, poll_interval(nearest_distance(_index, symbol, price), cached_atr(symbol)))
 
-                if not (is_above or is_below) and target_price is not None:
-                    is_above = target_price > current_price
-                    is_below = target_price < current_price
 
-                if target_price is None:
-                    logger.warning("[AlertChecker] Alert %s has invalid target_price; skipping", getattr(alert, "id", "?"))
-                    continue
+def _refresh_cadences() -> None:
+    """Re-plan every watched symbol from its last quote, e.g. after alerts were added."""
+    if _bus is None:
+        return
+    for symbol in _bus.watched():
+        last = _bus.last(symbol)
+        if last is not None:
+            _apply_cadence(symbol, _extract_price(last[0]))
 
-                triggered_now = False
-                if is_above and current_price >= float(target_price):
-                    triggered_now = True
-                elif is_below and current_price <= float(target_price):
-                    triggered_now = True
 
-                if not triggered_now:
-                    continue
+async def on_quote(symbol: str, quote: dict) -> None:
+    """QuoteBus subscriber: evaluate the symbol's alerts against the new quote."""
+    if _feed_bot is None or not owns_symbol(symbol):
+        return
+    loop = asyncio.get_running_loop()
+    if time.monotonic() - _last_sync >= ALERT_INDEX_SYNC_SECONDS:
+        try:
+            await _refresh_index(loop)
+            _bus.watch(_index.symbols())
+            _refresh_cadences()
+        except Exception as e:
+            logger.warning("[AlertChecker] Index refresh failed: %s", e)
+    await _evaluate_symbol(_feed_bot, loop, symbol, quote)
+
+    if atr_is_stale(symbol):
+        await loop.run_in_executor(None, measure_atr, symbol)
+    _apply_cadence(symbol, _extract_price(quote))
+
+
+def _capture_state() -> tuple:
+    """In-memory evaluator state for a snapshot; call on the event loop."""
+    quotes = _bus.quotes() if _bus is not None else {}
+    shards = sorted(_owned_shards) if _owned_shards is not None else None
+    return _index.alerts(), quotes, export_atrs(), dict(_scanned_until), _watermark, shards
+
+
+def _write_state(state: tuple) -> None:
+    """Blocking: write `state` plus the candle cache windows as a snapshot."""
+    alerts, quotes, atrs, scanned, watermark, shards = state
+    candles, segments = pack_candles(export_entries())
+    write_snapshot(
+        SNAPSHOT_DIR,
+        {"alerts": pack_alerts(alerts), "symbols": pack_symbols(quotes, atrs, scanned), "candles": candles},
+        {"watermark": watermark, "shards": shards, "segments": segments},
+    )
+
+
+def _read_state() -> Optional[dict]:
+    """
+    Blocking: load the latest snapshot and seed the candle cache from it. Quotes
+    and candles older than SNAPSHOT_MAX_AGE_SECONDS are dropped; the alert index
+    is kept at any age since the change log brings it up to date.
+    """
+    snap = read_snapshot(SNAPSHOT_DIR)
+    if snap is None:
+        return None
+    manifest, arrays = snap
+    fresh = time.time() - manifest.get("written_at", 0) <= SNAPSHOT_MAX_AGE_SECONDS
+    quotes, atrs, scanned = unpack_symbols(arrays["symbols"]) if fresh else ({}, {}, {})
+    candles = restore_entries(unpack_candles(arrays["candles"], manifest.get("segments", []))) if fresh else 0
+    return {
+        "manifest": manifest, "alerts": unpack_alerts(arrays["alerts"]),
+        "quotes": quotes, "atrs": atrs, "scanned": scanned, "candles": candles,
+    }
+
+
+def _restore_state(state: dict) -> bool:
+    """
+    Seed the quote board, cadence state and alert index from a snapshot. Returns
+    True when the index was restored (only if the snapshot covered every shard
+    this worker owns), so a delta refresh is enough.
+    """
+    global _watermark
+    restore_atrs(state["atrs"])
+    floor = int(time.time()) - SPIKE_LOOKBACK_SECONDS
+    for symbol, start in state["scanned"].items():
+        _scanned_until.setdefault(symbol, max(start, floor))
+    if _bus is not None:
+        for symbol, (quote, received_at) in state["quotes"].items():
+            _bus.seed(symbol, quote, received_at)
+
+    manifest = state["manifest"]
+    shards = manifest.get("shards")
+    if manifest.get("watermark") is None:
+        return False
+    if shards is not None and (_owned_shards is None or not _owned_shards <= set(shards)):
+        return False
+    _index.clear()
+    for alert in state["alerts"]:
+        if alert["id"] not in _firing and owns_symbol(alert["symbol"]):
+            _index.add(alert)
+    _watermark = manifest["watermark"]
+    return True
+
+
+async def start_alert_feed(application) -> None:
+    """
+    Lease this process's shards, warm-start from the latest snapshot, start the
+    quote feeds and evaluate alerts on every new quote.
+    """
+    global _bus, _feed_bot, _owned_shards
+    _feed_bot = application.bot
+    if _bus is None:
+        _bus = QuoteBus()
+        _bus.subscribe(on_quote)
+    try:
+        _owned_shards = renew_leases()
+    except Exception as e:
+        # evaluate nothing until a lease renewal succeeds rather than risk duplicates
+        _owned_shards = set()
+        logger.exception("[AlertChecker] Failed to lease shards: %s", e)
 
-                # mark alert triggered in DB
-                try:
-                    updated_alert_raw = await loop.run_in_executor(None, functools.partial(mark_alert_triggered, alert.id))
-                    updated_alert = updated_alert_raw if updated_alert_raw else alert
-                except Exception as e:
-                    logger.exception("[AlertChecker] Failed to mark alert %s as triggered: %s", getattr(alert, "id", "?"), e)
-                    updated_alert = alert
-
-                alert_dict = _to_plain_alert(updated_alert)
-
-                # resolve chat id
-                chat_id = alert_dict.get("user_chat_id") or alert_dict.get("user_id")
-                if not chat_id:
-                    logger.warning("[AlertChecker] No chat_id for alert %s - cannot notify user", alert_dict.get("id", "?"))
-                    continue
+    loop = asyncio.get_running_loop()
+    warm = False
+    try:
+        state = await loop.run_in_executor(None, _read_state)
+        if state is not None:
+            warm = _restore_state(state)
+            logger.info(
+                "[AlertChecker] Snapshot restored: %d quotes, %d candle windows, index %s",
+                len(state["quotes"]), state["candles"], "reused" if warm else "reloaded",
+            )
+    except Exception as e:
+        logger.warning("[AlertChecker] Snapshot not restored: %s", e)
+    try:
+        await _refresh_index(loop, full=not warm)
+    except Exception as e:
+        logger.exception("Failed to load pending alerts: %s", e)
+    _bus.watch(_index.symbols())
+    # restored quotes and ATRs set each feed's cadence before its first poll
+    _refresh_cadences()
+    logger.info(
+        "[AlertChecker] Worker %s owns shards %s; quote feed started for %d symbols",
+        WORKER_ID, sorted(_owned_shards), len(_bus.watched()),
+    )
+
+
+async def save_state_job(context) -> None:
+    """Snapshot the evaluator state so a restarted process starts warm."""
+    if _feed_bot is None:
+        return
+    state = _capture_state()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, _write_state, state)
+    except Exception as e:
+        logger.warning("[AlertChecker] Failed to write state snapshot: %s", e)
 
-                # build message
-                dir_val = str(alert_dict.get("direction") or "").upper()
-                if dir_val == getattr(AlertDirection.ABOVE, "value", "ABOVE") or dir_val == "ABOVE":
-                    dir_text = "above"
-                    cmp_symbol = "≥"
-                elif dir_val == getattr(AlertDirection.BELOW, "value", "BELOW") or dir_val == "BELOW":
-                    dir_text = "below"
-                    cmp_symbol = "≤"
-                else:
-                    dir_text = dir_val.lower() if dir_val else ""
-                    cmp_symbol = ""
-
-                current_price_str = _format_price_val(current_price if current_price is not None else last_val)
-                bid_str = _format_price_val(bid_val)
-                ask_str = _format_price_val(ask_val)
-                target_price_str = _format_price_val(alert_dict.get("target_price"))
-
-                msg_text = (
-                    f"📢 *Price Alert Triggered!*\n"
-                    f"Symbol: `{alert_dict.get('symbol')}`\n"
-                    f"Alert: {dir_text} {target_price_str} ({cmp_symbol} {target_price_str})\n"
-                    f"Current Price: `{current_price_str}`\n"
-                    f"BID: `{bid_str}`  |  ASK: `{ask_str}`\n"
-                    f"Alert ID: `{alert_dict.get('id','?')}`"
-                )
 
-                try:
-                    await context.bot.send_message(chat_id=chat_id, text=msg_text, parse_mode="Markdown")
-                except Exception as e:
-                    logger.exception("[AlertChecker] Failed to send trigger message for alert %s to %s: %s", alert_dict.get("id", "?"), chat_id, e)
-
-                # use stored timeframes or default
-                tfs_raw = alert_dict.get("timeframes") or DEFAULT_TF
-                tfs = [s.strip() for s in str(tfs_raw).split(",") if s.strip()]
-                if not tfs:
-                    tfs = [DEFAULT_TF]
-
-                # generate/send charts using chart_service.get_chart
-                for tf in tfs:
-                    try:
-                        try:
-                            tf_for_chart = normalize_timeframe(tf)
-                        except Exception:
-                            tf_for_chart = tf
-
-                        # IMPORTANT: use an integer outputsize (not None). None caused compute_from_date to return None
-                        call_plot = functools.partial(
-                            get_chart,
-                            symbol=alert_dict.get("symbol"),
-                            timeframe=tf_for_chart,
-                            alert_price=alert_dict.get("target_price"),
-                            from_date=None,
-                            to_date=None,
-                            outputsize=DEFAULT_OUTPUTSIZE,
-                        )
-
-                        buf, interval_minutes = await loop.run_in_executor(None, call_plot)
-
-                        try:
-                            buf.seek(0)
-                        except Exception:
-                            pass
-
-                        await context.bot.send_photo(
-                            chat_id=chat_id,
-                            photo=buf,
-                            filename=f"{alert_dict.get('symbol')}_{interval_minutes}.png",
-                            caption=f"⏱ Timeframe: {interval_minutes}, Symbol: {alert_dict.get('symbol')}"
-                        )
-                    except Exception as e:
-                        # handle chart errors gracefully and inform user
-                        logger.exception("[AlertChecker] Failed to generate/send chart for alert %s tf=%s: %s", alert_dict.get("id", "?"), tf, e)
-
-                        # Friendly message to user; if it's a TypeError caused by None * int, provide a hint
-                        err_msg = str(e)
-                        if "NoneType" in err_msg and "*" in err_msg:
-                            user_msg = f"⚠️ Could not generate chart for {alert_dict.get('symbol')} timeframe {tf}: chart service returned no data (internal computation failed)."
-                            logger.debug("Likely cause: outputsize or compute_from_date returned None. Consider checking chart provider / supported timeframes.")
-                        else:
-                            user_msg = f"⚠️ Could not generate chart for {alert_dict.get('symbol')} timeframe {tf}: {e}"
-
-                        try:
-                            await context.bot.send_message(chat_id=chat_id, text=user_msg)
-                        except Exception:
-                            logger.exception("[AlertChecker] Also failed to notify user about chart generation error for alert %s", alert_dict.get("id", "?"))
+async def renew_shards_job(context) -> None:
+    """Renew shard leases; on a rebalance, reload the index and feeds for the new shard set."""
+    global _owned_shards
+    if _feed_bot is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        owned = await loop.run_in_executor(None, renew_leases)
+    except Exception as e:
+        logger.warning("[AlertChecker] Shard lease renewal failed: %s", e)
+        return
+    if owned == _owned_shards:
+        return
 
+    logger.info("[AlertChecker] Worker %s shards changed: %s -> %s", WORKER_ID, sorted(_owned_shards or ()), sorted(owned))
+    _owned_shards = owned
+    try:
+        await _refresh_index(loop, full=True)
+    except Exception as e:
+        logger.exception("Failed to load pending alerts: %s", e)
+    _bus.watch(_index.symbols())
+    _refresh_cadences()
+
+
+async def stop_alert_feed(application=None) -> None:
+    global _feed_bot, _owned_shards
+    await save_state_job(None)
+    _feed_bot = None
+    if _bus is not None:
+        await _bus.stop()
+    await stop_dispatcher()
+    if _owned_shards is not None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, release_leases)
+        except Exception as e:
+            logger.warning("[AlertChecker] Failed to release shard leases: %s", e)
+        _owned_shards = None
+    await stop_write_batcher()
+    await close_async_db()
+
+
+async def check_alerts_job(context):
+    """
+    Safety-net sweep: apply pending-alert changes, keep the quote feeds in line
+    with the symbols that have alerts, and evaluate everything against a fresh price.
+    """
+    global _last_prune
+    loop = asyncio.get_running_loop()
+    try:
+        await _refresh_index(loop)
+    except Exception as e:
+        logger.exception("Failed to load pending alerts: %s", e)
+        return
+
+    if _watermark is not None and time.monotonic() - _last_prune >= PRUNE_INTERVAL_SECONDS:
+        _last_prune = time.monotonic()
+        try:
+            await loop.run_in_executor(None, prune_alert_changes, CHANGE_LOG_RETENTION_SECONDS)
+        except Exception as e:
+            logger.warning("[AlertChecker] Failed to prune alert change log: %s", e)
+
+    if _bus is not None and _feed_bot is not None:
+        _bus.watch(_index.symbols())
+        _refresh_cadences()
+    if not len(_index):
+        return
+
+    # every alert fired in this sweep is marked in a single transaction
+    fired = []
+    for symbol in _index.symbols():
+        # the feed's quote when it is recent, otherwise fetch the price once for this symbol
+        price_resp = _bus.fresh(symbol) if _bus is not None else None
+        if price_resp is None:
+            try:
+                price_resp = await loop.run_in_executor(None, functools.partial(get_price, symbol))
             except Exception as e:
-                logger.exception("[AlertChecker] Unexpected error when processing alert %s: %s", getattr(alert, "id", "?"), e)
+                logger.warning("[AlertChecker] Price fetch failed for %s: %s", symbol, e)
+                continue
+        fired += _collect_fired(loop, symbol, price_resp)
+        fired += await _collect_wick_fired(loop, symbol, price_resp)
+
+    await _fire(context.bot, loop, fired)
@@ -0,0 +1,185 @@
+# utils/alert_index.py
+"""
+In-memory index of pending price alerts.
+
+Per symbol, ABOVE and BELOW thresholds are kept in sorted lists of
+(target_price, alert_id). For a given price a bisect finds exactly the crossed
+alerts, so evaluation is O(log n + k) per symbol regardless of how many alerts
+are pending.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ABOVE = "above"
+BELOW = "below"
+
+_INF = float("inf")
+
+
+def normalize_direction(value) -> Optional[str]:
+    """'above' / 'below' from an AlertDirection, its value or name; None if unknown."""
+    raw = getattr(value, "value", value)
+    if raw is None:
+        return None
+    raw = str(raw).strip().lower()
+    if raw.endswith("above"):
+        return ABOVE
+    if raw.endswith("below"):
+        return BELOW
+    return None
+
+
+def _field(alert, name):
+    return alert.get(name) if isinstance(alert, dict) else getattr(alert, name, None)
+
+
+def _same_level(entry: dict, alert) -> bool:
+    try:
+        price = float(_field(alert, "target_price"))
+    except (TypeError, ValueError):
+        return False
+    return (
+        price == entry["target_price"]
+        and normalize_direction(_field(alert, "direction")) == entry["direction"]
+        and (_field(alert, "symbol") or "").strip().upper() == entry["symbol"]
+    )
+
+
+class AlertIndex:
+    """Sorted ABOVE / BELOW thresholds per symbol, holding plain alert dicts by id."""
+
+    def __init__(self):
+        self._above: Dict[str, list] = {}
+        self._below: Dict[str, list] = {}
+        self._alerts: Dict[int, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def __contains__(self, alert_id) -> bool:
+        return alert_id in self._alerts
+
+    def ids(self) -> set:
+        return set(self._alerts)
+
+    def alerts(self) -> List[dict]:
+        """Copies of every indexed alert dict."""
+        return [dict(entry) for entry in self._alerts.values()]
+
+    def get(self, alert_id) -> Optional[dict]:
+        return self._alerts.get(alert_id)
+
+    def symbols(self) -> List[str]:
+        return sorted(set(self._above) | set(self._below))
+
+    def _side(self, direction: str) -> Dict[str, list]:
+        return self._above if direction == ABOVE else self._below
+
+    def add(self, alert: dict) -> bool:
+        """
+        Index a plain alert dict (needs id, symbol, target_price, direction).
+        Returns False when the alert cannot be indexed.
+        """
+        alert_id = alert.get("id")
+        symbol = (alert.get("symbol") or "").strip().upper()
+        direction = normalize_direction(alert.get("direction"))
+        try:
+            price = float(alert.get("target_price"))
+        except (TypeError, ValueError):
+            return False
+        if alert_id is None or not symbol or direction is None:
+            return False
+
+        if alert_id in self._alerts:
+            self.remove(alert_id)
+        entry = dict(alert, symbol=symbol, direction=direction, target_price=price)
+        self._alerts[alert_id] = entry
+        insort(self._side(direction).setdefault(symbol, []), (price, alert_id))
+        return True
+
+    def remove(self, alert_id) -> Optional[dict]:
+        entry = self._alerts.pop(alert_id, None)
+        if entry is None:
+            return None
+        side = self._side(entry["direction"])
+        levels = side.get(entry["symbol"], [])
+        pos = bisect_left(levels, (entry["target_price"], alert_id))
+        if pos < len(levels) and levels[pos] == (entry["target_price"], alert_id):
+            del levels[pos]
+        if not levels:
+            side.pop(entry["symbol"], None)
+        return entry
+
+    def crossed(self, symbol: str, price: float) -> List[dict]:
+        """Alerts whose level `price` has reached: ABOVE with target <= price, BELOW with target >= price."""
+        symbol = symbol.strip().upper()
+        above = self._above.get(symbol, [])
+        below = self._below.get(symbol, [])
+        hits = above[:bisect_right(above, (price, _INF))]
+        hits += below[bisect_left(below, (price, -_INF)):]
+        return [self._alerts[alert_id] for _price, alert_id in hits]
+
+    def crossed_range(self, symbol: str, low: float, high: float) -> List[dict]:
+        """Alerts a bar spanning [low, high] touched: ABOVE with target <= high, BELOW with target >= low."""
+        symbol = symbol.strip().upper()
+        above = self._above.get(symbol, [])
+        below = self._below.get(symbol, [])
+        hits = above[:bisect_right(above, (high, _INF))]
+        hits += below[bisect_left(below, (low, -_INF)):]
+        return [self._alerts[alert_id] for _price, alert_id in hits]
+
+    def nearest_levels(self, symbol: str, price: float) -> Tuple[Optional[float], Optional[float]]:
+        """
+        (closest ABOVE target still above `price`, closest BELOW target still below it);
+        None for a side without pending alerts there.
+        """
+        symbol = symbol.strip().upper()
+        above = self._above.get(symbol, [])
+        below = self._below.get(symbol, [])
+        i = bisect_right(above, (price, _INF))
+        j = bisect_left(below, (price, -_INF))
+        return (above[i][0] if i < len(above) else None, below[j - 1][0] if j > 0 else None)
+
+    def near(self, symbol: str, low: float, high: float) -> List[dict]:
+        """Alerts (either side) whose target lies within [low, high]."""
+        symbol = symbol.strip().upper()
+        out = []
+        for levels in (self._above.get(symbol, []), self._below.get(symbol, [])):
+            lo = bisect_left(levels, (low, -_INF))
+            hi = bisect_right(levels, (high, _INF))
+            out.extend(self._alerts[alert_id] for _price, alert_id in levels[lo:hi])
+        return out
+
+    def sync(self, alerts: Iterable, to_plain=None) -> None:
+        """
+        Make the index hold exactly `alerts` (ORM objects or dicts). Known ids whose
+        symbol / level / direction are unchanged are kept as-is; only new or edited
+        alerts are converted with `to_plain` and (re)inserted.
+        """
+        incoming = {}
+        for alert in alerts:
+            alert_id = _field(alert, "id")
+            if alert_id is not None:
+                incoming[alert_id] = alert
+        for alert_id in self.ids() - incoming.keys():
+            self.remove(alert_id)
+        for alert_id, alert in incoming.items():
+            entry = self._alerts.get(alert_id)
+            if entry is not None and _same_level(entry, alert):
+                continue
+            self.add(to_plain(alert) if to_plain else alert)
+
+    def apply_changes(self, upserts: Iterable, removed_ids: Iterable, to_plain=None) -> None:
+        """Apply a delta: (re)index changed pending alerts and drop the removed ids."""
+        for alert_id in removed_ids:
+            self.remove(alert_id)
+        for alert in upserts:
+            alert_id = _field(alert, "id")
+            if alert_id is not None:
+                self.remove(alert_id)
+                self.add(to_plain(alert) if to_plain else alert)
+
+    def clear(self) -> None:
+        self._above.clear()
+        self._below.clear()
+        self._alerts.clear()
@@ -0,0 +1,167 @@
+# utils/candle_cache.py
+"""
+Shared in-memory OHLC cache in front of utils.get_data.get_ohlc.
+
+Candles are kept per (symbol, timeframe). Requests that end "now" are served
+from memory and only the tail since the last cached bar is re-fetched (at most
+every CANDLE_REFRESH_SECONDS). Historical ranges are served from memory when
+already covered, otherwise passed through to the provider.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+
+from utils.get_data import get_ohlc as fetch_ohlc
+from utils.compute_fromdate import TIMEFRAME_TO_MINUTES
+from utils.normalize_data import normalize_symbol, normalize_timeframe, to_unix_timestamp
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# live requests within this many seconds of the last fetch are served from memory
+CANDLE_REFRESH_SECONDS = 5
+# candles kept per (symbol, timeframe)
+MAX_CACHED_CANDLES = 5000
+
+# (symbol, timeframe) -> {"df": DataFrame, "from_ts": int, "fetched_at": float}
+_entries: dict = {}
+_locks: dict = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def _to_frame(raw) -> Optional[pd.DataFrame]:
+    """Coerce provider output into a sorted DataFrame with a UTC 'datetime' column."""
+    if raw is None:
+        return None
+    df = raw.copy() if isinstance(raw, pd.DataFrame) else pd.DataFrame(raw)
+    if df.empty:
+        return None
+    if "datetime" not in df.columns:
+        if not isinstance(df.index, pd.DatetimeIndex):
+            return None
+        df = df.rename_axis("datetime").reset_index()
+    df["datetime"] = pd.to_datetime(df["datetime"], utc=True, errors="coerce")
+    df = df.dropna(subset=["datetime"]).drop_duplicates("datetime", keep="last")
+    return df.sort_values("datetime").reset_index(drop=True)
+
+
+def _merge(old: Optional[pd.DataFrame], new: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    if old is None or old.empty:
+        return new
+    if new is None or new.empty:
+        return old
+    merged = pd.concat([old, new]).drop_duplicates("datetime", keep="last")
+    merged = merged.sort_values("datetime").reset_index(drop=True)
+    if len(merged) > MAX_CACHED_CANDLES:
+        merged = merged.iloc[-MAX_CACHED_CANDLES:].reset_index(drop=True)
+    return merged
+
+
+def _covered_from(df: pd.DataFrame, from_ts: int) -> int:
+    """Start of the range the cached frame is known to cover (moves forward once trimmed)."""
+    if len(df) >= MAX_CACHED_CANDLES:
+        return max(from_ts, int(df["datetime"].iloc[0].timestamp()))
+    return from_ts
+
+
+def unix_seconds(datetimes: pd.Series) -> pd.Series:
+    """Integer Unix seconds of a UTC datetime column (independent of its resolution)."""
+    return (datetimes - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+
+
+def _slice(df: pd.DataFrame, from_ts: int, to_ts: int) -> pd.DataFrame:
+    ts = unix_seconds(df["datetime"])
+    return df[(ts >= from_ts) & (ts <= to_ts)].reset_index(drop=True)
+
+
+def get_ohlc(symbol: str, timeframe=15, from_date=None, to_date=None) -> Optional[pd.DataFrame]:
+    """Drop-in replacement for utils.get_data.get_ohlc backed by the shared cache."""
+    sym = normalize_symbol(symbol)
+    tf = normalize_timeframe(timeframe)
+    from_ts = to_unix_timestamp(from_date)
+    now = time.time()
+    to_ts = to_unix_timestamp(to_date) if to_date is not None else int(now)
+
+    if from_ts is None:
+        # open-ended request: nothing to anchor the cache on
+        return fetch_ohlc(symbol, tf, from_date, to_date)
+
+    bar_seconds = TIMEFRAME_TO_MINUTES.get(tf, 15) * 60
+    live = to_ts >= now - bar_seconds
+    key = (sym, tf)
+
+    with _lock_for(key):
+        entry = _entries.get(key)
+        covered = entry is not None and entry["from_ts"] <= from_ts
+
+        if not live:
+            if covered and entry["df"]["datetime"].iloc[-1].timestamp() >= to_ts:
+                metrics.incr("candles.cache_hit")
+                return _slice(entry["df"], from_ts, to_ts)
+            metrics.incr("candles.passthrough")
+            return fetch_ohlc(symbol, tf, from_ts, to_ts)
+
+        if covered:
+            if now - entry["fetched_at"] >= CANDLE_REFRESH_SECONDS:
+                last_ts = int(entry["df"]["datetime"].iloc[-1].timestamp())
+                tail = _to_frame(fetch_ohlc(symbol, tf, last_ts, to_ts))
+                entry["df"] = _merge(entry["df"], tail)
+                entry["from_ts"] = _covered_from(entry["df"], entry["from_ts"])
+                entry["fetched_at"] = now
+                metrics.incr("candles.tail_fetch")
+            else:
+                metrics.incr("candles.cache_hit")
+            return _slice(entry["df"], from_ts, to_ts)
+
+        fresh = _to_frame(fetch_ohlc(symbol, tf, from_ts, to_ts))
+        metrics.incr("candles.full_fetch")
+        if fresh is None:
+            return None
+        merged = _merge(entry["df"] if entry else None, fresh)
+        _entries[key] = {"df": merged, "from_ts": _covered_from(merged, from_ts), "fetched_at": now}
+        return _slice(merged, from_ts, to_ts)
+
+
+def export_entries() -> dict:
+    """Copy of every cached window ((symbol, timeframe) -> entry), e.g. for a snapshot."""
+    with _locks_guard:
+        keys = list(_entries)
+    out = {}
+    for key in keys:
+        with _lock_for(key):
+            entry = _entries.get(key)
+            if entry is not None:
+                out[key] = dict(entry)
+    return out
+
+
+def restore_entries(entries: dict) -> int:
+    """
+    Seed the cache with windows from a snapshot; keys already cached are kept.
+    Their old fetched_at makes the next live request fetch only the tail.
+    Returns the number of windows restored.
+    """
+    restored = 0
+    for key, entry in entries.items():
+        with _lock_for(key):
+            if key in _entries or entry.get("df") is None or len(entry["df"]) == 0:
+                continue
+            _entries[key] = dict(entry)
+            restored += 1
+    return restored
+
+
+def clear() -> None:
+    with _locks_guard:
+        _entries.clear()
@@ -0,0 +1,200 @@
+# utils/chart_prerender.py
+import asyncio
+import functools
+import logging
+import time
+from io import BytesIO
+from typing import Optional, Tuple
+
+from config import PRERENDER_BAND_PCT
+from services.chart_service import get_chart
+from utils.candle_cache import get_ohlc
+from utils.compute_fromdate import TIMEFRAME_TO_MINUTES, compute_from_date
+from utils.normalize_data import normalize_timeframe
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on cached pre-rendered images; oldest entries are evicted first
+MAX_PRERENDERED = 256
+
+# key -> {"png": bytes, "period": str, "candle_start": int}
+_prerendered: dict = {}
+# key -> (candle_start, asyncio.Future) for renders currently running in the executor
+_inflight: dict = {}
+
+
+def _key(symbol: str, timeframe: str, alert_price, outputsize: int, overlays=None) -> tuple:
+    price = round(float(alert_price), 10) if alert_price is not None else None
+    return (str(symbol).upper(), str(timeframe), price, int(outputsize), (overlays or "").lower())
+
+
+def candle_start(timeframe: str, now: float = None) -> int:
+    """Unix start of the candle that `now` falls into for `timeframe`."""
+    if now is None:
+        now = time.time()
+    seconds = TIMEFRAME_TO_MINUTES.get(str(timeframe), 15) * 60
+    return int(now) - int(now) % seconds
+
+
+def within_band(current_price: float, target_price: float, band_pct: float = None) -> bool:
+    """True when current price is within `band_pct` (fraction) of the target."""
+    if band_pct is None:
+        band_pct = PRERENDER_BAND_PCT
+    if current_price is None or target_price is None or band_pct <= 0:
+        return False
+    try:
+        return abs(float(current_price) - float(target_price)) <= abs(float(target_price)) * band_pct
+    except (TypeError, ValueError):
+        return False
+
+
+def _store(key: tuple, start: int, buf: BytesIO, period) -> None:
+    _prerendered[key] = {"png": buf.getvalue(), "period": period, "candle_start": start}
+    while len(_prerendered) > MAX_PRERENDERED:
+        _prerendered.pop(next(iter(_prerendered)))
+
+
+def get_prerendered(symbol, timeframe, alert_price, outputsize, overlays=None) -> Optional[Tuple[BytesIO, str]]:
+    """
+    Return (BytesIO, period) for a ready image whose last candle is still the
+    current one, or None when missing or stale.
+    """
+    key = _key(symbol, timeframe, alert_price, outputsize, overlays)
+    entry = _prerendered.get(key)
+    if not entry or entry["candle_start"] != candle_start(timeframe):
+        return None
+    return BytesIO(entry["png"]), entry["period"]
+
+
+def schedule_prerender(loop, symbol, timeframe, alert_price, outputsize, overlays=None) -> None:
+    """
+    Render the chart in the background unless a fresh image exists or a render
+    for the current candle is already running. Never blocks the caller.
+    """
+    key = _key(symbol, timeframe, alert_price, outputsize, overlays)
+    start = candle_start(timeframe)
+
+    entry = _prerendered.get(key)
+    if entry and entry["candle_start"] == start:
+        return
+    running = _inflight.get(key)
+    if running and running[0] == start and not running[1].done():
+        return
+
+    call_plot = functools.partial(
+        get_chart,
+        symbol=symbol,
+        timeframe=timeframe,
+        alert_price=alert_price,
+        from_date=None,
+        to_date=None,
+        outputsize=outputsize,
+        overlays=overlays,
+    )
+    future = loop.run_in_executor(None, call_plot)
+    _inflight[key] = (start, future)
+
+    def _done(fut):
+        if _inflight.get(key, (None, None))[1] is fut:
+            _inflight.pop(key, None)
+        try:
+            buf, period = fut.result()
+        except Exception as e:
+            logger.info("[Prerender] Background render failed for %s tf=%s: %s", symbol, timeframe, e)
+            return
+        _store(key, start, buf, period)
+        logger.debug("[Prerender] Ready %s tf=%s price=%s", symbol, timeframe, alert_price)
+
+    future.add_done_callback(_done)
+
+
+async def get_chart_prerendered(loop, symbol, timeframe, alert_price, outputsize, overlays=None, ohlc=None) -> Tuple[BytesIO, str]:
+    """
+    Trigger-path chart fetch: use the pre-rendered image when its candle is still
+    current, await a render already in flight for this candle, otherwise render now
+    (from `ohlc` when the caller already fetched the candles). A render started here
+    is registered as in flight too, so concurrent requests for the same chart share it.
+    """
+    ready = get_prerendered(symbol, timeframe, alert_price, outputsize, overlays)
+    if ready is not None:
+        return ready
+
+    key = _key(symbol, timeframe, alert_price, outputsize, overlays)
+    start = candle_start(timeframe)
+    running = _inflight.get(key)
+    if running and running[0] == start:
+        try:
+            buf, period = await asyncio.shield(running[1])
+            return BytesIO(buf.getvalue()), period
+        except Exception:
+            logger.debug("[Prerender] In-flight render failed for %s tf=%s; rendering again", symbol, timeframe)
+
+    call_plot = functools.partial(
+        get_chart,
+        symbol=symbol,
+        timeframe=timeframe,
+        alert_price=alert_price,
+        from_date=None,
+        to_date=None,
+        outputsize=outputsize,
+        overlays=overlays,
+        **({"ohlc": ohlc} if ohlc is not None else {}),
+    )
+    future = loop.run_in_executor(None, call_plot)
+    _inflight[key] = (start, future)
+    try:
+        buf, period = await asyncio.shield(future)
+    finally:
+        if _inflight.get(key, (None, None))[1] is future:
+            _inflight.pop(key, None)
+    _store(key, start, buf, period)
+    return BytesIO(buf.getvalue()), period
+
+
+class ChartBatch:
+    """
+    Charts for alerts fired in the same cycle. Candles are fetched once per
+    (symbol, timeframe, outputsize) and renders with the same target price and
+    overlays are shared, so a burst on a popular level costs one fetch and one
+    render per distinct chart instead of one per alert. Work starts lazily, on
+    the first chart of a group that is actually sent.
+    """
+
+    def __init__(self, loop, fetch=get_ohlc):
+        self.loop = loop
+        self._fetch = fetch
+        # (symbol, timeframe, outputsize) -> future of the candle DataFrame
+        self._ohlc: dict = {}
+        # chart key -> task of (BytesIO, period)
+        self._renders: dict = {}
+
+    def _candles(self, symbol: str, timeframe: str, outputsize: int):
+        key = (str(symbol).upper(), normalize_timeframe(timeframe), int(outputsize))
+        future = self._ohlc.get(key)
+        if future is None:
+            to_date = int(time.time())
+            from_date = compute_from_date(key[1], key[2], to_date)
+            future = self.loop.run_in_executor(None, functools.partial(self._fetch, key[0], key[1], from_date, to_date))
+            self._ohlc[key] = future
+            metrics.incr("chart.batch_fetches")
+        return future
+
+    async def _render(self, symbol, timeframe, alert_price, outputsize, overlays):
+        ready = get_prerendered(symbol, timeframe, alert_price, outputsize, overlays)
+        if ready is not None:
+            return ready
+        ohlc = await asyncio.shield(self._candles(symbol, timeframe, outputsize))
+        return await get_chart_prerendered(self.loop, symbol, timeframe, alert_price, outputsize, overlays, ohlc=ohlc)
+
+    async def render(self, symbol, timeframe, alert_price, outputsize, overlays=None) -> Tuple[BytesIO, str]:
+        """(BytesIO, period) for one alert chart; equal charts in the batch are rendered once."""
+        key = _key(symbol, timeframe, alert_price, outputsize, overlays)
+        task = self._renders.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._render(symbol, timeframe, alert_price, outputsize, overlays))
+            self._renders[key] = task
+        else:
+            metrics.incr("chart.batch_shared")
+        buf, period = await asyncio.shield(task)
+        return BytesIO(buf.getvalue()), period
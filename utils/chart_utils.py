@@ -8,35 +8,187 @@ import numpy as np
 import pandas as pd
 import mplfinance as mpf
 import matplotlib.pyplot as plt
-from utils.get_data import get_ohlc
+from utils.candle_cache import get_ohlc
 from utils.normalize_data import normalize_timeframe, to_unix_timestamp
+from utils.indicators import IndicatorEngine, get_engine
+from utils import metrics
 import time
 
+# Rendered PNGs are ~1250 px wide (figratio 16:9, dpi=150), leaving roughly 1100 px
+# for the candle area. Below ~2 px per candle bodies merge into noise, so anything
+# above MAX_CHART_CANDLES is aggregated into wider OHLC buckets before plotting.
+CHART_PLOT_WIDTH_PX = 1100
+MIN_PX_PER_CANDLE = 2
+MAX_CHART_CANDLES = CHART_PLOT_WIDTH_PX // MIN_PX_PER_CANDLE
 
-def generate_chart_image(symbol: str, alert_price: float = None, timeframe: str = "15", from_date: int = None, to_date: int = time.time(), outputsize: int = 200):
+# Overlay tokens accepted by /chart and /alert, e.g. "ema20,sma200,bb20,vol"
+_OVERLAY_RE = re.compile(r"^(sma|ema|ssma|rma|bb)(\d+)$")
+VOLUME_TOKENS = {"vol", "volume"}
+OVERLAY_COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#9467bd", "#8c564b", "#e377c2"]
+_OVERLAY_PREFIX = "overlay:"
+
+
+def parse_overlays(spec) -> tuple:
+    """
+    Parse an overlay spec ("ema20,sma200,bb20,vol" or a list of tokens).
+    Returns: (list of (name, length), volume: bool). Raises ValueError on unknown tokens.
+    """
+    if not spec:
+        return [], False
+    tokens = spec if isinstance(spec, (list, tuple)) else str(spec).split(",")
+    overlays, volume = [], False
+    for raw in tokens:
+        tok = str(raw).strip().lower()
+        if not tok:
+            continue
+        if tok in VOLUME_TOKENS:
+            volume = True
+            continue
+        m = _OVERLAY_RE.match(tok)
+        if not m or int(m.group(2)) <= 0:
+            raise ValueError(f"Unknown overlay '{raw}' (use e.g. ema20, sma200, ssma50, bb20, vol)")
+        item = (m.group(1), int(m.group(2)))
+        if item not in overlays:
+            overlays.append(item)
+    return overlays, volume
+
+
+def is_overlay_spec(token: str) -> bool:
+    """True if `token` is a comma-separated list made only of overlay tokens."""
+    try:
+        overlays, volume = parse_overlays(token)
+    except ValueError:
+        return False
+    return bool(overlays) or volume
+
+
+def _compute_overlays(symbol: str, timeframe: str, df: pd.DataFrame, overlays: list) -> pd.DataFrame:
+    """
+    Overlay columns aligned to df.index, computed through the shared indicator
+    engine for (symbol, timeframe) so repeated requests reuse cached results.
+    Historical windows that end before the shared window use a private engine.
+    """
+    engine = get_engine(symbol, timeframe)
+    if len(engine.candles) and df.index[-1] < engine.candles.index[-1]:
+        engine = IndicatorEngine(symbol, timeframe)
+    engine.update(df)
+
+    columns = {}
+    for name, length in overlays:
+        label = f"{name.upper()}{length}"
+        res = engine.get(name, length=length).reindex(df.index)
+        if name == "bb":
+            for col in ("mid", "upper", "lower"):
+                columns[f"{_OVERLAY_PREFIX}{label}:{col}"] = res[col]
+        else:
+            columns[f"{_OVERLAY_PREFIX}{label}"] = res["value"]
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _overlay_addplots(overlay_df: pd.DataFrame) -> list:
+    """mplfinance addplots for overlay columns; all-NaN series (window too long) are skipped."""
+    plots = []
+    labels = []
+    for col in overlay_df.columns:
+        label = col[len(_OVERLAY_PREFIX):].split(":")[0]
+        if label not in labels:
+            labels.append(label)
+    for i, label in enumerate(labels):
+        color = OVERLAY_COLORS[i % len(OVERLAY_COLORS)]
+        for col in [c for c in overlay_df.columns if c[len(_OVERLAY_PREFIX):].split(":")[0] == label]:
+            series = overlay_df[col]
+            if series.isna().all():
+                continue
+            is_band = col.endswith(":upper") or col.endswith(":lower")
+            plots.append(
+                mpf.make_addplot(
+                    series,
+                    type="line",
+                    panel=0,
+                    color=color,
+                    width=0.6 if is_band else 0.9,
+                    linestyle=":" if is_band else "-",
+                    alpha=0.9,
+                )
+            )
+    return plots
+
+
+def downsample_ohlc(df: pd.DataFrame, max_candles: int = MAX_CHART_CANDLES):
+    """
+    Merge consecutive candles into OHLC buckets so at most `max_candles` remain.
+    Each bucket keeps the true open (first), high (max), low (min), close (last)
+    and summed volume; any other column (e.g. overlays) keeps its last value.
+    Buckets are anchored on the newest candle so the last one is always complete.
+    Returns: (DataFrame, factor) where factor is the number of source candles per bucket.
+    """
+    n = len(df)
+    if not max_candles or max_candles <= 0 or n <= max_candles:
+        return df, 1
+
+    factor = -(-n // max_candles)  # ceil division
+    offset = (-n) % factor
+    keys = (np.arange(n) + offset) // factor
+
+    agg = {"open": "first", "high": "max", "low": "min", "close": "last"}
+    for col in df.columns:
+        if col not in agg:
+            agg[col] = "sum" if col == "volume" else "last"
+    out = df.groupby(keys, sort=True).agg(agg)
+    # label each bucket with the timestamp of its first candle
+    out.index = df.index[np.flatnonzero(np.diff(keys, prepend=-1))]
+    return out, factor
+
+
+def _effective_timeframe(timeframe_normalized: str, factor: int) -> str:
+    """Timeframe label after merging `factor` candles (e.g. '15' x4 -> '60', 'D' x3 -> '3D')."""
+    if factor <= 1:
+        return timeframe_normalized
+    tf = str(timeframe_normalized)
+    if tf.isdigit():
+        return str(int(tf) * factor)
+    return f"{factor}{tf}"
+
+
+def generate_chart_image(symbol: str, alert_price: float = None, timeframe: str = "15", from_date: int = None, to_date: int = time.time(), outputsize: int = 200, overlays=None, ohlc=None):
     """
     Generate PNG chart for `symbol` at `interval` (interval can be '1h', '15m', '1440', etc).
     Returns: (BytesIO, period_minutes)
       - BytesIO is a PNG image buffer.
       - period_minutes is the integer minutes used with LiteFinance (e.g. 60 for '1h').
+        When more candles are returned than the image can show, they are merged into
+        wider buckets and the effective timeframe is returned instead (e.g. '240' for
+        16 x '15' candles) so captions describe what was actually plotted.
+
+    `overlays` is an optional spec like "ema20,sma200,bb20,vol" (see parse_overlays);
+    "vol" adds a volume panel when the provider returns volume.
+    `ohlc` is an already fetched candle DataFrame for the same symbol/timeframe/range;
+    when given, the fetch is skipped (several charts of one burst share one fetch).
+    Fetch / overlay / render durations are recorded under chart.* in utils.metrics.
     """
     symbol = symbol.upper()
+    overlay_specs, show_volume = parse_overlays(overlays)
+    chart_started = time.perf_counter()
 
     timeframe_normalized = normalize_timeframe(timeframe)  # minute-based period for LiteFinance
     from_date_normalized = to_unix_timestamp(from_date)
     to_date_normalized = to_unix_timestamp(to_date)
 
-    # --- fetch OHLC using new DataService ---
-    try:
-        raw = get_ohlc(
-            symbol,
-            timeframe_normalized,
-            from_date_normalized,
-            to_date_normalized,
-            # outputsize=outputsize  # <-- now used to limit candles
-        )
-    except Exception as e:
-        raise RuntimeError(f"Failed to fetch OHLC: {e}")
+    # --- fetch OHLC through the shared candle cache ---
+    if ohlc is not None:
+        raw = ohlc
+    else:
+        try:
+            with metrics.timed("chart.fetch"):
+                raw = get_ohlc(
+                    symbol,
+                    timeframe_normalized,
+                    from_date_normalized,
+                    to_date_normalized,
+                    # outputsize=outputsize  # <-- now used to limit candles
+                )
+        except Exception as e:
+            raise RuntimeError(f"Failed to fetch OHLC: {e}")
 
     # Accept either a DataFrame (preferred) or a list-of-dicts/list-of-lists fallback
     if isinstance(raw, pd.DataFrame):
@@ -73,12 +225,29 @@ def generate_chart_image(symbol: str, alert_price: float = None, timeframe: str
     if df.empty:
         raise ValueError("OHLC data contains no valid numeric rows")
 
-    # Remove volume if present (we currently don't plot it)
+    # Keep volume only when a volume panel was requested and the provider sent it
+    df = df[["open", "high", "low", "close"] + (["volume"] if "volume" in df.columns else [])].copy()
     if "volume" in df.columns:
+        df["volume"] = pd.to_numeric(df["volume"], errors="coerce").fillna(0)
+    show_volume = show_volume and "volume" in df.columns
+    if not show_volume and "volume" in df.columns:
         df = df.drop(columns=["volume"])
 
+    # Indicator overlays are computed on the full-resolution candles (cached per
+    # symbol/timeframe/window), then carried through downsampling as extra columns
+    if overlay_specs:
+        with metrics.timed("chart.overlays"):
+            df = df.join(_compute_overlays(symbol, timeframe_normalized, df, overlay_specs))
+
+    # Aggregate into wider candles when there are more than the output width can show
+    df, bucket_factor = downsample_ohlc(df, MAX_CHART_CANDLES)
+    effective_timeframe = _effective_timeframe(timeframe_normalized, bucket_factor)
+
+    overlay_cols = [c for c in df.columns if c.startswith(_OVERLAY_PREFIX)]
+    add_plots = _overlay_addplots(df[overlay_cols]) if overlay_cols else []
+    df = df.drop(columns=overlay_cols)
+
     # Prepare addplot for alert price if provided
-    add_plots = []
     if alert_price is not None:
         alert_price = float(alert_price)
         alert_series = pd.Series([alert_price] * len(df), index=df.index)
@@ -162,7 +331,7 @@ def generate_chart_image(symbol: str, alert_price: float = None, timeframe: str
         type="candle",
         style=custom_style,
         addplot=add_plots if add_plots else None,
-        volume=False,
+        volume=show_volume,
         figratio=(16, 9),
         figscale=1.0,
         savefig=dict(fname=buf, dpi=150, bbox_inches="tight"),
@@ -175,7 +344,9 @@ def generate_chart_image(symbol: str, alert_price: float = None, timeframe: str
     if plot_kwargs.get("addplot") is None:
         plot_kwargs.pop("addplot")
 
-    mpf.plot(**plot_kwargs)
-    plt.close("all")
+    with metrics.timed("chart.render"):
+        mpf.plot(**plot_kwargs)
+        plt.close("all")
     buf.seek(0)
-    return buf, timeframe_normalized
+    metrics.observe("chart.total", time.perf_counter() - chart_started)
+    return buf, effective_timeframe
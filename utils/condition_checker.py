@@ -0,0 +1,170 @@
+# utils/condition_checker.py
+import asyncio
+import functools
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from services.condition_service import get_pending_conditions, mark_conditions_triggered
+from services.notification_service import get_dispatcher, PRIORITY_TEXT
+from utils.alert_checker import owns_symbol
+from utils.candle_cache import get_ohlc, unix_seconds
+from utils.conditions import (
+    bar_seconds,
+    break_levels,
+    break_signal,
+    created_ts,
+    cross_signal,
+    describe_condition,
+    dump_params,
+    first_move_at,
+    first_signal_at,
+    params_of,
+)
+from utils.indicators import IndicatorEngine, get_engine
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# bars scanned per group at most (conditions are re-checked every few seconds)
+MAX_LOOKBACK_BARS = 500
+# breaks are detected on 1m candles against the previous period's level
+BREAK_SCAN_TIMEFRAME = "1"
+
+
+def _group_plan(kind: str, timeframe: str, params: dict):
+    """[(timeframe, warm-up bars)] of candles a condition group needs."""
+    if kind == "move":
+        return [(timeframe, params["window"] * 60 // bar_seconds(timeframe))]
+    if kind == "cross":
+        return [(timeframe, max(3 * params["length"], 50))]
+    return [(BREAK_SCAN_TIMEFRAME, 0), (timeframe, 2)]
+
+
+def _group_hits(kind, timeframe, params, symbol, frames, since):
+    """first_signal_at() for every `since` of one condition group, or None when candles are missing."""
+    if kind == "break":
+        bars = frames.get((symbol, BREAK_SCAN_TIMEFRAME))
+        periods = frames.get((symbol, timeframe))
+        if bars is None or periods is None or len(bars) == 0 or len(periods) < 2:
+            return None
+        starts = unix_seconds(bars["datetime"]).to_numpy()
+        levels = break_levels(periods, starts, params["level"])
+        return first_signal_at(starts, break_signal(bars["high"], bars["low"], levels, params["level"]), since)
+
+    df = frames.get((symbol, timeframe))
+    if df is None or len(df) == 0:
+        return None
+    starts = unix_seconds(df["datetime"]).to_numpy()
+    if kind == "move":
+        # close to close, like cross: a wick that reverts inside its bar is not a move
+        bars = params["window"] * 60 // bar_seconds(timeframe)
+        return first_move_at(starts, df["close"], bars, params["pct"], since)
+
+    # cross: the indicator comes from the shared engine, like chart overlays
+    candles = df.set_index("datetime")
+    engine = get_engine(symbol, timeframe)
+    if len(engine.candles) and candles.index[-1] < engine.candles.index[-1]:
+        engine = IndicatorEngine(symbol, timeframe)
+    engine.update(candles)
+    line = engine.get(params["indicator"], length=params["length"])["value"].reindex(candles.index)
+    return first_signal_at(starts, cross_signal(candles["close"], line.to_numpy(), params.get("side", "any")), since)
+
+
+def evaluate_conditions(conditions, now: float = None, fetch=get_ohlc) -> list:
+    """
+    Vectorized evaluation of pending condition alerts (plain dicts). Returns
+    [(condition, candle_start_unix)] for the conditions met since they were
+    created. Blocking: run in an executor.
+    """
+    now = time.time() if now is None else now
+    groups = defaultdict(list)
+    for cond in conditions:
+        params = params_of(cond)
+        groups[(cond["symbol"], cond["kind"], cond["timeframe"], dump_params(params))].append((cond, params))
+
+    # one candle fetch per (symbol, timeframe), covering every group that needs it
+    need = {}
+    for (symbol, kind, timeframe, _p), members in groups.items():
+        params = members[0][1]
+        oldest = min(created_ts(c.get("created_at")) or now for c, _ in members)
+        for tf, warmup in _group_plan(kind, timeframe, params):
+            sec = bar_seconds(tf)
+            start = max(oldest - sec, now - MAX_LOOKBACK_BARS * sec) - warmup * sec
+            need[(symbol, tf)] = min(need.get((symbol, tf), start), start)
+
+    frames = {}
+    for (symbol, tf), start in need.items():
+        try:
+            frames[(symbol, tf)] = fetch(symbol, tf, int(start), None)
+        except Exception as e:
+            logger.warning("[Conditions] Candles unavailable for %s tf=%s: %s", symbol, tf, e)
+
+    fired = []
+    for (symbol, kind, timeframe, _p), members in groups.items():
+        # as with wick alerts, only bars that open after the alert was created count
+        since = np.array([created_ts(c.get("created_at")) or now for c, _ in members])
+        try:
+            hits = _group_hits(kind, timeframe, members[0][1], symbol, frames, since)
+        except Exception:
+            logger.exception("[Conditions] Evaluation failed for %s %s %s", symbol, kind, timeframe)
+            continue
+        if hits is None:
+            continue
+        fired += [(c, int(t)) for (c, _), t in zip(members, hits) if not np.isnan(t)]
+    metrics.incr("conditions.groups", len(groups))
+    return fired
+
+
+def _message(cond: dict, candle_at) -> str:
+    text = (
+        f"📢 *Condition Alert Triggered!*\n"
+        f"Symbol: `{cond.get('symbol')}`\n"
+        f"Condition: {describe_condition(cond['kind'], cond['timeframe'], cond['params'])}\n"
+    )
+    if candle_at is not None:
+        text += f"Candle: `{candle_at.strftime('%Y-%m-%d %H:%M UTC')}`\n"
+    return text + f"Condition ID: `{cond.get('id', '?')}`"
+
+
+async def check_conditions_job(context):
+    """Evaluate every pending condition alert owned by this worker and notify the met ones."""
+    loop = asyncio.get_running_loop()
+    try:
+        pending = await loop.run_in_executor(None, get_pending_conditions)
+    except Exception as e:
+        logger.exception("Failed to load pending condition alerts: %s", e)
+        return
+    pending = [c for c in pending if owns_symbol(c["symbol"])]
+    if not pending:
+        return
+
+    with metrics.timed("conditions.evaluate"):
+        fired = await loop.run_in_executor(None, evaluate_conditions, pending)
+    if not fired:
+        return
+
+    candles = {c["id"]: datetime.fromtimestamp(t, tz=timezone.utc) for c, t in fired}
+    try:
+        payloads = await loop.run_in_executor(None, functools.partial(mark_conditions_triggered, list(candles), candles))
+    except Exception as e:
+        logger.exception("[Conditions] Failed to mark conditions %s as triggered: %s", list(candles), e)
+        return
+
+    dispatcher = get_dispatcher()
+    for cond in payloads:
+        chat_id = cond.get("user_chat_id")
+        if not chat_id:
+            logger.warning("[Conditions] No chat_id for condition %s - cannot notify user", cond.get("id"))
+            continue
+        dispatcher.submit(
+            chat_id,
+            functools.partial(
+                context.bot.send_message, chat_id=chat_id, text=_message(cond, candles.get(cond["id"])), parse_mode="Markdown",
+            ),
+            PRIORITY_TEXT,
+            label=f"condition {cond.get('id')}",
+        )
@@ -0,0 +1,218 @@
+# utils/conditions.py
+"""
+Condition alerts: parsing, descriptions and vectorized evaluation.
+
+Conditions are evaluated per (symbol, kind, timeframe, params) group: the
+signal series is computed once over the group's candles and every alert of the
+group is resolved at once with a searchsorted over its creation times, so the
+cost grows with the number of distinct conditions, not with the number of users.
+Only candles that open after an alert was created count towards it.
+"""
+import json
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.compute_fromdate import TIMEFRAME_TO_MINUTES
+from utils.normalize_data import normalize_timeframe
+
+KINDS = ("move", "cross", "break")
+CROSS_INDICATORS = ("sma", "ema", "ssma", "rma")
+
+# "move" windows up to this many minutes are measured on 1m candles, longer ones on 15m
+MOVE_FINE_WINDOW_MINUTES = 240
+
+
+# --- parsing ---
+def _window_minutes(token: str) -> int:
+    tf = normalize_timeframe(token)
+    if tf not in TIMEFRAME_TO_MINUTES:
+        raise ValueError(f"Invalid window '{token}'")
+    return TIMEFRAME_TO_MINUTES[tf]
+
+
+def parse_condition(tokens) -> Tuple[str, str, dict]:
+    """
+    Parse condition tokens (after the symbol) into (kind, timeframe, params):
+      move 1% 1h           -> ("move", "1", {"pct": 1.0, "window": 60})
+      cross ema50 15m [up|down]
+      break high|low [D|W]
+    Raises ValueError with a user-facing message.
+    """
+    tokens = [str(t).strip().lower() for t in tokens if str(t).strip()]
+    if not tokens or tokens[0] not in KINDS:
+        raise ValueError("Condition must start with one of: move, cross, break")
+    kind, args = tokens[0], tokens[1:]
+
+    if kind == "move":
+        if len(args) != 2:
+            raise ValueError("Usage: move <percent> <window>, e.g. move 1% 1h")
+        try:
+            pct = float(args[0].rstrip("%"))
+        except ValueError:
+            raise ValueError(f"Invalid percent '{args[0]}'")
+        if pct <= 0:
+            raise ValueError("Percent must be > 0")
+        window = _window_minutes(args[1])
+        timeframe = "1" if window <= MOVE_FINE_WINDOW_MINUTES else "15"
+        if window % TIMEFRAME_TO_MINUTES[timeframe]:
+            raise ValueError(f"Window '{args[1]}' is not a whole number of {timeframe}m candles")
+        return kind, timeframe, {"pct": pct, "window": window}
+
+    if kind == "cross":
+        if len(args) not in (2, 3):
+            raise ValueError("Usage: cross <ema50|sma200|...> <timeframe> [up|down]")
+        name = args[0].rstrip("0123456789")
+        length = args[0][len(name):]
+        if name not in CROSS_INDICATORS or not length.isdigit() or int(length) <= 0:
+            raise ValueError(f"Unknown indicator '{args[0]}' (use e.g. ema50, sma200, ssma20)")
+        side = args[2] if len(args) == 3 else "any"
+        if side not in ("up", "down", "any"):
+            raise ValueError("Cross side must be 'up' or 'down'")
+        return kind, normalize_timeframe(args[1]), {"indicator": name, "length": int(length), "side": side}
+
+    # break
+    if not args or args[0] not in ("high", "low") or len(args) > 2:
+        raise ValueError("Usage: break high|low [D|W], e.g. break high D (yesterday's high)")
+    timeframe = normalize_timeframe(args[1]) if len(args) == 2 else "D"
+    return kind, timeframe, {"level": args[0]}
+
+
+def dump_params(params: dict) -> str:
+    """Canonical JSON so equal conditions share one evaluation group."""
+    return json.dumps(params, sort_keys=True)
+
+
+def describe_condition(kind: str, timeframe: str, params) -> str:
+    if isinstance(params, str):
+        params = json.loads(params)
+    if kind == "move":
+        return f"moves {params['pct']:g}% within {params['window']}m"
+    if kind == "cross":
+        side = {"up": " upwards", "down": " downwards"}.get(params.get("side"), "")
+        return f"close crosses {params['indicator'].upper()}{params['length']}{side} on {timeframe}"
+    if kind == "break":
+        period = {"D": "yesterday's", "W": "last week's", "M": "last month's"}.get(timeframe, f"previous {timeframe}")
+        return f"breaks {period} {params['level']}"
+    return kind
+
+
+# --- vectorized signals (bool arrays aligned with the candles) ---
+def move_signal(close, bars: int, pct: float) -> np.ndarray:
+    """|close[i] / close[i - bars] - 1| >= pct%."""
+    close = np.asarray(close, dtype=float)
+    out = np.zeros(len(close), dtype=bool)
+    if bars <= 0 or len(close) <= bars:
+        return out
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.abs(close[bars:] / close[:-bars] - 1.0)
+    out[bars:] = change >= pct / 100.0
+    return out
+
+
+def cross_signal(close, line, side: str = "any") -> np.ndarray:
+    """Close moves from one side of `line` to the other between consecutive bars."""
+    diff = np.asarray(close, dtype=float) - np.asarray(line, dtype=float)
+    out = np.zeros(len(diff), dtype=bool)
+    if len(diff) < 2:
+        return out
+    prev, cur = diff[:-1], diff[1:]
+    up = (prev <= 0) & (cur > 0)
+    down = (prev >= 0) & (cur < 0)
+    out[1:] = up if side == "up" else down if side == "down" else (up | down)
+    return out
+
+
+def break_levels(period_candles: pd.DataFrame, bar_starts: np.ndarray, level: str) -> np.ndarray:
+    """
+    For each bar start (unix), the previous completed period's high/low; NaN when
+    unknown. period_candles: the condition timeframe's candles with a 'datetime' column.
+    """
+    starts = (period_candles["datetime"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    prev = period_candles[level].shift(1).to_numpy(dtype=float)
+    pos = np.searchsorted(starts.to_numpy(), bar_starts, side="right") - 1
+    out = np.full(len(bar_starts), np.nan)
+    ok = pos >= 0
+    out[ok] = prev[pos[ok]]
+    return out
+
+
+def break_signal(high, low, levels: np.ndarray, level: str) -> np.ndarray:
+    with np.errstate(invalid="ignore"):
+        if level == "high":
+            return np.asarray(high, dtype=float) >= levels
+        return np.asarray(low, dtype=float) <= levels
+
+
+def _next_true(signal: np.ndarray) -> np.ndarray:
+    """next_true[i]: index of the first True at or after i (len(signal) when none)."""
+    n = len(signal)
+    idx = np.where(signal, np.arange(n), n)
+    return np.minimum.accumulate(idx[::-1])[::-1]
+
+
+def first_signal_at(bar_starts: np.ndarray, signal: np.ndarray, since: np.ndarray) -> np.ndarray:
+    """
+    For each entry of `since` (unix seconds), the start of the first bar with
+    bar_start >= since whose signal is True; NaN when there is none.
+    """
+    n = len(signal)
+    since = np.asarray(since, dtype=float)
+    out = np.full(len(since), np.nan)
+    if n == 0:
+        return out
+    next_true = _next_true(signal)
+    pos = np.searchsorted(bar_starts, since, side="left")
+    hit = np.full(len(since), n)
+    inside = pos < n
+    hit[inside] = next_true[pos[inside]]
+    found = hit < n
+    out[found] = bar_starts[hit[found]]
+    return out
+
+
+def first_move_at(bar_starts: np.ndarray, close, bars: int, pct: float, since: np.ndarray) -> np.ndarray:
+    """
+    first_signal_at() for move_signal(close, bars, pct), except that the move must
+    happen after `since`: the close a bar is compared with is never older than the
+    close of the bar containing `since` (the first price the alert saw at a bar
+    boundary). Past `bars` bars after that, this is the shared signal; only the
+    bars before need a per-creation-bar check.
+    """
+    close = np.asarray(close, dtype=float)
+    n = len(close)
+    since = np.asarray(since, dtype=float)
+    out = np.full(len(since), np.nan)
+    if n == 0 or bars <= 0:
+        return out
+    next_true = _next_true(move_signal(close, bars, pct))
+    first = np.searchsorted(bar_starts, since, side="left")
+    base = np.maximum(first - 1, 0)
+    for b in np.unique(base[first < n]):
+        start, stop = b + 1, min(b + bars, n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            moved = np.flatnonzero(np.abs(close[start:stop] / close[b] - 1.0) >= pct / 100.0)
+        hit = start + moved[0] if moved.size else (next_true[stop] if stop < n else n)
+        if hit < n:
+            out[(base == b) & (first < n)] = bar_starts[hit]
+    return out
+
+
+def bar_seconds(timeframe: str) -> int:
+    return TIMEFRAME_TO_MINUTES.get(str(timeframe), 15) * 60
+
+
+def params_of(condition) -> dict:
+    raw = condition.get("params") if isinstance(condition, dict) else getattr(condition, "params", None)
+    return json.loads(raw) if isinstance(raw, str) else dict(raw or {})
+
+
+def created_ts(value) -> Optional[float]:
+    """Unix time of a creation timestamp; naive values (SQLite CURRENT_TIMESTAMP) are UTC."""
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize("UTC")
+    return ts.timestamp()
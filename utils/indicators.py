@@ -0,0 +1,320 @@
+# utils/indicators.py
+"""
+Shared technical indicators.
+
+Plain functions (sma, ema, rma/ssma, rsi, atr, bollinger) take numpy-compatible
+arrays and return numpy arrays aligned with the input (NaN during warm-up).
+Recursive indicators run through pandas' compiled EWM filter instead of a
+Python loop.
+
+IndicatorEngine keeps a candle window per (symbol, timeframe) and maintains
+every requested indicator incrementally: update(new_candles) only computes the
+rows that changed. Engines are shared through get_engine() so backtests,
+chart overlays and alert conditions reuse the same results.
+"""
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+OHLC_COLUMNS = ["open", "high", "low", "close"]
+# Candles kept per engine; older rows are trimmed after each update
+DEFAULT_MAX_CANDLES = 5000
+
+
+# --- vectorized primitives ---
+def _as_array(values) -> np.ndarray:
+    if isinstance(values, (pd.Series, pd.DataFrame)):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=float)
+
+
+def _check_length(length: int) -> int:
+    length = int(length)
+    if length <= 0:
+        raise ValueError("length must be > 0")
+    return length
+
+
+def _recursive_filter(values: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    """y[i] = y[i-1] + alpha * (x[i] - y[i-1]) starting from y[-1] = seed."""
+    if len(values) == 0:
+        return np.empty(0)
+    series = pd.Series(np.concatenate(([seed], values)))
+    return series.ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+
+
+def _seeded_filter(values: np.ndarray, length: int, alpha: float, seed: float = None) -> np.ndarray:
+    """SMA-seeded recursive filter; with `seed` the recursion continues from it."""
+    values = _as_array(values)
+    if seed is not None and not np.isnan(seed):
+        return _recursive_filter(values, alpha, seed)
+    out = np.full(len(values), np.nan)
+    if len(values) < length:
+        return out
+    out[length - 1] = values[:length].mean()
+    out[length:] = _recursive_filter(values[length:], alpha, out[length - 1])
+    return out
+
+
+def sma(values, length: int) -> np.ndarray:
+    """Simple moving average (cumulative-sum based)."""
+    length = _check_length(length)
+    values = _as_array(values)
+    out = np.full(len(values), np.nan)
+    if len(values) < length:
+        return out
+    csum = np.cumsum(np.concatenate(([0.0], values)))
+    out[length - 1:] = (csum[length:] - csum[:-length]) / length
+    return out
+
+
+def ema(values, length: int, seed: float = None) -> np.ndarray:
+    """Exponential moving average, alpha = 2 / (length + 1), seeded with the first SMA."""
+    length = _check_length(length)
+    return _seeded_filter(values, length, 2.0 / (length + 1), seed)
+
+
+def rma(values, length: int, seed: float = None) -> np.ndarray:
+    """Wilder's smoothed moving average (SSMA / RMA), alpha = 1 / length."""
+    length = _check_length(length)
+    return _seeded_filter(values, length, 1.0 / length, seed)
+
+
+ssma = rma
+
+
+def _rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        out = 100.0 - 100.0 / (1.0 + rs)
+    out[(avg_loss == 0) & ~np.isnan(avg_gain)] = 100.0
+    return out
+
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    """Wilder RSI; index 0 is NaN (no previous close)."""
+    length = _check_length(length)
+    close = _as_array(close)
+    out = np.full(len(close), np.nan)
+    if len(close) < 2:
+        return out
+    delta = np.diff(close)
+    avg_gain = rma(np.clip(delta, 0, None), length)
+    avg_loss = rma(np.clip(-delta, 0, None), length)
+    out[1:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    tr = high - low
+    if len(close) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum.reduce([tr[1:], np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)])
+    return tr
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    """Average true range (Wilder smoothing)."""
+    return rma(true_range(high, low, close), _check_length(length))
+
+
+def bollinger(close, length: int = 20, mult: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Bollinger bands (SMA +/- mult * population std). Returns (mid, upper, lower)."""
+    length = _check_length(length)
+    close = _as_array(close)
+    mid = sma(close, length)
+    std = np.full(len(close), np.nan)
+    if len(close) >= length:
+        std[length - 1:] = sliding_window_view(close, length).std(axis=1)
+    return mid, mid + mult * std, mid - mult * std
+
+
+# --- incremental specs ---
+# Each spec computes output columns for candles[start:] given the previously
+# computed rows; start == 0 means a full computation.
+
+def _window_spec(func, length_key="length"):
+    """Indicators that only depend on the last `length` closes (SMA, Bollinger)."""
+    def compute(candles: pd.DataFrame, start: int, prev: pd.DataFrame, **params) -> pd.DataFrame:
+        length = int(params[length_key])
+        ctx = max(0, start - length + 1)
+        window = candles.iloc[ctx:]
+        res = func(window["close"].to_numpy(), **params)
+        if not isinstance(res, tuple):
+            res = (res,)
+        cols = _SPEC_COLUMNS[func.__name__]
+        frame = pd.DataFrame(dict(zip(cols, res)), index=window.index)
+        return frame.iloc[start - ctx:]
+    return compute
+
+
+def _filter_spec(func):
+    """EMA / RMA: continue the recursion from the last stored value."""
+    def compute(candles: pd.DataFrame, start: int, prev: pd.DataFrame, length: int) -> pd.DataFrame:
+        seed = prev["value"].iloc[-1] if start > 0 and len(prev) else None
+        if seed is None or np.isnan(seed):
+            start, seed = 0, None
+        values = func(candles["close"].to_numpy()[start:], length, seed=seed)
+        return pd.DataFrame({"value": values}, index=candles.index[start:])
+    return compute
+
+
+def _rsi_spec(candles: pd.DataFrame, start: int, prev: pd.DataFrame, length: int) -> pd.DataFrame:
+    close = candles["close"].to_numpy()
+    if start > 0 and len(prev) and not np.isnan(prev["avg_gain"].iloc[-1]):
+        delta = close[start:] - close[start - 1:-1]
+        avg_gain = rma(np.clip(delta, 0, None), length, seed=prev["avg_gain"].iloc[-1])
+        avg_loss = rma(np.clip(-delta, 0, None), length, seed=prev["avg_loss"].iloc[-1])
+        index = candles.index[start:]
+    else:
+        avg_gain = np.full(len(close), np.nan)
+        avg_loss = np.full(len(close), np.nan)
+        if len(close) > 1:
+            delta = np.diff(close)
+            avg_gain[1:] = rma(np.clip(delta, 0, None), length)
+            avg_loss[1:] = rma(np.clip(-delta, 0, None), length)
+        index = candles.index
+    return pd.DataFrame(
+        {"value": _rsi_from_averages(avg_gain, avg_loss), "avg_gain": avg_gain, "avg_loss": avg_loss},
+        index=index,
+    )
+
+
+def _atr_spec(candles: pd.DataFrame, start: int, prev: pd.DataFrame, length: int) -> pd.DataFrame:
+    seed = prev["value"].iloc[-1] if start > 0 and len(prev) else None
+    if seed is None or np.isnan(seed):
+        start, seed = 0, None
+    ctx = max(0, start - 1)
+    window = candles.iloc[ctx:]
+    tr = true_range(window["high"], window["low"], window["close"])[start - ctx:]
+    return pd.DataFrame({"value": rma(tr, length, seed=seed)}, index=candles.index[start:])
+
+
+_SPEC_COLUMNS = {"sma": ["value"], "bollinger": ["mid", "upper", "lower"]}
+
+INDICATORS = {
+    "sma": (_window_spec(sma), {"length": 20}),
+    "ema": (_filter_spec(ema), {"length": 20}),
+    "rma": (_filter_spec(rma), {"length": 14}),
+    "ssma": (_filter_spec(rma), {"length": 14}),
+    "rsi": (_rsi_spec, {"length": 14}),
+    "atr": (_atr_spec, {"length": 14}),
+    "bb": (_window_spec(bollinger), {"length": 20, "mult": 2.0}),
+}
+
+
+def _normalize_candles(candles) -> pd.DataFrame:
+    """Coerce OHLC input (DataFrame with datetime column or index) into a sorted float frame."""
+    df = candles.copy() if isinstance(candles, pd.DataFrame) else pd.DataFrame(candles)
+    if "datetime" in df.columns:
+        df["datetime"] = pd.to_datetime(df["datetime"], utc=True, errors="coerce")
+        df = df.dropna(subset=["datetime"]).set_index("datetime")
+    elif not isinstance(df.index, pd.DatetimeIndex):
+        df.index = pd.to_datetime(df.index, utc=True, errors="coerce")
+    elif df.index.tz is None:
+        df.index = df.index.tz_localize("UTC")
+    df.columns = [str(c).lower() for c in df.columns]
+    missing = [c for c in OHLC_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Candles missing columns: {missing}")
+    cols = OHLC_COLUMNS + (["volume"] if "volume" in df.columns else [])
+    df = df[cols].apply(pd.to_numeric, errors="coerce").dropna(subset=OHLC_COLUMNS)
+    df = df[~df.index.duplicated(keep="last")]
+    return df.sort_index()
+
+
+class IndicatorEngine:
+    """
+    Candle window for one (symbol, timeframe) with incrementally updated indicators.
+
+    update(new_candles) merges candles (newer rows replace overlapping ones, e.g. the
+    still-forming last bar) and extends every cached indicator from the first
+    changed row. get(name, **params) returns the cached result, computing it once.
+    """
+
+    def __init__(self, symbol: str, timeframe: str, max_candles: int = DEFAULT_MAX_CANDLES):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.max_candles = max_candles
+        self.candles = pd.DataFrame(columns=OHLC_COLUMNS, dtype=float, index=pd.DatetimeIndex([], tz="UTC"))
+        self._results: Dict[tuple, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _params_key(name: str, params: dict) -> tuple:
+        return (name,) + tuple(sorted(params.items()))
+
+    def update(self, new_candles) -> int:
+        """Merge candles and extend cached indicators. Returns the number of rows (re)computed."""
+        new = _normalize_candles(new_candles)
+        if new.empty:
+            return 0
+        with self._lock:
+            # skip the prefix that matches what we already hold, so re-sending the
+            # same window (several charts of one symbol) recomputes nothing
+            known = self.candles.reindex(new.index)[OHLC_COLUMNS]
+            unchanged = (known == new[OHLC_COLUMNS]).all(axis=1).to_numpy()
+            if unchanged.all():
+                return 0
+            new = new.iloc[int(np.argmin(unchanged)):]
+            first_new = new.index[0]
+            keep = self.candles[self.candles.index < first_new]
+            merged = pd.concat([keep, new]) if len(keep) else new
+            merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+            start = len(keep)
+
+            for key, prev in list(self._results.items()):
+                name, params = key[0], dict(key[1:])
+                spec = INDICATORS[name][0]
+                prev = prev.iloc[:start]
+                fresh = spec(merged, start, prev, **params)
+                # specs may fall back to a full computation, so splice on the index
+                if len(fresh) and len(prev):
+                    fresh = pd.concat([prev[prev.index < fresh.index[0]], fresh])
+                self._results[key] = fresh
+
+            if self.max_candles and len(merged) > self.max_candles:
+                cut = len(merged) - self.max_candles
+                merged = merged.iloc[cut:]
+                for key in self._results:
+                    self._results[key] = self._results[key].iloc[cut:]
+
+            self.candles = merged
+            return len(merged) - start
+
+    def get(self, name: str, **params) -> pd.DataFrame:
+        """
+        Indicator values aligned to self.candles. Single-output indicators expose a
+        'value' column; Bollinger exposes 'mid', 'upper', 'lower'.
+        """
+        name = name.lower()
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator: {name}")
+        spec, defaults = INDICATORS[name]
+        merged_params = {**defaults, **params}
+        key = self._params_key(name, merged_params)
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                result = spec(self.candles, 0, pd.DataFrame(), **merged_params)
+                self._results[key] = result
+            return result
+
+
+_engines: Dict[Tuple[str, str], IndicatorEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(symbol: str, timeframe: str) -> IndicatorEngine:
+    """Shared engine for (symbol, timeframe); created on first use."""
+    key = (str(symbol).upper(), str(timeframe))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = IndicatorEngine(key[0], key[1])
+            _engines[key] = engine
+        return engine
@@ -0,0 +1,65 @@
+# utils/metrics.py
+"""
+Tiny in-process metrics registry (counters, gauges, timings).
+
+Thread-safe so chart rendering in executor threads can record timings.
+snapshot() returns plain dicts suitable for logging or a JSON endpoint.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_gauges = {}
+# name -> {"count", "total", "max", "last"} (seconds)
+_timings = {}
+
+
+def incr(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] += value
+
+
+def set_gauge(name: str, value) -> None:
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        t = _timings.get(name)
+        if t is None:
+            t = _timings[name] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+        t["count"] += 1
+        t["total"] += seconds
+        t["last"] = seconds
+        if seconds > t["max"]:
+            t["max"] = seconds
+
+
+@contextmanager
+def timed(name: str):
+    """Record the duration of the `with` block under `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def snapshot() -> dict:
+    with _lock:
+        timings = {
+            name: {**t, "avg": (t["total"] / t["count"]) if t["count"] else 0.0}
+            for name, t in _timings.items()
+        }
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timings": timings}
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
@@ -21,6 +21,35 @@ def normalize_symbol(symbol: str) -> str:
     return symbol.replace(" ", "").replace("/", "").upper()
 
 
+_FIAT = {
+    "USD", "EUR", "GBP", "JPY", "CHF", "CAD", "AUD", "NZD", "SEK", "NOK", "DKK", "PLN",
+    "HUF", "CZK", "TRY", "ZAR", "MXN", "SGD", "HKD", "CNH", "CNY",
+}
+# quoted decimals by symbol prefix, checked before the forex rule
+_PREFIX_DECIMALS = {"XAU": 2, "XAG": 3, "XPT": 2, "XPD": 2}
+# anything unrecognised (crypto, indices, stocks) keeps sub-cent prices apart
+DEFAULT_PRICE_DECIMALS = 8
+
+
+def price_decimals(symbol: str) -> int:
+    """
+    Decimals a symbol is quoted with: 5 for forex pairs (3 when quoted in JPY),
+    2-3 for metals, DEFAULT_PRICE_DECIMALS otherwise.
+    """
+    s = normalize_symbol(symbol)
+    for prefix, decimals in _PREFIX_DECIMALS.items():
+        if s.startswith(prefix):
+            return decimals
+    if len(s) == 6 and s[:3] in _FIAT and s[3:] in _FIAT:
+        return 3 if s.endswith("JPY") else 5
+    return DEFAULT_PRICE_DECIMALS
+
+
+def price_ticks(symbol: str, price) -> int:
+    """`price` as an integer number of ticks (units of the symbol's last quoted decimal)."""
+    return int(round(float(price) * 10 ** price_decimals(symbol)))
+
+
 def normalize_timeframe(tf) -> str:
     """
     Normalize timeframe to LiteFinance/TwelveData format.
@@ -0,0 +1,86 @@
+# utils/poll_cadence.py
+"""
+Per-symbol quote polling cadence from distance-to-trigger and volatility.
+
+A symbol whose closest pending level is k one-minute ATRs away cannot reach it
+much faster than k minutes, so it is polled every k * CADENCE_SAFETY minutes,
+clamped to [QUOTE_POLL_SECONDS, QUOTE_POLL_MAX_SECONDS]. Unknown volatility
+falls back to the fastest cadence.
+"""
+import logging
+import time
+from typing import Optional
+
+from config import QUOTE_POLL_SECONDS, QUOTE_POLL_MAX_SECONDS
+from utils.candle_cache import get_ohlc
+from utils.compute_fromdate import compute_from_date
+from utils.indicators import atr
+
+logger = logging.getLogger(__name__)
+
+# fraction of the fastest plausible time-to-trigger used as the poll interval
+CADENCE_SAFETY = 0.5
+# ATR is measured on this many one-minute candles
+ATR_TIMEFRAME = "1"
+ATR_LENGTH = 14
+ATR_CANDLES = 60
+# how long a measured ATR is reused (seconds)
+ATR_TTL_SECONDS = 300
+
+# symbol -> (atr, measured_at)
+_atr_cache: dict = {}
+
+
+def atr_is_stale(symbol: str) -> bool:
+    entry = _atr_cache.get(symbol)
+    return entry is None or time.time() - entry[1] >= ATR_TTL_SECONDS
+
+
+def cached_atr(symbol: str) -> Optional[float]:
+    """Last measured ATR for `symbol` (None when unknown or stale)."""
+    if atr_is_stale(symbol):
+        return None
+    return _atr_cache[symbol][0]
+
+
+def measure_atr(symbol: str) -> Optional[float]:
+    """One-minute ATR from the shared candle cache (blocking; run in an executor)."""
+    value = None
+    try:
+        df = get_ohlc(symbol, ATR_TIMEFRAME, compute_from_date(ATR_TIMEFRAME, ATR_CANDLES), None)
+        if df is not None and len(df) > ATR_LENGTH:
+            last = float(atr(df["high"], df["low"], df["close"], ATR_LENGTH)[-1])
+            value = last if last > 0 else None
+    except Exception as e:
+        logger.info("[Cadence] ATR unavailable for %s: %s", symbol, e)
+    # failures are cached too, so an unreachable provider is not retried every quote
+    _atr_cache[symbol] = (value, time.time())
+    return value
+
+
+def export_atrs() -> dict:
+    return dict(_atr_cache)
+
+
+def restore_atrs(atrs: dict) -> None:
+    """Seed ATRs from a snapshot; measurements taken since are kept."""
+    for symbol, (value, measured_at) in atrs.items():
+        if symbol not in _atr_cache or _atr_cache[symbol][1] < measured_at:
+            _atr_cache[symbol] = (value, measured_at)
+
+
+def poll_interval(distance: Optional[float], atr_value: Optional[float]) -> float:
+    """Seconds until the next poll for a symbol `distance` away from its closest level."""
+    if distance is None:
+        return QUOTE_POLL_MAX_SECONDS
+    if not atr_value or atr_value <= 0:
+        return QUOTE_POLL_SECONDS
+    seconds = abs(distance) / atr_value * 60.0 * CADENCE_SAFETY
+    return min(QUOTE_POLL_MAX_SECONDS, max(QUOTE_POLL_SECONDS, seconds))
+
+
+def nearest_distance(index, symbol: str, price: float) -> Optional[float]:
+    """Distance from `price` to the closest pending ABOVE/BELOW level in `index`."""
+    above, below = index.nearest_levels(symbol, price)
+    gaps = [abs(level - price) for level in (above, below) if level is not None]
+    return min(gaps) if gaps else None
@@ -0,0 +1,161 @@
+# utils/quote_bus.py
+"""
+Per-symbol quote feed with subscribers.
+
+One polling task per watched symbol fetches the latest quote and publishes it
+to every subscriber as soon as it changes. A push source (websocket, webhook)
+can feed the same subscribers by calling publish() directly.
+"""
+import asyncio
+import functools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+from config import QUOTE_POLL_SECONDS
+from utils.get_data import get_price
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# async callback(symbol, quote_dict)
+Subscriber = Callable[[str, dict], Awaitable[None]]
+
+
+class QuoteBus:
+    def __init__(self, fetch=get_price, interval: float = None):
+        self._fetch = fetch
+        self.interval = QUOTE_POLL_SECONDS if interval is None else interval
+        self._subscribers: list = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # symbol -> poll interval overriding the default (see set_interval)
+        self._intervals: Dict[str, float] = {}
+        # symbol -> event that cuts a long sleep short when the interval shrinks
+        self._wake: Dict[str, asyncio.Event] = {}
+        # symbol -> (quote, received_at)
+        self._last: Dict[str, tuple] = {}
+
+    def subscribe(self, callback: Subscriber) -> None:
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def last(self, symbol: str) -> Optional[tuple]:
+        """(quote, received_at) of the latest published quote for `symbol`, or None."""
+        return self._last.get(symbol.strip().upper())
+
+    def fresh(self, symbol: str) -> Optional[dict]:
+        """Latest quote for a watched `symbol` if its feed confirmed it within two poll intervals, else None."""
+        symbol = symbol.strip().upper()
+        last = self._last.get(symbol)
+        if symbol not in self._tasks or last is None:
+            return None
+        if time.time() - last[1] > 2 * self.interval_for(symbol):
+            return None
+        return last[0]
+
+    def quotes(self) -> Dict[str, tuple]:
+        """symbol -> (quote, received_at) for every symbol with a published quote."""
+        return dict(self._last)
+
+    def seed(self, symbol: str, quote: dict, received_at: float) -> None:
+        """
+        Record a quote (e.g. from a snapshot) without publishing it. A feed started
+        for the symbol waits out the rest of its interval before the first poll.
+        """
+        symbol = symbol.strip().upper()
+        if symbol not in self._last:
+            self._last[symbol] = (quote, received_at)
+
+    def set_interval(self, symbol: str, seconds: Optional[float]) -> None:
+        """Poll `symbol` every `seconds` from its next poll on; None restores the default."""
+        symbol = symbol.strip().upper()
+        if seconds is None:
+            self._intervals.pop(symbol, None)
+        else:
+            seconds = max(0.0, float(seconds))
+            shorter = seconds < self.interval_for(symbol)
+            self._intervals[symbol] = seconds
+            if shorter and symbol in self._wake:
+                self._wake[symbol].set()
+
+    def interval_for(self, symbol: str) -> float:
+        return self._intervals.get(symbol.strip().upper(), self.interval)
+
+    def watched(self) -> set:
+        return set(self._tasks)
+
+    def watch(self, symbols: Iterable[str]) -> None:
+        """
+        Poll exactly `symbols`: start feeds for new ones (or ones whose task died)
+        and stop feeds no longer needed. Must be called from the event loop.
+        """
+        wanted = {s.strip().upper() for s in symbols if s and s.strip()}
+        for symbol in set(self._tasks) - wanted:
+            self._tasks.pop(symbol).cancel()
+            self._last.pop(symbol, None)
+            self._intervals.pop(symbol, None)
+            self._wake.pop(symbol, None)
+        for symbol in wanted:
+            task = self._tasks.get(symbol)
+            if task is None or task.done():
+                self._tasks[symbol] = asyncio.create_task(self._poll(symbol), name=f"quotes-{symbol}")
+        metrics.set_gauge("quotes.watched", len(self._tasks))
+
+    async def publish(self, symbol: str, quote: dict) -> None:
+        """Record `quote` and hand it to every subscriber; one failing subscriber does not stop the rest."""
+        symbol = symbol.strip().upper()
+        self._last[symbol] = (quote, time.time())
+        metrics.incr("quotes.published")
+        for callback in list(self._subscribers):
+            try:
+                await callback(symbol, quote)
+            except Exception:
+                logger.exception("[QuoteBus] Subscriber failed for %s", symbol)
+
+    async def _poll(self, symbol: str) -> None:
+        loop = asyncio.get_running_loop()
+        wake = self._wake.setdefault(symbol, asyncio.Event())
+        previous = None
+        # a recent (seeded) quote is still good: no need to poll right away
+        last = self._last.get(symbol)
+        if last is not None:
+            delay = self.interval_for(symbol) - (time.time() - last[1])
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        while True:
+            try:
+                quote = await loop.run_in_executor(None, functools.partial(self._fetch, symbol))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("quotes.fetch_failed")
+                logger.warning("[QuoteBus] Quote fetch failed for %s: %s", symbol, e)
+                quote = None
+
+            # only changes are interesting to subscribers
+            if quote and quote != previous:
+                previous = quote
+                await self.publish(symbol, quote)
+            elif quote:
+                # unchanged, but confirmed just now
+                self._last[symbol] = (quote, time.time())
+
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=self.interval_for(symbol))
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
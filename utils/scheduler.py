@@ -0,0 +1,76 @@
+# utils/scheduler.py
+"""
+Job-queue helpers for periodic work.
+
+run_aligned() schedules a callback on wall-clock boundaries (every 60 s job
+fires at :00 of each minute) and wraps it so two cycles never overlap. A tick
+that arrives while the previous cycle is still running is dropped and counted
+once: as `skipped`, or with catch_up as `merged` into the single follow-up
+cycle queued to start when the running one ends. Cycle durations are recorded
+in utils.metrics.
+"""
+import asyncio
+import functools
+import logging
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def next_boundary(interval: float, now: float = None, min_delay: float = 0.0) -> float:
+    """Unix time of the first multiple of `interval` at least `min_delay` seconds after `now`."""
+    if now is None:
+        now = time.time()
+    return math.ceil((now + min_delay) / interval) * interval
+
+
+def non_overlapping(callback, name: str, interval: float, catch_up: bool = False):
+    """
+    Wrap an async job callback so a new cycle never starts while the previous one
+    runs. Overlapping ticks are skipped, or with `catch_up` the first one queues a
+    follow-up cycle and later ones are merged into it.
+    """
+    lock = asyncio.Lock()
+    follow_up = {"queued": False}
+
+    @functools.wraps(callback)
+    async def wrapper(context):
+        if lock.locked():
+            if not catch_up:
+                metrics.incr(f"{name}.skipped")
+                logger.warning("[Scheduler] %s still running; skipping this tick", name)
+                return
+            if follow_up["queued"]:
+                metrics.incr(f"{name}.merged")
+                logger.warning("[Scheduler] %s still running; tick merged into the queued follow-up", name)
+                return
+            follow_up["queued"] = True
+        async with lock:
+            follow_up["queued"] = False
+            start = time.monotonic()
+            try:
+                await callback(context)
+            finally:
+                duration = time.monotonic() - start
+                metrics.observe(f"{name}.duration", duration)
+                metrics.incr(f"{name}.runs")
+                if duration > interval:
+                    logger.warning("[Scheduler] %s took %.1fs (> %ss)", name, duration, interval)
+
+    return wrapper
+
+
+def run_aligned(job_queue, callback, interval: float, name: str = None, min_delay: float = 0.0, catch_up: bool = False):
+    """Schedule `callback` every `interval` seconds aligned to wall-clock boundaries, never overlapping."""
+    name = name or getattr(callback, "__name__", "job")
+    first = datetime.fromtimestamp(next_boundary(interval, min_delay=min_delay), tz=timezone.utc)
+    return job_queue.run_repeating(
+        non_overlapping(callback, name, interval, catch_up),
+        interval=timedelta(seconds=interval),
+        first=first,
+        name=name,
+    )
@@ -0,0 +1,223 @@
+# utils/snapshot.py
+"""
+Warm-restart snapshots of evaluator state.
+
+A snapshot is a few .npy files holding numpy structured arrays with fixed-width
+fields only, so they load with mmap_mode="r" without parsing, plus a small
+manifest.json naming them. File names carry a generation stamp and the manifest
+is replaced atomically after them, so a reader never sees a half-written
+snapshot; several worker processes can share the directory.
+"""
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+# files of older generations are removed once they are this old (seconds)
+STALE_FILE_SECONDS = 300
+
+_OHLC = ("open", "high", "low", "close", "volume")
+
+
+def _str_dtype(values: Iterable) -> str:
+    return f"U{max([1] + [len(v) for v in values])}"
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _opt(value):
+    """None for NaN / negative sentinels, plain Python numbers otherwise."""
+    value = value.item() if hasattr(value, "item") else value
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, int) and value < 0:
+        return None
+    return value
+
+
+# --- files ---
+def write_snapshot(directory: str, arrays: Dict[str, np.ndarray], meta: dict) -> str:
+    """Write `arrays` and the manifest (with `meta`) into `directory`. Returns the generation."""
+    os.makedirs(directory, exist_ok=True)
+    generation = f"{int(time.time() * 1000)}-{os.getpid()}"
+    files = {}
+    for name, array in arrays.items():
+        filename = f"{name}-{generation}.npy"
+        tmp = os.path.join(directory, f".{filename}.tmp")
+        with open(tmp, "wb") as fh:
+            np.save(fh, array, allow_pickle=False)
+        os.replace(tmp, os.path.join(directory, filename))
+        files[name] = filename
+
+    manifest = dict(meta, version=FORMAT_VERSION, written_at=time.time(), files=files)
+    tmp = os.path.join(directory, f".{MANIFEST}.{generation}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+    # drop older generations (other writers' recent files are left alone)
+    keep = set(files.values())
+    cutoff = time.time() - STALE_FILE_SECONDS
+    for filename in os.listdir(directory):
+        if filename.endswith(".npy") and filename not in keep:
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+    return generation
+
+
+def read_snapshot(directory: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """(manifest, {name: memory-mapped array}) of the latest snapshot, or None when there is none usable."""
+    try:
+        with open(os.path.join(directory, MANIFEST)) as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning("[Snapshot] Unreadable manifest in %s: %s", directory, e)
+        return None
+    if manifest.get("version") != FORMAT_VERSION:
+        logger.info("[Snapshot] Ignoring snapshot format %s", manifest.get("version"))
+        return None
+    arrays = {}
+    for name, filename in manifest.get("files", {}).items():
+        try:
+            arrays[name] = np.load(os.path.join(directory, filename), mmap_mode="r", allow_pickle=False)
+        except (OSError, ValueError) as e:
+            logger.warning("[Snapshot] Missing or damaged %s: %s", filename, e)
+            return None
+    return manifest, arrays
+
+
+# --- alert index ---
+def pack_alerts(alerts: List[dict]) -> np.ndarray:
+    """Indexed (plain dict) alerts as a structured array."""
+    symbols = [str(a.get("symbol") or "") for a in alerts]
+    directions = [str(a.get("direction") or "") for a in alerts]
+    timeframes = [str(a.get("timeframes") or "") for a in alerts]
+    overlays = [str(a.get("overlays") or "") for a in alerts]
+    dtype = [
+        ("id", "i8"), ("symbol", _str_dtype(symbols)), ("target_price", "f8"), ("direction", _str_dtype(directions)),
+        ("timeframes", _str_dtype(timeframes)), ("overlays", _str_dtype(overlays)),
+        ("user_chat_id", "i8"), ("user_id", "i8"), ("created_ts", "f8"),
+    ]
+    out = np.zeros(len(alerts), dtype=dtype)
+    for i, a in enumerate(alerts):
+        out[i] = (
+            int(a["id"]), symbols[i], _float(a.get("target_price")), directions[i], timeframes[i], overlays[i],
+            int(a["user_chat_id"]) if a.get("user_chat_id") is not None else -1,
+            int(a["user_id"]) if a.get("user_id") is not None else -1,
+            _float(a.get("created_ts")),
+        )
+    return out
+
+
+def unpack_alerts(array: np.ndarray) -> List[dict]:
+    return [
+        {
+            "id": int(row["id"]),
+            "symbol": str(row["symbol"]),
+            "target_price": float(row["target_price"]),
+            "direction": str(row["direction"]),
+            "timeframes": str(row["timeframes"]) or None,
+            "overlays": str(row["overlays"]) or None,
+            "user_chat_id": _opt(int(row["user_chat_id"])),
+            "user_id": _opt(int(row["user_id"])),
+            "created_ts": _opt(float(row["created_ts"])),
+        }
+        for row in array
+    ]
+
+
+# --- per-symbol quote board / cadence state ---
+def pack_symbols(quotes: Dict[str, tuple], atrs: Dict[str, tuple], scanned: Dict[str, int]) -> np.ndarray:
+    """
+    quotes: symbol -> (quote dict, received_at); atrs: symbol -> (atr, measured_at);
+    scanned: symbol -> start of the newest 1m candle scanned for wicks.
+    """
+    symbols = sorted(set(quotes) | set(atrs) | set(scanned))
+    dtype = [
+        ("symbol", _str_dtype(symbols)), ("price", "f8"), ("bid", "f8"), ("ask", "f8"), ("quote_at", "f8"),
+        ("atr", "f8"), ("atr_at", "f8"), ("scanned_until", "i8"),
+    ]
+    out = np.zeros(len(symbols), dtype=dtype)
+    nan = float("nan")
+    for i, symbol in enumerate(symbols):
+        quote, quote_at = quotes.get(symbol, ({}, nan))
+        quote = quote if isinstance(quote, dict) else {"price": quote}
+        atr_value, atr_at = atrs.get(symbol, (nan, nan))
+        out[i] = (
+            symbol, _float(quote.get("price")), _float(quote.get("bid")), _float(quote.get("ask")), _float(quote_at),
+            _float(atr_value), _float(atr_at), int(scanned.get(symbol, -1)),
+        )
+    return out
+
+
+def unpack_symbols(array: np.ndarray) -> Tuple[Dict[str, tuple], Dict[str, tuple], Dict[str, int]]:
+    quotes, atrs, scanned = {}, {}, {}
+    for row in array:
+        symbol = str(row["symbol"])
+        if not np.isnan(row["price"]) and not np.isnan(row["quote_at"]):
+            quote = {"source": "snapshot", "symbol": symbol, "price": float(row["price"]),
+                     "bid": _opt(float(row["bid"])), "ask": _opt(float(row["ask"]))}
+            quotes[symbol] = (quote, float(row["quote_at"]))
+        if not np.isnan(row["atr_at"]):
+            atrs[symbol] = (_opt(float(row["atr"])), float(row["atr_at"]))
+        if row["scanned_until"] >= 0:
+            scanned[symbol] = int(row["scanned_until"])
+    return quotes, atrs, scanned
+
+
+# --- candle windows ---
+def pack_candles(entries: Dict[tuple, dict]) -> Tuple[np.ndarray, list]:
+    """
+    Candle cache entries ((symbol, tf) -> {"df", "from_ts", "fetched_at"}) as one
+    structured array plus segment descriptors for the manifest.
+    """
+    frames, segments, offset = [], [], 0
+    for (symbol, tf), entry in entries.items():
+        df = entry["df"]
+        if df is None or len(df) == 0:
+            continue
+        part = np.zeros(len(df), dtype=[("ts", "i8")] + [(c, "f8") for c in _OHLC])
+        part["ts"] = ((df["datetime"] - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+        for c in _OHLC:
+            part[c] = pd.to_numeric(df[c], errors="coerce").to_numpy(float) if c in df.columns else np.nan
+        frames.append(part)
+        segments.append({
+            "symbol": symbol, "timeframe": tf, "start": offset, "stop": offset + len(part),
+            "from_ts": int(entry["from_ts"]), "fetched_at": float(entry["fetched_at"]),
+            "volume": "volume" in df.columns,
+        })
+        offset += len(part)
+    dtype = [("ts", "i8")] + [(c, "f8") for c in _OHLC]
+    return (np.concatenate(frames) if frames else np.zeros(0, dtype=dtype)), segments
+
+
+def unpack_candles(array: np.ndarray, segments: list) -> Dict[tuple, dict]:
+    entries = {}
+    for seg in segments:
+        part = array[seg["start"]:seg["stop"]]
+        columns = _OHLC if seg.get("volume") else _OHLC[:-1]
+        df = pd.DataFrame({c: np.array(part[c]) for c in columns})
+        df.insert(0, "datetime", pd.to_datetime(np.array(part["ts"]), unit="s", utc=True))
+        entries[(seg["symbol"], seg["timeframe"])] = {
+            "df": df, "from_ts": seg["from_ts"], "fetched_at": seg["fetched_at"],
+        }
+    return entries
@@ -1,16 +1,26 @@
 # wsgi_bot.py
+import atexit
 import logging
 import asyncio
+import signal
+import sys
 import threading
 from flask import Flask, request
 from telegram import Update
 from telegram.ext import Application
 
-from config import LOG_LEVEL, BOT_TOKEN, WEBHOOK_URL
-from handlers import start, help, price, chart, alert
-from handlers.listalerts import list_alerts_handler, delete_alert_handler
+from config import (
+    LOG_LEVEL, BOT_TOKEN, WEBHOOK_URL, ALERT_SWEEP_SECONDS, SHARD_LEASE_SECONDS, CONDITION_CHECK_SECONDS,
+    ALERT_EXPIRY_CHECK_SECONDS, ARCHIVE_CHECK_SECONDS, SNAPSHOT_SECONDS, SHUTDOWN_TIMEOUT_SECONDS,
+)
+from handlers import start, help, price, chart, alert, condition
+from handlers.listalerts import list_alerts_handler, delete_alert_handler, alerts_page_handler, clear_alerts_handler
 from services.db_service import init_db
-from utils.alert_checker import check_alerts_job
+from utils.alert_checker import check_alerts_job, renew_shards_job, save_state_job, start_alert_feed, stop_alert_feed
+from utils.scheduler import run_aligned
+from utils.condition_checker import check_conditions_job
+from utils.alert_archiver import expire_alerts_job, archive_alerts_job
+from utils import metrics
 
 # ------------------ Logging ------------------
 logging.basicConfig(
@@ -31,8 +41,11 @@ application.add_handler(help.handler)
 application.add_handler(price.handler)
 application.add_handler(chart.handler)
 application.add_handler(alert.handler)
+application.add_handler(condition.handler)
 application.add_handler(list_alerts_handler)
 application.add_handler(delete_alert_handler)
+application.add_handler(alerts_page_handler)
+application.add_handler(clear_alerts_handler)
 
 # ------------------ Flask App ------------------
 flask_app = Flask(__name__)
@@ -40,6 +53,11 @@ flask_app = Flask(__name__)
 @flask_app.get("/health")
 def health():
     return "ok"
+
+
+@flask_app.get("/metrics")
+def metrics_snapshot():
+    return metrics.snapshot()
     
     
 # We'll forward updates to the bot loop (do not await here)
@@ -72,8 +90,19 @@ async def on_startup():
     await application.bot.set_webhook(WEBHOOK_URL)
     logger.info("Webhook set to %s", WEBHOOK_URL)
 
-    # Start background jobs (runs in the bot's job queue)
-    application.job_queue.run_repeating(check_alerts_job, interval=10, first=4)
+    # Evaluate alerts on every new quote; the periodic sweep is only a safety net
+    await start_alert_feed(application)
+    run_aligned(application.job_queue, check_alerts_job, ALERT_SWEEP_SECONDS, name="alerts.sweep", min_delay=4)
+    # Keep this worker's symbol shards leased (and rebalance when workers come and go)
+    run_aligned(application.job_queue, renew_shards_job, SHARD_LEASE_SECONDS / 3, name="alerts.shards")
+    # Condition alerts (/when) are evaluated in vectorized batches from cached candles;
+    # a cycle missed to an overrun is caught up right after it instead of a full interval later
+    run_aligned(application.job_queue, check_conditions_job, CONDITION_CHECK_SECONDS, name="conditions.check", catch_up=True)
+    # Expire stale alerts and archive old triggered ones (off-peak) to keep `alerts` small
+    run_aligned(application.job_queue, expire_alerts_job, ALERT_EXPIRY_CHECK_SECONDS, name="alerts.expire")
+    run_aligned(application.job_queue, archive_alerts_job, ARCHIVE_CHECK_SECONDS, name="alerts.archive")
+    # Snapshot index / quotes / candles so a restart starts warm
+    run_aligned(application.job_queue, save_state_job, SNAPSHOT_SECONDS, name="state.snapshot")
     logger.info("Background jobs scheduled.")
 
 # ------------------ Run the bot in a dedicated thread + loop ------------------
@@ -88,6 +117,37 @@ def _start_bot_loop(loop: asyncio.AbstractEventLoop):
 bot_thread = threading.Thread(target=_start_bot_loop, args=(bot_loop,), daemon=True)
 bot_thread.start()
 
+# ------------------ Shutdown (final snapshot, release shard leases) ------------------
+async def on_shutdown():
+    """Counterpart of on_startup; the webhook stays set for the other workers."""
+    try:
+        await stop_alert_feed(application)
+    except Exception:
+        logger.exception("Failed to stop the alert feed")
+    if application.running:
+        await application.stop()
+    await application.shutdown()
+
+
+def _shutdown_bot_loop():
+    if not bot_loop.is_running():
+        return
+    future = asyncio.run_coroutine_threadsafe(on_shutdown(), bot_loop)
+    try:
+        future.result(timeout=SHUTDOWN_TIMEOUT_SECONDS)
+        logger.info("Bot loop shut down")
+    except Exception:
+        logger.exception("Bot loop did not shut down cleanly")
+    bot_loop.call_soon_threadsafe(bot_loop.stop)
+
+
+atexit.register(_shutdown_bot_loop)
+
+# A plain SIGTERM would skip atexit; exit normally instead, unless the server
+# (e.g. gunicorn) already handles it
+if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
 # ------------------ WSGI Entry Point for Passenger ------------------
 app = flask_app
 